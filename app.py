@@ -14,7 +14,9 @@ from PIL import Image
 sys.path.append(str(Path(__file__).parent / 'src'))
 
 from data.data_loader import DataLoader
+from data.schema import flags_to_labels
 from models.model_trainer import ModelTrainer
+from models.serving import get_churn_predictor, get_serving_cache, warmup
 from utils.glossario import FAQ, GLOSSARIO
 
 # Configuração da página
@@ -85,17 +87,26 @@ def icon(name, color=None):
 def load_data():
     """Carrega e processa os dados"""
     try:
-        loader = DataLoader(data_dir="data")
+        loader = DataLoader(data_dir="data", use_cache=True, compact=True, incremental=True)
         loader.load_data()
         loader.validate_data()
         data = loader.merge_data()
         data = loader.clean_data()
+        # Flags Sim/Não exibidas como rótulos (categóricos, 1 byte por valor)
+        data = flags_to_labels(data)
         return data, loader
     except Exception as e:
         st.error(f"Erro ao carregar dados: {e}")
         return None, None
 
 
+# Aquecimento dos preditores (uma vez por processo do servidor)
+@st.cache_resource
+def warmup_predictors():
+    """Carrega modelo e históricos no cache de serviço antes do primeiro clique"""
+    return warmup()
+
+
 # Função para carregar imagens
 def load_image(image_path):
     """Carrega uma imagem se existir"""
@@ -202,6 +213,8 @@ def main():
 
         return
 
+    warmup_predictors()
+
     # Páginas
     if page == "Dashboard Principal":
         show_dashboard(data, loader)
@@ -1510,6 +1523,24 @@ def show_settings():
 
     st.divider()
 
+    st.subheader("⚡ Cache de Predição")
+
+    serving_metrics = get_serving_cache().metrics()
+    if serving_metrics:
+        st.dataframe(pd.DataFrame(serving_metrics).T, use_container_width=True)
+    else:
+        st.text("Nenhum preditor carregado")
+
+    try:
+        churn_cache = get_churn_predictor().cache_stats()
+    except Exception:
+        churn_cache = {}
+    if churn_cache:
+        st.caption("Cache de predições de churn (LRU + TTL)")
+        st.dataframe(pd.DataFrame([churn_cache]), use_container_width=True)
+
+    st.divider()
+
     st.subheader("ℹ️ Informações do Sistema")
 
     col1, col2 = st.columns(2)
@@ -10,7 +10,7 @@ import sys
 
 sys.path.append(str(Path(__file__).parent / 'src'))
 
-from models.predictor import ChurnPredictor, SalesPredictor, ProductRecommender
+from models.serving import get_churn_predictor, get_sales_predictor, get_recommender, get_store
 
 
 @st.cache_data
@@ -19,13 +19,11 @@ def carregar_clientes_com_compras():
     Carrega lista de clientes que possuem histórico de compras.
     Retorna um dicionário {label: cliente_id} para uso em selectbox.
     """
-    from data.data_loader import DataLoader
-
-    loader = DataLoader(data_dir="data")
-    clientes, _, compras = loader.load_data()
+    # Consulta indexada no SQLite (sem carregar o histórico de compras)
+    store = get_store()
 
     # Filtrar apenas clientes que têm compras
-    clientes_com_compras = clientes[clientes['cliente_id'].isin(compras['cliente_id'].unique())]
+    clientes_com_compras = store.clientes_com_compras()
 
     # Criar lista para o selectbox
     clientes_options = {}
@@ -69,32 +67,25 @@ def show_cancelamento_prediction():
 
     # Buscar dados do cliente na base
     try:
-        from data.data_loader import DataLoader
-
-        loader = DataLoader(data_dir="data")
-        clientes_df, produtos_df, compras_df = loader.load_data()
+        # Banco compartilhado pelo processo (conexão aberta uma única vez)
+        store = get_store()
 
-        cliente_row = clientes_df[clientes_df['cliente_id'] == cliente_id]
-        if cliente_row.empty:
+        cliente_row = store.get_cliente(cliente_id)
+        if cliente_row is None:
             st.error("Cliente não encontrado na base de clientes.")
             return
 
-        cliente_row = cliente_row.iloc[0]
-
-        # Última compra (se existir)
-        cliente_compras = compras_df[compras_df['cliente_id'] == cliente_id]
+        # Última compra (se existir) - busca pelo índice de cliente_id
+        cliente_compras = store.client_history(cliente_id, with_details=False)
         if not cliente_compras.empty:
-            # tentar ordenar por coluna de data se existir
-            if 'data' in cliente_compras.columns:
-                cliente_compras = cliente_compras.sort_values(by='data', ascending=False)
-            last = cliente_compras.iloc[0]
+            last = cliente_compras.iloc[-1]
             valor = float(last.get('valor', 0.0)) if 'valor' in last.index else 0.0
             quantidade = int(last.get('quantidade', 1)) if 'quantidade' in last.index else 1
             tipo_uva = None
-            if 'produto_id' in last.index and 'produto_id' in produtos_df.columns:
-                prod = produtos_df[produtos_df['produto_id'] == last['produto_id']]
-                if not prod.empty and 'tipo_uva' in prod.columns:
-                    tipo_uva = prod.iloc[0]['tipo_uva']
+            if 'produto_id' in last.index:
+                prod = store.get_produto(last['produto_id'])
+                if prod is not None and 'tipo_uva' in prod.index:
+                    tipo_uva = prod['tipo_uva']
         else:
             valor = 0.0
             quantidade = 1
@@ -156,7 +147,7 @@ def show_cancelamento_prediction():
 
         with st.spinner("Analisando dados..."):
             try:
-                predictor = ChurnPredictor()
+                predictor = get_churn_predictor()
                 result = predictor.predict_churn(customer_data)
 
                 # Mostrar resultado (mesma lógica de antes)
@@ -251,13 +242,18 @@ def show_batch_prediction():
 
             if st.button("🚀 Executar Predições", type="primary"):
                 with st.spinner(f"Processando {len(df)} clientes..."):
-                    predictor = ChurnPredictor()
+                    predictor = get_churn_predictor()
                     results = predictor.predict_batch(df)
 
                     # Mostrar resultados
                     st.divider()
                     st.markdown("### 📊 Resultados")
 
+                    # Linhas que não puderam ser processadas
+                    n_errors = int(results['error'].notna().sum())
+                    if n_errors > 0:
+                        st.warning(f"⚠️ {n_errors} cliente(s) com dados inválidos não foram processados (veja a coluna 'error').")
+
                     # Métricas gerais
                     high_risk = len(results[results['risk_level'] == 'Alto'])
                     medium_risk = len(results[results['risk_level'] == 'Médio'])
@@ -344,8 +340,7 @@ def show_sales_prediction():
         if st.button("🔮 Prever Próxima Compra", type="primary"):
             with st.spinner("Analisando histórico..."):
                 try:
-                    predictor = SalesPredictor()
-                    predictor.load_historical_data(data_path="data")
+                    predictor = get_sales_predictor()
                     result = predictor.predict_next_purchase(cliente_id)
 
                     if 'error' in result:
@@ -413,8 +408,7 @@ def show_sales_prediction():
         if st.button("📊 Prever Receita", type="primary", key="revenue_predict"):
             with st.spinner("Calculando projeções..."):
                 try:
-                    predictor = SalesPredictor()
-                    predictor.load_historical_data(data_path="data")
+                    predictor = get_sales_predictor()
                     result = predictor.predict_revenue(months_ahead=months)
 
                     st.success("✅ Projeção concluída!")
@@ -512,8 +506,7 @@ def show_product_recommendation():
     if st.button("🎯 Gerar Recomendações", type="primary"):
         with st.spinner("Analisando preferências..."):
             try:
-                recommender = ProductRecommender()
-                recommender.load_historical_data(data_path="data")
+                recommender = get_recommender()
                 recommendations = recommender.recommend_products(cliente_id, top_n)
 
                 if not recommendations:
@@ -0,0 +1,107 @@
+"""
+Script para medir o pico de memória do feature engineering (com e sem cópias)
+"""
+import sys
+import argparse
+import time
+import tracemalloc
+from pathlib import Path
+
+# Adicionar src ao path (script está em scripts/, src está na raiz)
+sys.path.append(str(Path(__file__).parent.parent / 'src'))
+
+import pandas as pd
+import numpy as np
+
+# Imports dos módulos personalizados
+from data.data_loader import DataLoader
+from data.feature_engineering import FeatureEngineer
+
+import warnings
+warnings.filterwarnings('ignore')
+
+
+def replicate_data(data: pd.DataFrame, n_rows: int) -> pd.DataFrame:
+    """
+    Replica a base até n_rows registros (clientes distintos em cada réplica)
+
+    Args:
+        data: DataFrame combinado e limpo
+        n_rows: Número de registros desejado
+
+    Returns:
+        DataFrame replicado
+    """
+    n_copies = max(1, int(np.ceil(n_rows / len(data))))
+    big = pd.concat([data] * n_copies, ignore_index=True).iloc[:n_rows]
+
+    replica = np.arange(len(big)) // len(data)
+    big['cliente_id'] = big['cliente_id'].astype(np.int64) + replica * (int(data['cliente_id'].max()) + 1)
+    big['compra_id'] = np.arange(1, len(big) + 1)
+
+    return big
+
+
+def measure(data: pd.DataFrame, copy: bool) -> dict:
+    """
+    Executa engineer_all_features + encode_categorical_features medindo memória
+
+    Args:
+        data: DataFrame de entrada
+        copy: Modo de cópia das etapas
+
+    Returns:
+        Dicionário com pico de memória, memória da saída e tempo
+    """
+    engineer = FeatureEngineer()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    result = engineer.engineer_all_features(data, copy=copy)
+    result = engineer.encode_categorical_features(result, copy=copy)
+
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    novas = [col for col in result.columns if col not in data.columns]
+
+    return {
+        'pico_mb': peak / 1024 ** 2,
+        'novas_features_mb': result[novas].memory_usage(deep=True).sum() / 1024 ** 2,
+        'tempo_s': elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de memória do feature engineering")
+    parser.add_argument('--data-dir', default='data', help="Diretório com os CSVs")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Número de registros replicados")
+    args = parser.parse_args()
+
+    loader = DataLoader(data_dir=args.data_dir)
+    loader.load_data()
+    loader.merge_data()
+    data = replicate_data(loader.clean_data(), args.rows)
+
+    entrada_mb = data.memory_usage(deep=True).sum() / 1024 ** 2
+
+    print("=" * 70)
+    print(f"FEATURE ENGINEERING - {len(data):,} registros, entrada: {entrada_mb:.1f} MB")
+    print("=" * 70)
+
+    for copy in (True, False):
+        resultado = measure(data, copy)
+        modo = "com cópia (copy=True) " if copy else "sem cópia (copy=False)"
+        # O pico do tracemalloc conta apenas o alocado durante a execução (a entrada já existia)
+        print(
+            f"{modo}: pico total {entrada_mb + resultado['pico_mb']:8.1f} MB "
+            f"(entrada + {resultado['pico_mb']:.1f} MB alocados; "
+            f"novas features: {resultado['novas_features_mb']:.1f} MB) | "
+            f"{resultado['tempo_s']:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -30,7 +30,7 @@ def export_processed_data():
 
     # 1. CARREGAR DADOS BRUTOS
     logger.info("\n[1/4] Carregando dados brutos...")
-    data_loader = DataLoader(data_dir="data")
+    data_loader = DataLoader(data_dir="data", use_cache=True)
     data_loader.load_data()
     data_loader.validate_data()
     data = data_loader.merge_data()
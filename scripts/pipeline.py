@@ -15,8 +15,11 @@ from sklearn.model_selection import train_test_split
 from data.data_loader import DataLoader
 from data.eda import ExploratoryAnalysis
 from data.feature_engineering import FeatureEngineer
+from data.feature_store import FeatureStore
 from models.model_trainer import ModelTrainer
 from models.model_evaluation import ModelEvaluator
+from models.artifact import training_fingerprint
+from models.preprocessing import PreprocessingBundle
 from visualization.plots import AdvancedPlotter
 from utils.logger import setup_logger
 from utils.config import Config
@@ -46,6 +49,7 @@ class MLPipeline:
         self.X_test = None
         self.y_train = None
         self.y_test = None
+        self.fill_values = None
 
     def run_data_loading(self):
         """Etapa 1: Carregamento de dados"""
@@ -53,9 +57,21 @@ class MLPipeline:
         self.logger.info("ETAPA 1: CARREGAMENTO DE DADOS")
         self.logger.info("="*60)
 
-        self.data_loader = DataLoader(data_dir=self.config.DATA_DIR)
+        self.data_loader = DataLoader(
+            data_dir=self.config.DATA_DIR,
+            use_cache=self.config.USE_DATA_CACHE,
+            compact=self.config.COMPACT_DTYPES,
+            incremental=self.config.INCREMENTAL_INGESTION,
+            chunk_size=self.config.COMPRAS_CHUNK_SIZE
+        )
         clientes, produtos, compras = self.data_loader.load_data()
 
+        if self.data_loader.ingestion_info:
+            self.logger.info(
+                f"Ingestão {self.data_loader.ingestion_info['modo']}: "
+                f"{self.data_loader.ingestion_info['novas_compras']} compras novas"
+            )
+
         # Validar dados
         self.data_loader.validate_data()
 
@@ -104,12 +120,26 @@ class MLPipeline:
 
         self.feature_engineer = FeatureEngineer()
 
+        # Retreino: calcular apenas as features usadas pelo modelo salvo
+        required_features = None
+        if self.config.PRUNE_FEATURES_MODEL:
+            bundle_path = PreprocessingBundle.path_for_model(self.config.PRUNE_FEATURES_MODEL)
+            if bundle_path.exists():
+                required_features = PreprocessingBundle.load(bundle_path).feature_columns
+                self.logger.info(f"Features limitadas às {len(required_features)} colunas de {bundle_path}")
+            else:
+                self.logger.warning(f"Pré-processamento não encontrado em {bundle_path}: calculando todas as features")
+
         # Aplicar feature engineering
         self.data_processed = self.feature_engineer.engineer_all_features(
             self.data_raw,
             include_temporal=self.config.INCLUDE_TEMPORAL_FEATURES,
             include_aggregated=self.config.INCLUDE_AGGREGATED_FEATURES,
-            include_interactions=self.config.INCLUDE_INTERACTION_FEATURES
+            include_interactions=self.config.INCLUDE_INTERACTION_FEATURES,
+            include_windows=self.config.INCLUDE_WINDOW_FEATURES,
+            n_jobs=self.config.FEATURE_N_JOBS,
+            features=required_features,
+            copy=not self.config.COPY_FREE_FEATURES
         )
 
         self.logger.info(f"Features criadas: {len(self.data_processed.columns)} colunas")
@@ -147,7 +177,8 @@ class MLPipeline:
             self.logger.info("Coluna 'data_compra' removida (já extraímos features temporais dela)")
 
         # Codificar features categóricas
-        X = self.feature_engineer.encode_categorical_features(X)
+        # X é um DataFrame novo (drop acima): a cópia só é necessária no modo padrão
+        X = self.feature_engineer.encode_categorical_features(X, copy=not self.config.COPY_FREE_FEATURES)
 
         # Garantir que todas as colunas são numéricas
         for col in X.columns:
@@ -163,7 +194,8 @@ class MLPipeline:
 
         # Preencher NaN restantes com a média
         numeric_cols = X.select_dtypes(include=[np.number]).columns
-        X[numeric_cols] = X[numeric_cols].fillna(X[numeric_cols].mean())
+        self.fill_values = X[numeric_cols].mean()
+        X[numeric_cols] = X[numeric_cols].fillna(self.fill_values)
 
         # Split train/test
         self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
@@ -201,12 +233,34 @@ class MLPipeline:
 
         # Salvar melhor modelo
         if self.model_trainer.best_model:
+            model_filename = f'best_model_{self.model_trainer.best_model_name.replace(" ", "_")}.pkl'
+            cv_best = cv_results.get(self.model_trainer.best_model_name, {})
             self.model_trainer.save_model(
                 self.model_trainer.best_model,
-                f'best_model_{self.model_trainer.best_model_name.replace(" ", "_")}.pkl',
-                output_dir=self.config.MODELS_DIR
+                model_filename,
+                output_dir=self.config.MODELS_DIR,
+                feature_columns=self.X_train.columns.tolist(),
+                metrics={
+                    'test_accuracy': self.model_trainer.best_score,
+                    'cv_mean_score': cv_best.get('mean_score'),
+                    'cv_std_score': cv_best.get('std_score'),
+                },
+                fingerprint=training_fingerprint(self.X_train, self.y_train)
             )
 
+            # Salvar pré-processamento ajustado junto ao modelo
+            preprocessing = PreprocessingBundle.from_feature_engineer(
+                self.feature_engineer,
+                self.X_train,
+                fill_values=self.fill_values.to_dict()
+            )
+            preprocessing.save(
+                PreprocessingBundle.path_for_model(Path(self.config.MODELS_DIR) / model_filename)
+            )
+
+            # Agregados por cliente/produto usados pelo preditor em tempo real
+            FeatureStore.from_purchases(self.data_raw).save(self.config.FEATURE_STORE_DIR)
+
         return results
 
     def run_model_evaluation(self, results):
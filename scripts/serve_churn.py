@@ -0,0 +1,63 @@
+"""
+Script para iniciar o servidor HTTP local de predição de churn
+
+Exemplo:
+    python scripts/serve_churn.py --port 8765
+    curl -X POST http://127.0.0.1:8765/predict -d '{"cliente_id": 1, "idade": 35, ...}'
+    curl http://127.0.0.1:8765/metrics
+"""
+import sys
+import asyncio
+import argparse
+from pathlib import Path
+
+# Adicionar src ao path (script está em scripts/, src está na raiz)
+sys.path.append(str(Path(__file__).parent.parent / 'src'))
+
+# Imports dos módulos personalizados
+from models.predictor import ChurnPredictor
+from models.server import (ChurnScoringServer, DEFAULT_HOST, DEFAULT_PORT,
+                           DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS)
+from utils.config import Config
+from utils.logger import setup_logger
+
+import warnings
+warnings.filterwarnings('ignore')
+
+
+def main():
+    config = Config()
+
+    parser = argparse.ArgumentParser(description="Servidor local de predição de churn (micro-batching)")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="Endereço de escuta")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Porta de escuta")
+    parser.add_argument('--model', default=f"{config.MODELS_DIR}/best_model_Gradient_Boosting.pkl",
+                        help="Caminho do modelo treinado")
+    parser.add_argument('--feature-store', default=config.FEATURE_STORE_DIR,
+                        help="Diretório do feature store ('' = não usar)")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help="Máximo de clientes por lote")
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="Espera máxima para completar um lote (ms)")
+    args = parser.parse_args()
+
+    # Logger do pacote models (inclui os logs de models.server e models.predictor)
+    logger = setup_logger('models', log_dir=config.LOGS_DIR)
+
+    predictor = ChurnPredictor(model_path=args.model, feature_store_path=args.feature_store or None)
+    server = ChurnScoringServer(
+        predictor,
+        host=args.host,
+        port=args.port,
+        max_batch_size=args.max_batch,
+        max_wait_ms=args.max_wait_ms,
+    )
+
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        logger.info("Servidor interrompido pelo usuário")
+
+
+if __name__ == "__main__":
+    main()
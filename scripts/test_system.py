@@ -120,6 +120,933 @@ def test_visualization():
         return False
 
 
+def test_tree_engine():
+    """Testa o motor compilado de árvores contra o predict_proba do sklearn"""
+    print("\n" + "="*60)
+    print("TESTE 4: Motor Compilado de Árvores")
+    print("="*60)
+
+    try:
+        import numpy as np
+        from sklearn.datasets import make_classification
+        from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier, GradientBoostingClassifier
+        from sklearn.tree import DecisionTreeClassifier
+        from models.tree_engine import CompiledTreeEnsemble
+
+        X, y = make_classification(n_samples=600, n_features=12, random_state=42)
+        # Escalas variadas: limiares que não são representáveis exatamente em float32
+        X = X * np.logspace(-3, 4, X.shape[1])
+
+        models = {
+            'Decision Tree': DecisionTreeClassifier(random_state=42),
+            'Random Forest': RandomForestClassifier(n_estimators=30, random_state=42),
+            'Extra Trees': ExtraTreesClassifier(n_estimators=30, random_state=42),
+            'Gradient Boosting': GradientBoostingClassifier(n_estimators=50, random_state=42),
+        }
+
+        for name, model in models.items():
+            model.fit(X, y)
+            engine = CompiledTreeEnsemble.from_model(model)
+
+            diff = np.abs(engine.predict_proba(X, block_size=128) - model.predict_proba(X)).max()
+            assert diff < 1e-9, f"{name}: diferença máxima {diff}"
+            assert (engine.predict(X[:1]) == model.predict(X[:1])).all()
+            print(f"✓ {name}: diferença máxima {diff:.2e}")
+
+        # Modelos sem árvores são recusados
+        from sklearn.dummy import DummyClassifier
+        try:
+            CompiledTreeEnsemble.from_model(DummyClassifier().fit(X, y))
+            raise AssertionError("DummyClassifier aceito pelo motor compilado")
+        except ValueError:
+            print("✓ Modelo não suportado recusado")
+
+        return True
+
+    except Exception as e:
+        print(f"✗ ERRO: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_incremental_ingestion():
+    """Testa a ingestão incremental de compras com IDs fora de ordem"""
+    print("\n" + "="*60)
+    print("TESTE 5: Ingestão Incremental de Compras")
+    print("="*60)
+
+    try:
+        import shutil
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            for arquivo in DataLoader.SOURCE_FILES.values():
+                shutil.copy(Path("data") / arquivo, tmp / arquivo)
+
+            loader = DataLoader(data_dir=str(tmp), use_cache=True, incremental=True)
+            _, _, compras = loader.load_data()
+            loader.merge_data()
+            total = len(compras)
+            maior_id = int(compras['compra_id'].max())
+            linha = compras.iloc[0]
+
+            def compra(compra_id: int) -> str:
+                return (f"{compra_id};{linha['cliente_id']};{linha['produto_id']};"
+                        f"{linha['valor']};{linha['quantidade']};{linha['data_compra']}")
+
+            # Arquivo delta com ID acima de todos os já ingeridos
+            delta_path = tmp / "delta.csv"
+            delta_path.write_text(f"{';'.join(compras.columns)}\n{compra(maior_id + 100)}\n",
+                                  encoding='utf-8')
+            loader.refresh_compras(str(delta_path))
+            assert len(loader.compras) == total + 1, "compra do arquivo delta não ingerida"
+
+            # O merge em cache é invalidado pelas compras ingeridas (mesmo loader e loader novo)
+            assert len(loader.merge_data()) == total + 1, "merge em cache sem a compra do arquivo delta"
+            novo_loader = DataLoader(data_dir=str(tmp), use_cache=True, incremental=True)
+            novo_loader.load_data()
+            assert len(novo_loader.merge_data()) == total + 1
+
+            # Compra nova no CSV com ID menor que o do arquivo delta
+            with open(tmp / DataLoader.SOURCE_FILES['compras'], 'a', encoding='utf-8') as f:
+                f.write(f"\n{compra(maior_id + 3)}\n")
+            leituras = loader.cache.hits
+            novas = loader.refresh_compras()
+            assert len(novas) == 1, f"compra com ID fora de ordem descartada ({len(novas)} novas)"
+            assert len(loader.compras) == total + 2
+            # Apenas a parte nova é gravada: a tabela acumulada não é relida do cache
+            assert loader.cache.hits == leituras, "tabela acumulada relida na atualização incremental"
+            assert len(novo_loader.ingestor.load_store()) == total + 2
+
+            # Reenvio do mesmo arquivo delta não duplica a compra
+            assert len(loader.refresh_compras(str(delta_path))) == 0
+            print(f"✓ Compras fora de ordem ingeridas: {len(loader.compras)} registros")
+
+            # CSV reescrito (recarga completa): a compra do arquivo delta é preservada
+            csv_path = tmp / DataLoader.SOURCE_FILES['compras']
+            csv_path.write_text(csv_path.read_text(encoding='utf-8').replace('\n', '\r\n'), encoding='utf-8')
+            loader.refresh_compras()
+            assert loader.ingestion_info['modo'] == 'completo'
+            assert (loader.compras['compra_id'] == maior_id + 100).sum() == 1, "compra do arquivo delta perdida"
+            assert len(loader.compras) == total + 2
+            print("✓ Compras de arquivos delta preservadas na recarga completa")
+
+        return True
+
+    except Exception as e:
+        print(f"✗ ERRO: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_chunked_aggregation():
+    """Testa a agregação em blocos com estados parciais combináveis"""
+    print("\n" + "="*60)
+    print("TESTE 6: Agregação em Blocos")
+    print("="*60)
+
+    try:
+        import shutil
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        from data.partial_aggregates import AggregateState
+
+        loader = DataLoader(data_dir="data")
+        _, _, compras = loader.load_data()
+
+        # Estados de blocos combinados (Chan) = estado do histórico inteiro
+        inteiro = AggregateState.from_frame(compras)
+        blocos = AggregateState.from_chunks(compras.iloc[i:i + 7] for i in range(0, len(compras), 7))
+        for col in ['n_valor', 'soma', 'media', 'm2', 'itens', 'compras']:
+            np.testing.assert_allclose(blocos.clientes.loc[inteiro.clientes.index, col],
+                                       inteiro.clientes[col], rtol=1e-9, atol=1e-9)
+        esperado = compras.groupby('cliente_id')['valor'].std()
+        obtido = blocos.client_features()['std_gasto'].loc[esperado.index]
+        np.testing.assert_allclose(obtido, esperado, rtol=1e-9)
+        print(f"✓ Estados combinados de {-(-len(compras) // 7)} blocos conferem com o histórico inteiro")
+
+        # Bloco vazio (ex.: só compras órfãs descartadas)
+        vazio = AggregateState.from_frame(compras.head(0))
+        assert len(vazio.clientes) == 0 and len(vazio.produtos) == 0
+        assert len(vazio.merge(inteiro).clientes) == len(inteiro.clientes)
+        print("✓ Bloco vazio gera estado vazio")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            for arquivo in DataLoader.SOURCE_FILES.values():
+                shutil.copy(Path("data") / arquivo, tmp / arquivo)
+
+            # Último bloco formado apenas por compras de um cliente inexistente
+            maior_id = int(compras['compra_id'].max())
+            linha = compras.iloc[0]
+            with open(tmp / DataLoader.SOURCE_FILES['compras'], 'a', encoding='utf-8') as f:
+                for i in range(1, 4):
+                    f.write(f"\n{maior_id + i};999999;{linha['produto_id']};10.0;1;{linha['data_compra']}")
+
+            referencia = loader.aggregate_compras(chunksize=len(compras), drop_orphans=True)
+            orfas = loader.stream_stats['clientes_invalidos']
+
+            stream_loader = DataLoader(data_dir=str(tmp))
+            estado = stream_loader.aggregate_compras(chunksize=len(compras), drop_orphans=True)
+            assert stream_loader.stream_stats['blocos'] == 2
+            assert stream_loader.stream_stats['clientes_invalidos'] == orfas + 3
+            assert 999999 not in estado.clientes.index
+            pd.testing.assert_frame_equal(estado.clientes.sort_index(), referencia.clientes.sort_index())
+            print("✓ Bloco só com compras órfãs descartado sem erro")
+
+        return True
+
+    except Exception as e:
+        print(f"✗ ERRO: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_feature_store():
+    """Testa o feature store online (Welford, lote, IDs esparsos e persistência)"""
+    print("\n" + "="*60)
+    print("TESTE 7: Feature Store Online")
+    print("="*60)
+
+    try:
+        import tempfile
+        import numpy as np
+        from data.feature_store import FeatureStore
+
+        loader = DataLoader(data_dir="data")
+        _, _, compras = loader.load_data()
+        ids = np.unique(compras['cliente_id'])
+
+        # Compra a compra (Welford) = lote (Chan) = groupby do pandas
+        lote = FeatureStore.from_purchases(compras)
+        online = FeatureStore()
+        for compra in compras.itertuples():
+            online.update(compra.cliente_id, compra.produto_id, compra.valor,
+                          compra.quantidade, compra.data_compra)
+
+        por_lote = lote.client_features(ids)
+        por_compra = online.client_features(ids)
+        for col in por_lote:
+            np.testing.assert_allclose(por_compra[col], por_lote[col], rtol=1e-9, err_msg=col)
+        esperado = compras.groupby('cliente_id')['valor'].agg(['sum', 'std']).loc[ids]
+        np.testing.assert_allclose(por_lote['total_gasto'], esperado['sum'], rtol=1e-9)
+        np.testing.assert_allclose(por_lote['std_gasto'], esperado['std'], rtol=1e-9)
+        print(f"✓ Atualização por compra e em lote conferem com o groupby ({len(ids)} clientes)")
+
+        # ID muito grande: memória proporcional ao número de clientes
+        online.update(10**12, 1, 50.0, 2, '2024-01-01')
+        assert len(online.clientes) == len(ids) + 1
+        assert all(array.nbytes < 1024 * 1024 for array in online.clientes.arrays.values())
+        assert online.client_features([10**12, 10**12 + 1])['frequencia'].tolist() == [1, 0]
+        print("✓ IDs esparsos não aumentam os arrays de estado")
+
+        # Recência até a data de referência; store salvo, recarregado e atualizado
+        recencia = online.client_features([10**12], as_of='2024-01-11')['recencia'][0]
+        assert recencia == 10, f"recência {recencia}"
+        with tempfile.TemporaryDirectory() as tmp:
+            online.save(tmp)
+            carregado = FeatureStore.load(tmp)
+            carregado.update(10**12, 1, 30.0, 1, '2024-01-05')
+            features = carregado.client_features([10**12])
+            assert features['frequencia'][0] == 2 and features['total_gasto'][0] == 80.0
+        print("✓ Recência por data de referência e store recarregado atualizável")
+
+        return True
+
+    except Exception as e:
+        print(f"✗ ERRO: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_data_cache():
+    """Testa o cache colunar em disco do DataLoader"""
+    print("\n" + "="*60)
+    print("TESTE 8: Cache em Disco")
+    print("="*60)
+
+    try:
+        import os
+        import shutil
+        import tempfile
+        import pandas as pd
+
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            for arquivo in DataLoader.SOURCE_FILES.values():
+                shutil.copy(Path("data") / arquivo, tmp / arquivo)
+
+            for compact in (False, True):
+                referencia = DataLoader(data_dir=str(tmp), compact=compact)
+                tabelas = referencia.load_data()
+                merged = referencia.merge_data()
+
+                DataLoader(data_dir=str(tmp), use_cache=True, compact=compact).load_data()
+                loader = DataLoader(data_dir=str(tmp), use_cache=True, compact=compact)
+                for esperado, obtido in zip(tabelas, loader.load_data()):
+                    pd.testing.assert_frame_equal(obtido, esperado)
+                assert loader.cache.hits == 3, f"{loader.cache.hits} leituras do cache"
+                loader.merge_data()
+                pd.testing.assert_frame_equal(loader.merge_data(), merged)
+
+            arquivos = [path.suffix for path in (tmp / '.cache').iterdir()]
+            assert '.parquet' in arquivos and '.pkl' not in arquivos
+            print("✓ Tabelas lidas do cache Parquet idênticas às do CSV (normal e compacto)")
+
+            # Mesmo conteúdo com data de modificação nova: cache aproveitado
+            clientes = tmp / DataLoader.SOURCE_FILES['clientes']
+            os.utime(clientes, ns=(clientes.stat().st_atime_ns, clientes.stat().st_mtime_ns + 10**9))
+            loader = DataLoader(data_dir=str(tmp), use_cache=True)
+            loader.load_data()
+            assert loader.cache.hits == 3
+
+            # Conteúdo alterado: entrada invalidada
+            with open(clientes, 'a', encoding='utf-8') as f:
+                f.write("\n")
+            loader = DataLoader(data_dir=str(tmp), use_cache=True)
+            loader.load_data()
+            assert loader.cache.hits == 2 and loader.cache.misses == 1
+            print("✓ Cache invalidado apenas quando o conteúdo dos CSVs muda")
+
+        return True
+
+    except Exception as e:
+        print(f"✗ ERRO: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_parallel_features():
+    """Testa o feature engineering paralelo contra o serial"""
+    print("\n" + "="*60)
+    print("TESTE 9: Feature Engineering Paralelo")
+    print("="*60)
+
+    try:
+        import numpy as np
+        import pandas as pd
+        from data.feature_engineering import FeatureEngineer
+
+        loader = DataLoader(data_dir="data")
+        loader.load_data()
+        loader.merge_data()
+        data = loader.clean_data()
+        original = data.copy()
+
+        for copy in (True, False):
+            serial = FeatureEngineer().engineer_all_features(data, copy=copy, include_windows=True, n_jobs=1)
+            paralelo = FeatureEngineer().engineer_all_features(data, copy=copy, include_windows=True, n_jobs=2)
+            pd.testing.assert_frame_equal(paralelo, serial)
+
+            # copy=False compartilha as colunas de entrada nos dois caminhos
+            compartilha = np.shares_memory(paralelo['valor'].to_numpy(), data['valor'].to_numpy())
+            assert compartilha == (not copy), f"copy={copy}: memória compartilhada = {compartilha}"
+            print(f"✓ copy={copy}: n_jobs=2 igual a n_jobs=1 ({len(serial.columns)} colunas)")
+
+        pd.testing.assert_frame_equal(data, original)
+        print("✓ Dados de entrada inalterados")
+
+        return True
+
+    except Exception as e:
+        print(f"✗ ERRO: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_streaming_compras():
+    """Testa a leitura de Compras.csv em blocos"""
+    print("\n" + "="*60)
+    print("TESTE 10: Leitura de Compras em Blocos")
+    print("="*60)
+
+    try:
+        import pandas as pd
+
+        referencia = DataLoader(data_dir="data")
+        _, _, compras = referencia.load_data()
+        merged = referencia.merge_data()
+        merged = merged.assign(data_compra=pd.to_datetime(merged['data_compra']))
+
+        # Tamanho do bloco configurado no loader (COMPRAS_CHUNK_SIZE no pipeline)
+        loader = DataLoader(data_dir="data", chunk_size=13)
+        blocos = list(loader.iter_compras())
+        assert all(len(bloco) <= 13 for bloco in blocos)
+        assert loader.stream_stats['blocos'] == -(-len(compras) // 13)
+        assert loader.stream_stats['compras_lidas'] == len(compras)
+        print(f"✓ {len(blocos)} blocos de até 13 compras")
+
+        # Blocos combinados = merge do histórico inteiro
+        pd.testing.assert_frame_equal(pd.concat(blocos, ignore_index=True), merged.reset_index(drop=True))
+        print("✓ Blocos enriquecidos iguais ao merge completo")
+
+        return True
+
+    except Exception as e:
+        print(f"✗ ERRO: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_compact_schema():
+    """Testa o schema de tipos compactos"""
+    print("\n" + "="*60)
+    print("TESTE 11: Schema de Tipos Compactos")
+    print("="*60)
+
+    try:
+        import logging
+        import numpy as np
+        import pandas as pd
+        from data.schema import apply_schema, flags_to_labels, memory_report
+
+        normal = DataLoader(data_dir="data")
+        normal.load_data()
+        merged = normal.merge_data()
+
+        compacto = DataLoader(data_dir="data", compact=True)
+        compacto.load_data()
+        merged_compacto = compacto.merge_data()
+
+        assert isinstance(merged_compacto['cidade'].dtype, pd.CategoricalDtype)
+        assert merged_compacto['valor'].dtype == np.float32
+        assert memory_report(merged_compacto)['total_mb'] < memory_report(merged)['total_mb']
+        np.testing.assert_allclose(merged_compacto['valor'], merged['valor'], rtol=1e-6)
+        print(f"✓ Merge compacto: {memory_report(merged_compacto)['total_mb']:.3f} MB "
+              f"(normal: {memory_report(merged)['total_mb']:.3f} MB)")
+
+        # Flags Sim/Não: booleano e volta aos rótulos; valores fora do mapa viram NA com aviso
+        flags = pd.DataFrame({'assinante_clube': ['Sim', 'Não', 'Talvez', None]})
+        avisos = []
+        handler = logging.Handler()
+        handler.emit = avisos.append
+        logging.getLogger('data.schema').addHandler(handler)
+        try:
+            apply_schema(flags)
+        finally:
+            logging.getLogger('data.schema').removeHandler(handler)
+        assert flags['assinante_clube'].tolist()[:2] == [True, False]
+        assert flags['assinante_clube'].isna().sum() == 2
+        assert any('Talvez' in aviso.getMessage() for aviso in avisos), "valor fora do mapa sem aviso"
+        rotulos = flags_to_labels(pd.DataFrame({'assinante_clube': [True, False]}))
+        assert rotulos['assinante_clube'].tolist() == ['Sim', 'Não']
+        print("✓ Flags Sim/Não convertidas (valores desconhecidos avisados)")
+
+        # IDs com lacunas (chaves órfãs) não quebram a conversão inteira
+        ids = apply_schema(pd.DataFrame({'cliente_id': [1, None, 3]}))
+        assert ids['cliente_id'].dtype == np.float32
+        print("✓ IDs com lacunas mantidos em float32")
+
+        return True
+
+    except Exception as e:
+        print(f"✗ ERRO: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_sqlite_store():
+    """Testa o banco SQLite com consultas indexadas"""
+    print("\n" + "="*60)
+    print("TESTE 12: Banco SQLite")
+    print("="*60)
+
+    try:
+        import shutil
+        import tempfile
+        import pandas as pd
+
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            for arquivo in DataLoader.SOURCE_FILES.values():
+                shutil.copy(Path("data") / arquivo, tmp / arquivo)
+
+            referencia = DataLoader(data_dir=str(tmp))
+            clientes, _, compras = referencia.load_data()
+            merged = referencia.merge_data()
+            merged['data_compra'] = pd.to_datetime(merged['data_compra'])
+
+            store = DataLoader(data_dir=str(tmp), use_cache=True).get_store()
+
+            # Histórico de um cliente: mesmas linhas e colunas do merge em memória
+            cadastrados = compras[compras['cliente_id'].isin(clientes['cliente_id'])]
+            cliente_id = int(cadastrados['cliente_id'].value_counts().index[0])
+            esperado = (merged[merged['cliente_id'] == cliente_id]
+                        .sort_values(['data_compra', 'compra_id']).reset_index(drop=True))
+            pd.testing.assert_frame_equal(store.client_history(cliente_id), esperado, check_dtype=False)
+            print(f"✓ Histórico do cliente {cliente_id}: {len(esperado)} compras iguais ao merge")
+
+            # Agregados e intervalo de datas calculados pelo banco
+            stats = store.product_stats()
+            por_produto = compras.groupby('produto_id').agg(
+                num_compras=('compra_id', 'count'), receita=('valor', 'sum')).reset_index()
+            pd.testing.assert_frame_equal(stats[['produto_id', 'num_compras', 'receita']], por_produto,
+                                          check_dtype=False)
+            datas = pd.to_datetime(compras['data_compra'])
+            periodo = store.purchases_between('2023-03-01', '2023-06-30')
+            assert len(periodo) == ((datas >= '2023-03-01') & (datas <= '2023-06-30')).sum()
+            print("✓ Estatísticas por produto e compras por período conferem")
+
+            # CSV alterado: banco reconstruído
+            assert store.is_current(referencia._source_paths())
+            with open(tmp / DataLoader.SOURCE_FILES['compras'], 'a', encoding='utf-8') as f:
+                f.write(f"\n{int(compras['compra_id'].max()) + 1};{cliente_id};1;10.0;1;2024-01-01\n")
+            assert not store.is_current(referencia._source_paths())
+            store.close()
+            store = DataLoader(data_dir=str(tmp), use_cache=True).get_store()
+            assert len(store.client_history(cliente_id)) == len(esperado) + 1
+            store.close()
+            print("✓ Banco reconstruído quando o CSV muda")
+
+        return True
+
+    except Exception as e:
+        print(f"✗ ERRO: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_calendar_table():
+    """Testa a tabela de calendário das features temporais"""
+    print("\n" + "="*60)
+    print("TESTE 13: Tabela de Calendário")
+    print("="*60)
+
+    try:
+        import numpy as np
+        import pandas as pd
+        from data.calendar_features import CalendarTable, TEMPORAL_FEATURES
+
+        datas = pd.Series([pd.Timestamp('2023-01-01 10:30'), pd.Timestamp('2023-01-01'), pd.NaT,
+                           pd.Timestamp('2023-12-31'), pd.Timestamp('2024-02-29'), pd.Timestamp('2023-12-31')])
+        calendario = CalendarTable()
+        features = calendario.features(datas)
+
+        # Mesmo resultado do cálculo direto com os acessores .dt
+        esperado = {
+            'ano': datas.dt.year, 'mes': datas.dt.month, 'dia': datas.dt.day,
+            'dia_semana': datas.dt.dayofweek, 'trimestre': datas.dt.quarter,
+            'semana_ano': datas.dt.isocalendar().week,
+            'mes_sin': np.sin(2 * np.pi * datas.dt.month / 12),
+            'dia_semana_cos': np.cos(2 * np.pi * datas.dt.dayofweek / 7),
+        }
+        for col, valores in esperado.items():
+            obtido = pd.Series(features[col], dtype='float64')
+            np.testing.assert_allclose(obtido, valores.astype('float64'), err_msg=col)
+        print("✓ Features iguais às calculadas por linha (NaT -> ausente)")
+
+        # Uma linha por dia distinto; consultas seguintes reaproveitam a tabela
+        assert len(calendario.table) == 3, f"{len(calendario.table)} datas na tabela"
+        linha = calendario.row('2023-12-31 23:59')
+        assert set(linha) == set(TEMPORAL_FEATURES) and linha['dia_semana'] == 6
+        assert len(calendario.table) == 3
+        calendario.row('2025-06-15')
+        assert len(calendario.table) == 4
+        print("✓ Uma linha por dia, acrescentada apenas para datas novas")
+
+        return True
+
+    except Exception as e:
+        print(f"✗ ERRO: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_feature_selection():
+    """Testa a seleção de features com cache de scores e subamostragem"""
+    print("\n" + "="*60)
+    print("TESTE 14: Seleção de Features")
+    print("="*60)
+
+    try:
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        from sklearn.feature_selection import SelectKBest, f_classif
+        from data.feature_selection import FeatureSelector
+
+        rng = np.random.default_rng(0)
+        y = pd.Series(rng.integers(0, 2, 2000))
+        X = pd.DataFrame(rng.normal(size=(2000, 8)), columns=[f'f{i}' for i in range(8)])
+        X['f2'] += y * 2.0
+        X['f5'] += y * 0.5
+        X['constante'] = 1.0
+
+        # Sem subamostragem: mesma seleção do SelectKBest
+        with tempfile.TemporaryDirectory() as tmp:
+            seletor = FeatureSelector(cache_dir=tmp)
+            selecionadas = seletor.select(X, y, k=3)
+            esperadas = X.columns[SelectKBest(f_classif, k=3).fit(X, y).get_support()].tolist()
+            assert selecionadas == esperadas, f"{selecionadas} != {esperadas}"
+            assert {'f2', 'f5'} <= set(selecionadas)
+            print(f"✓ Seleção igual à do SelectKBest: {selecionadas}")
+
+            # Outro k nos mesmos dados reaproveita os scores (memória e disco)
+            seletor.select(X, y, k=5)
+            assert (seletor.hits, seletor.misses) == (1, 1)
+            outro = FeatureSelector(cache_dir=tmp)
+            outro.score(X, y)
+            assert (outro.hits, outro.misses) == (1, 0)
+            pd.testing.assert_frame_equal(outro.scores_, seletor.scores_)
+            print("✓ Scores reaproveitados do cache em memória e em disco")
+
+        # Dados diferentes invalidam o cache
+        seletor.score(X.assign(f0=X['f0'] + 1), y)
+        assert seletor.misses == 2
+
+        # Com subamostragem: uma coluna de scores por subamostra
+        amostrado = FeatureSelector(sample_size=500, n_repeats=4)
+        scores = amostrado.score(X, y)
+        assert list(scores.columns) == [f'amostra_{i}' for i in range(4)]
+        assert {'f2', 'f5'} <= set(amostrado.select(X, y, k=3))
+        relatorio = amostrado.stability_report(k=3)
+        assert relatorio.index[0] == 'f2' and relatorio.loc['f2', 'freq_top_k'] == 1.0
+        print("✓ Subamostras estratificadas com relatório de estabilidade")
+
+        return True
+
+    except Exception as e:
+        print(f"✗ ERRO: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_categorical_encoder():
+    """Testa o codificador de categorias com vocabulário congelado"""
+    print("\n" + "="*60)
+    print("TESTE 15: Codificação de Categorias")
+    print("="*60)
+
+    try:
+        import numpy as np
+        import pandas as pd
+        from sklearn.preprocessing import LabelEncoder
+        from data.categorical_encoding import CategoricalEncoder, MISSING_LABEL, UNKNOWN_CODE
+
+        treino = pd.Series(['SP', 'RJ', None, 'MG', 'SP', 'RJ', 10])
+
+        # Mesmos códigos do LabelEncoder sobre os rótulos em texto
+        encoder = CategoricalEncoder()
+        codigos = encoder.fit_transform(treino)
+        rotulos = [MISSING_LABEL if pd.isna(valor) else str(valor) for valor in treino]
+        referencia = LabelEncoder().fit(rotulos)
+        assert list(encoder.classes_) == list(referencia.classes_)
+        assert np.array_equal(codigos, referencia.transform(rotulos))
+        print(f"✓ Códigos iguais aos do LabelEncoder: {list(encoder.classes_)}")
+
+        # Categorias não vistas recebem o código reservado, sem erro
+        novos = pd.Series(['SP', 'BA', None, 'AM'])
+        obtido = encoder.transform(novos)
+        assert list(obtido) == [encoder.lookup['SP'], UNKNOWN_CODE, encoder.lookup['nan'], UNKNOWN_CODE]
+        assert list(encoder.transform(novos, unknown_code=99))[1] == 99
+        print("✓ Categorias não vistas -> código reservado")
+
+        # O vocabulário fica congelado e sobrevive à serialização
+        assert len(encoder.classes_) == 5
+        for copia in (CategoricalEncoder.from_dict(encoder.to_dict()),
+                      CategoricalEncoder.from_lookup(encoder.lookup)):
+            assert np.array_equal(copia.transform(novos), obtido)
+        print("✓ Vocabulário congelado e recriado por to_dict/from_lookup")
+
+        try:
+            CategoricalEncoder().transform(novos)
+            raise AssertionError("transform sem fit deveria falhar")
+        except ValueError:
+            pass
+
+        return True
+
+    except Exception as e:
+        print(f"✗ ERRO: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_interaction_store():
+    """Testa a matriz esparsa de interações e a inserção incremental no CSR"""
+    print("\n" + "="*60)
+    print("TESTE 16: Matriz de Interações")
+    print("="*60)
+
+    try:
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        from data.interaction_store import InteractionStore
+
+        rng = np.random.default_rng(0)
+        n = 3000
+        compras = pd.DataFrame({
+            'cliente_id': rng.integers(0, 200, n),
+            'produto_id': rng.integers(0, 50, n),
+            'valor': np.where(rng.random(n) < 0.1, np.nan, rng.uniform(1, 100, n).round(2)),
+            'quantidade': rng.integers(1, 5, n).astype(float),
+            'data_compra': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 365, n), unit='D'),
+        })
+        completo = InteractionStore.from_purchases(compras)
+
+        def iguais(a, b):
+            for campo in ('compras', 'n_valor', 'valor', 'quantidade'):
+                diff = a.matrix(campo) - b.matrix(campo)
+                assert diff.nnz == 0 or abs(diff).max() < 1e-9, campo
+            assert a.nnz == b.nnz and np.array_equal(np.asarray(a.indptr), np.asarray(b.indptr))
+            for campo in a.rows:
+                assert np.array_equal(np.asarray(a.rows[campo]), np.asarray(b.rows[campo])), campo
+
+        # Construção em blocos = construção única
+        iguais(InteractionStore.from_chunks([compras.iloc[:1000], compras.iloc[1000:]]), completo)
+        print(f"✓ Construção em blocos igual à completa ({completo.nnz} pares)")
+
+        # Lotes incrementais (pares novos inseridos, existentes somados), inclusive sobre memory-map
+        with tempfile.TemporaryDirectory() as tmp:
+            InteractionStore.from_purchases(compras.iloc[:2000]).save(tmp)
+            incremental = InteractionStore.load(tmp)
+            incremental.update_batch(compras.iloc[2000:2900])
+            for _, linha in compras.iloc[2900:].iterrows():
+                incremental.update(linha.to_dict())
+        iguais(incremental, completo)
+        assert incremental.version == 1 + len(compras) - 2900
+        print("✓ update_batch/update sobre matriz mapeada iguais à reconstrução")
+
+        # Novos clientes e produtos além do tamanho atual expandem a matriz
+        incremental.update({'cliente_id': 500, 'produto_id': 80, 'valor': 10.0,
+                            'quantidade': 2.0, 'data_compra': '2024-03-01'})
+        assert incremental.n_rows == 501 and incremental.n_cols == 81
+        assert incremental.client_summary(500)['primeira_data'] == pd.Timestamp('2024-03-01')
+
+        # Consultas conferem com o cálculo direto no histórico
+        cliente = int(compras['cliente_id'].iloc[0])
+        historico = compras[compras['cliente_id'] == cliente]
+        resumo = completo.client_summary(cliente)
+        assert resumo['compras'] == len(historico)
+        assert np.isclose(resumo['valor_total'], historico['valor'].sum())
+        assert resumo['ultima_data'] == historico['data_compra'].max()
+        contagem = compras['produto_id'].value_counts()
+        assert completo.product_totals()['compras'].astype(int).to_dict() == contagem.to_dict()
+        assert completo.client_summary(9999) is None
+        print("✓ Resumo do cliente e totais por produto conferem com o histórico")
+
+        return True
+
+    except Exception as e:
+        print(f"✗ ERRO: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_serving_cache():
+    """Testa o cache de serviço compartilhado entre threads"""
+    print("\n" + "="*60)
+    print("TESTE 17: Cache de Serviço")
+    print("="*60)
+
+    try:
+        import shutil
+        import tempfile
+        import threading
+        from models.serving import get_serving_cache, get_store
+
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            for arquivo in DataLoader.SOURCE_FILES.values():
+                shutil.copy(Path("data") / arquivo, tmp / arquivo)
+
+            cache = get_serving_cache()
+            chave = f"store:{tmp}"
+            cliente_id = int(DataLoader(data_dir=str(tmp)).load_data()[2]['cliente_id'].iloc[0])
+
+            # Requisições simultâneas: um único carregamento, uma conexão por thread
+            stores, historicos, erros = [], [], []
+            inicio = threading.Barrier(8)
+
+            def requisicao():
+                try:
+                    inicio.wait()
+                    store = get_store(str(tmp))
+                    stores.append(store)
+                    historicos.append(len(store.client_history(cliente_id)))
+                except Exception as e:
+                    erros.append(e)
+
+            threads = [threading.Thread(target=requisicao) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            assert not erros, erros
+            store = stores[0]
+            assert all(s is store for s in stores) and len(set(historicos)) == 1
+            metricas = cache.metrics()[chave]
+            assert (metricas['carregamentos'], metricas['acertos']) == (1, 7), metricas
+            assert len(store._connections) == 8
+            print(f"✓ 8 threads: 1 carregamento, 7 acertos e {len(store._connections)} conexões")
+
+            # CSV alterado: a próxima requisição recarrega o banco
+            with open(tmp / DataLoader.SOURCE_FILES['compras'], 'a', encoding='utf-8') as f:
+                f.write(f"\n999999;{cliente_id};1;10.0;1;2024-01-01\n")
+            novo = get_store(str(tmp))
+            assert novo is not store and cache.metrics()[chave]['recargas'] == 1
+            assert len(novo.client_history(cliente_id)) == historicos[0] + 1
+            print("✓ Arquivos alterados: entrada recarregada")
+
+            store.close()
+            novo.close()
+            cache.invalidate(chave)
+            assert not cache.metrics()[chave]['em_cache']
+
+        return True
+
+    except Exception as e:
+        print(f"✗ ERRO: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_model_artifact():
+    """Testa o artefato do modelo com arrays em memory-map"""
+    print("\n" + "="*60)
+    print("TESTE 18: Artefato do Modelo")
+    print("="*60)
+
+    try:
+        import tempfile
+        import joblib
+        import numpy as np
+        import pandas as pd
+        from sklearn.datasets import make_classification
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.linear_model import LogisticRegression
+        from models.artifact import ModelArtifact, training_fingerprint
+
+        X, y = make_classification(n_samples=400, n_features=6, random_state=42)
+        X = pd.DataFrame(X, columns=[f'f{i}' for i in range(6)])
+        model = RandomForestClassifier(n_estimators=20, random_state=42).fit(X, y)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            model_path = Path(tmp) / 'best_model_Random_Forest.pkl'
+            fingerprint = training_fingerprint(X, y)
+            ModelArtifact.save(model, model_path, metrics={'auc': np.float64(0.9)}, fingerprint=fingerprint)
+            assert ModelArtifact.is_current(model_path)
+
+            # Carga sem desserializar o sklearn; arrays do motor mapeados do disco
+            artifact = ModelArtifact.load(model_path)
+            assert not artifact.model_loaded
+            assert any(isinstance(array, np.memmap) for array in vars(artifact.engine).values())
+            assert artifact.metadata['feature_columns'] == list(X.columns)
+            assert artifact.metadata['training_fingerprint'] == fingerprint
+            assert artifact.metadata['metrics'] == {'auc': 0.9}
+            diff = np.abs(artifact.engine.predict_proba(X) - model.predict_proba(X)).max()
+            assert diff < 1e-9 and not artifact.model_loaded
+            print("✓ Artefato carregado com motor em memory-map, sem desserializar o modelo")
+
+            # Modelo sklearn carregado apenas no primeiro acesso
+            assert (artifact.model.predict(X) == model.predict(X)).all() and artifact.model_loaded
+            print("✓ Modelo sklearn carregado sob demanda")
+
+            # Pickle regravado sem o artefato: artefato desatualizado
+            joblib.dump(RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y), model_path)
+            assert not ModelArtifact.is_current(model_path)
+            print("✓ Artefato desatualizado detectado após troca do pickle")
+
+            # Modelos sem árvores: artefato só com metadados
+            linear_path = Path(tmp) / 'best_model_Logistic_Regression.pkl'
+            ModelArtifact.save(LogisticRegression().fit(X, y), linear_path)
+            assert ModelArtifact.load(linear_path).engine is None
+            assert ModelArtifact.is_current(linear_path)
+
+            # Dados de treino diferentes mudam a impressão digital
+            assert training_fingerprint(X.assign(f0=X['f0'] * 2), y) != fingerprint
+
+        return True
+
+    except Exception as e:
+        print(f"✗ ERRO: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_prediction_cache():
+    """Testa o cache de predições (LRU + TTL)"""
+    print("\n" + "="*60)
+    print("TESTE 19: Cache de Predições")
+    print("="*60)
+
+    try:
+        import time
+        import pandas as pd
+        from models.prediction_cache import PredictionCache
+
+        # Chaves: iguais para a mesma linha e versão, diferentes ao mudar valor ou versão
+        X = pd.DataFrame({'a': [1.0, 2.0, 1.0], 'b': [3, 4, 3]})
+        chaves = PredictionCache.row_keys(X, version=('modelo', 1))
+        assert chaves[0] == chaves[2] and chaves[0] != chaves[1]
+        assert PredictionCache.row_keys(X, version=('modelo', 2))[0] != chaves[0]
+        assert PredictionCache.row_keys(X[['b', 'a']], version=('modelo', 1))[0] != chaves[0]
+        print("✓ Chaves por linha dependem dos valores, das colunas e da versão")
+
+        # LRU: acima de max_size sai a entrada menos usada recentemente
+        cache = PredictionCache(max_size=2, ttl_seconds=None)
+        cache.put('x', 1)
+        cache.put('y', 2)
+        assert cache.get('x') == 1
+        cache.put('z', 3)
+        assert cache.get('y') is None and cache.get('x') == 1 and cache.get('z') == 3
+        assert cache.stats()['descartes'] == 1
+        print("✓ Descarte da entrada menos usada recentemente")
+
+        # TTL: entradas expiradas deixam de ser retornadas
+        cache = PredictionCache(max_size=10, ttl_seconds=0.05)
+        cache.put('x', 1)
+        assert cache.get('x') == 1
+        time.sleep(0.1)
+        assert cache.get('x') is None
+        stats = cache.stats()
+        assert stats['expirados'] == 1 and stats['tamanho'] == 0
+        print("✓ Entradas expiradas após o TTL")
+
+        # Nova versão do modelo/feature store esvazia o cache
+        cache = PredictionCache(ttl_seconds=None)
+        cache.sync('v1')
+        cache.put('x', 1)
+        cache.sync('v1')
+        assert cache.get('x') == 1
+        cache.sync('v2')
+        assert cache.get('x') is None and cache.stats()['invalidacoes'] == 1
+        print("✓ Cache invalidado quando a versão muda")
+
+        try:
+            PredictionCache(max_size=0)
+            raise AssertionError("max_size=0 deveria falhar")
+        except ValueError:
+            pass
+
+        return True
+
+    except Exception as e:
+        print(f"✗ ERRO: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
 def main():
     """Executa todos os testes"""
     print("\n" + "#"*60)
@@ -137,6 +1064,54 @@ def main():
     # Teste 3
     results.append(("Visualizações", test_visualization()))
 
+    # Teste 4
+    results.append(("Motor Compilado de Árvores", test_tree_engine()))
+
+    # Teste 5
+    results.append(("Ingestão Incremental", test_incremental_ingestion()))
+
+    # Teste 6
+    results.append(("Agregação em Blocos", test_chunked_aggregation()))
+
+    # Teste 7
+    results.append(("Feature Store Online", test_feature_store()))
+
+    # Teste 8
+    results.append(("Cache em Disco", test_data_cache()))
+
+    # Teste 9
+    results.append(("Feature Engineering Paralelo", test_parallel_features()))
+
+    # Teste 10
+    results.append(("Leitura em Blocos", test_streaming_compras()))
+
+    # Teste 11
+    results.append(("Schema Compacto", test_compact_schema()))
+
+    # Teste 12
+    results.append(("Banco SQLite", test_sqlite_store()))
+
+    # Teste 13
+    results.append(("Tabela de Calendário", test_calendar_table()))
+
+    # Teste 14
+    results.append(("Seleção de Features", test_feature_selection()))
+
+    # Teste 15
+    results.append(("Codificação de Categorias", test_categorical_encoder()))
+
+    # Teste 16
+    results.append(("Matriz de Interações", test_interaction_store()))
+
+    # Teste 17
+    results.append(("Cache de Serviço", test_serving_cache()))
+
+    # Teste 18
+    results.append(("Artefato do Modelo", test_model_artifact()))
+
+    # Teste 19
+    results.append(("Cache de Predições", test_prediction_cache()))
+
     # Resumo
     print("\n" + "="*60)
     print("RESUMO DOS TESTES")
@@ -0,0 +1,197 @@
+"""
+Módulo de cache em disco para os dados da adega
+"""
+import pandas as pd
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Versão do formato do cache (incrementar invalida todos os arquivos existentes)
+CACHE_VERSION = 2
+
+
+def file_signature(path: Path, with_hash: bool = True) -> Dict[str, Any]:
+    """
+    Calcula a assinatura de um arquivo de origem
+
+    Args:
+        path: Caminho do arquivo
+        with_hash: Se deve calcular o SHA-256 do conteúdo
+
+    Returns:
+        Dicionário com tamanho, data de modificação e hash
+    """
+    stat = path.stat()
+    signature = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        signature['sha256'] = digest.hexdigest()
+
+    return signature
+
+
+class DataCache:
+    """
+    Cache colunar (Parquet) de DataFrames invalidado pelo conteúdo dos CSVs de origem
+
+    Os dados são gravados com to_parquet (tipos, categóricos e índice
+    preservados) e nunca desserializados como objetos Python arbitrários. O
+    SHA-256 de cada arquivo de origem é calculado uma única vez por versão do
+    arquivo (tamanho e data de modificação) e reaproveitado pelas gravações
+    e verificações seguintes.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = Path(cache_dir)
+        self.hits = 0
+        self.misses = 0
+        # (caminho, tamanho, data de modificação) -> SHA-256
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+
+    def _data_path(self, name: str) -> Path:
+        return self.cache_dir / f"{name}.parquet"
+
+    def _meta_path(self, name: str) -> Path:
+        return self.cache_dir / f"{name}.meta.json"
+
+    def signature(self, path: Path) -> Dict[str, Any]:
+        """
+        Assinatura completa (tamanho, data de modificação e SHA-256) de um arquivo de origem
+
+        O hash só é recalculado quando tamanho ou data de modificação mudam.
+
+        Args:
+            path: Caminho do arquivo
+
+        Returns:
+            Dicionário com tamanho, data de modificação e hash
+        """
+        signature = file_signature(path, with_hash=False)
+        key = (str(path), signature['size'], signature['mtime_ns'])
+        if key not in self._hashes:
+            self._hashes[key] = file_signature(path)['sha256']
+        signature['sha256'] = self._hashes[key]
+        return signature
+
+    def signatures(self, sources: List[Path]) -> Dict[str, Dict[str, Any]]:
+        """Assinaturas completas dos arquivos de origem (ver signature)"""
+        return {str(path): self.signature(path) for path in sources}
+
+    def _sources_unchanged(self, recorded: Dict[str, Dict[str, Any]], sources: List[Path]) -> bool:
+        """
+        Verifica se os arquivos de origem não mudaram desde a gravação do cache
+
+        Tamanho e data de modificação iguais bastam; se apenas a data mudou,
+        o hash do conteúdo decide.
+        """
+        if sorted(recorded) != sorted(str(path) for path in sources):
+            return False
+
+        for path in sources:
+            expected = recorded[str(path)]
+            if not path.exists():
+                return False
+
+            current = file_signature(path, with_hash=False)
+            if current['size'] != expected['size']:
+                return False
+
+            if current['mtime_ns'] != expected['mtime_ns']:
+                if self.signature(path)['sha256'] != expected['sha256']:
+                    return False
+
+                # Conteúdo idêntico: atualizar data para evitar recalcular o hash
+                expected['mtime_ns'] = current['mtime_ns']
+
+        return True
+
+    def load(self, name: str, sources: List[Path]) -> Optional[pd.DataFrame]:
+        """
+        Carrega um DataFrame do cache se ainda for válido
+
+        Args:
+            name: Nome da entrada no cache
+            sources: Arquivos de origem dos quais a entrada depende
+
+        Returns:
+            DataFrame em cache ou None se ausente/desatualizado
+        """
+        data_path = self._data_path(name)
+        meta_path = self._meta_path(name)
+
+        if not data_path.exists() or not meta_path.exists():
+            self.misses += 1
+            return None
+
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        if meta.get('version') != CACHE_VERSION or not self._sources_unchanged(meta['sources'], sources):
+            logger.info(f"Cache '{name}' desatualizado")
+            self.misses += 1
+            return None
+
+        try:
+            data = pd.read_parquet(data_path)
+        except Exception as e:
+            logger.warning(f"Cache '{name}' corrompido, ignorando: {e}")
+            self.misses += 1
+            return None
+
+        # Persistir datas de modificação atualizadas na verificação
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+        self.hits += 1
+        logger.info(f"✅ Cache '{name}' carregado: {len(data)} registros")
+        return data
+
+    def save(self, name: str, data: pd.DataFrame, sources: List[Path]) -> None:
+        """
+        Grava um DataFrame no cache
+
+        Args:
+            name: Nome da entrada no cache
+            data: DataFrame a ser gravado
+            sources: Arquivos de origem dos quais a entrada depende
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        meta = {
+            'version': CACHE_VERSION,
+            'sources': self.signatures(sources),
+        }
+
+        # Gravar em arquivo temporário e renomear para não deixar cache parcial
+        data_path = self._data_path(name)
+        tmp_path = data_path.with_suffix('.tmp')
+        data.to_parquet(tmp_path)
+        tmp_path.replace(data_path)
+
+        with open(self._meta_path(name), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+        logger.info(f"Cache '{name}' gravado em: {data_path}")
+
+    def clear(self) -> None:
+        """Remove todas as entradas do cache"""
+        if not self.cache_dir.exists():
+            return
+
+        for path in self.cache_dir.glob('*'):
+            if path.suffix in ('.parquet', '.pkl', '.json', '.tmp', '.npy'):
+                path.unlink()
+
+        logger.info(f"Cache limpo: {self.cache_dir}")
@@ -0,0 +1,108 @@
+"""
+Módulo com a tabela de calendário usada nas features temporais
+"""
+import pandas as pd
+import numpy as np
+import logging
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Features temporais geradas para cada data (na ordem de criação)
+TEMPORAL_FEATURES = [
+    'ano', 'mes', 'dia', 'dia_semana', 'trimestre', 'semana_ano',
+    'mes_sin', 'mes_cos', 'dia_semana_sin', 'dia_semana_cos',
+]
+
+
+def build_calendar(dates) -> pd.DataFrame:
+    """
+    Calcula todas as features temporais para cada data informada
+
+    Args:
+        dates: Datas distintas (sem NaT)
+
+    Returns:
+        DataFrame com uma linha por data e uma coluna por feature temporal
+    """
+    dates = pd.Series(pd.DatetimeIndex(dates))
+
+    calendar = pd.DataFrame({
+        'ano': dates.dt.year,
+        'mes': dates.dt.month,
+        'dia': dates.dt.day,
+        'dia_semana': dates.dt.dayofweek,
+        'trimestre': dates.dt.quarter,
+        'semana_ano': dates.dt.isocalendar().week,
+    })
+
+    # Features cíclicas (para capturar a natureza circular do tempo)
+    calendar['mes_sin'] = np.sin(2 * np.pi * calendar['mes'] / 12)
+    calendar['mes_cos'] = np.cos(2 * np.pi * calendar['mes'] / 12)
+    calendar['dia_semana_sin'] = np.sin(2 * np.pi * calendar['dia_semana'] / 7)
+    calendar['dia_semana_cos'] = np.cos(2 * np.pi * calendar['dia_semana'] / 7)
+
+    calendar.index = pd.DatetimeIndex(dates)
+
+    return calendar
+
+
+class CalendarTable:
+    """Dimensão de calendário: features temporais calculadas uma vez por data"""
+
+    def __init__(self):
+        self.table = build_calendar([])
+
+    def _ensure(self, dates: pd.DatetimeIndex) -> None:
+        """Acrescenta à tabela as datas ainda não calculadas"""
+        missing = dates.difference(self.table.index)
+        if len(missing) == 0:
+            return
+
+        new_rows = build_calendar(missing)
+        self.table = new_rows if len(self.table) == 0 else pd.concat([self.table, new_rows])
+
+    def features(self, dates: pd.Series) -> Dict[str, Any]:
+        """
+        Retorna as features temporais de cada linha
+
+        As datas são fatoradas; as features são calculadas apenas para as
+        datas distintas e replicadas para as linhas pelo código da data.
+
+        Args:
+            dates: Series datetime (uma data por linha)
+
+        Returns:
+            Dicionário {feature: valores por linha} (NaT produz valor ausente)
+        """
+        codes, uniques = pd.factorize(dates)
+
+        # Features dependem apenas do dia: horários distintos compartilham a linha
+        days = pd.DatetimeIndex(uniques).normalize()
+
+        self._ensure(days.unique())
+        positions = self.table.index.get_indexer(days)
+        row_positions = np.full(len(codes), -1, dtype=np.intp)
+        valid = codes >= 0
+        row_positions[valid] = positions[codes[valid]]
+
+        return {
+            col: self.table[col].array.take(row_positions, allow_fill=True)
+            for col in TEMPORAL_FEATURES
+        }
+
+    def row(self, date) -> Dict[str, Any]:
+        """
+        Retorna as features temporais de uma única data
+
+        Args:
+            date: Data (datetime, Timestamp ou texto)
+
+        Returns:
+            Dicionário {feature: valor escalar}
+        """
+        date = pd.Timestamp(date).normalize()
+        self._ensure(pd.DatetimeIndex([date]))
+        position = self.table.index.get_loc(date)
+
+        return {col: self.table[col].iloc[position].item() for col in TEMPORAL_FEATURES}
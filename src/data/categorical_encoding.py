@@ -0,0 +1,106 @@
+"""
+Módulo de codificação de variáveis categóricas com vocabulário congelado
+"""
+import pandas as pd
+import numpy as np
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Código reservado para categorias não vistas no treinamento
+UNKNOWN_CODE = -1
+
+# Rótulo dos valores ausentes (mesmo texto de astype(str) para NaN)
+MISSING_LABEL = 'nan'
+
+
+def _factorize_labels(values: pd.Series):
+    """
+    Códigos por linha e rótulos (texto) dos valores distintos
+
+    Apenas os valores distintos são convertidos para texto; as linhas
+    ficam como códigos inteiros.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    labels = [MISSING_LABEL if pd.isna(value) else str(value) for value in uniques]
+    return codes, labels
+
+
+class CategoricalEncoder:
+    """
+    Codificador de categorias em códigos inteiros (substitui o LabelEncoder)
+
+    As classes são os rótulos em texto ordenados, como no LabelEncoder, mas
+    os valores são fatorados e apenas as categorias distintas viram texto:
+    a codificação é um único take sobre os códigos, sem criar uma string por
+    linha. Valores não vistos no ajuste recebem um código reservado em vez
+    de gerar erro.
+    """
+
+    def __init__(self, classes: Optional[List[str]] = None):
+        self.classes_ = None
+        self._index = None
+        if classes is not None:
+            self._set_classes(classes)
+
+    def _set_classes(self, classes: List[str]) -> None:
+        self.classes_ = np.asarray(list(classes), dtype=object)
+        self._index = pd.Index(self.classes_, dtype=object)
+
+    def fit(self, values: pd.Series) -> 'CategoricalEncoder':
+        """
+        Congela o vocabulário a partir dos valores de treinamento
+
+        Args:
+            values: Valores da coluna
+
+        Returns:
+            O próprio encoder
+        """
+        _, labels = _factorize_labels(pd.Series(values))
+        self._set_classes(sorted(set(labels)))
+        return self
+
+    def transform(self, values: pd.Series, unknown_code: int = UNKNOWN_CODE) -> np.ndarray:
+        """
+        Codifica os valores pelo vocabulário congelado
+
+        Args:
+            values: Valores da coluna
+            unknown_code: Código dos valores fora do vocabulário
+
+        Returns:
+            Array int64 com o código de cada valor
+        """
+        if self._index is None:
+            raise ValueError("CategoricalEncoder não ajustado: execute fit antes de transform")
+
+        codes, labels = _factorize_labels(pd.Series(values))
+        label_codes = self._index.get_indexer(labels)
+        label_codes[label_codes < 0] = unknown_code
+
+        return label_codes.astype(np.int64)[codes]
+
+    def fit_transform(self, values: pd.Series) -> np.ndarray:
+        """Ajusta o vocabulário e codifica os mesmos valores"""
+        return self.fit(values).transform(values)
+
+    @property
+    def lookup(self) -> Dict[str, int]:
+        """Tabela {rótulo: código}"""
+        return {label: code for code, label in enumerate(self.classes_)}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Conteúdo serializável (apenas a lista de classes)"""
+        return {'classes': [str(label) for label in self.classes_]}
+
+    @classmethod
+    def from_dict(cls, content: Dict[str, Any]) -> 'CategoricalEncoder':
+        """Recria o encoder a partir de to_dict"""
+        return cls(content['classes'])
+
+    @classmethod
+    def from_lookup(cls, lookup: Dict[str, int]) -> 'CategoricalEncoder':
+        """Recria o encoder a partir de uma tabela {rótulo: código} com códigos 0..n-1"""
+        return cls(sorted(lookup, key=lookup.get))
@@ -3,22 +3,273 @@ Módulo para carregamento e validação de dados
 """
 import pandas as pd
 import numpy as np
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Iterator
 import logging
 from pathlib import Path
 
+from .cache import DataCache
+from .incremental import IncrementalIngestor
+from .interaction_store import InteractionStore
+from .joins import DimensionJoiner
+from .partial_aggregates import AggregateState
+from .schema import apply_schema, memory_report
+from .sqlite_store import SQLiteStore
+from .validation import DataValidator, ValidationReport
+
 logger = logging.getLogger(__name__)
 
 
 class DataLoader:
     """Classe responsável por carregar e validar dados da adega"""
 
-    def __init__(self, data_dir: str = "."):
+    # Arquivos de origem de cada tabela
+    SOURCE_FILES = {
+        'clientes': 'Cliente.csv',
+        'produtos': 'produtos.csv',
+        'compras': 'Compras.csv',
+    }
+
+    # Tipos explícitos das colunas de Compras.csv usados na leitura em blocos
+    COMPRAS_DTYPES = {
+        'compra_id': 'int64',
+        'cliente_id': 'int64',
+        'produto_id': 'int64',
+        'valor': 'float64',
+        'quantidade': 'int64',
+        'data_compra': 'str',
+    }
+
+    def __init__(self, data_dir: str = ".", use_cache: bool = False, cache_dir: Optional[str] = None,
+                 compact: bool = False, incremental: bool = False, chunk_size: int = 100_000):
+        """
+        Args:
+            data_dir: Diretório com os arquivos CSV
+            use_cache: Se deve reutilizar as tabelas já processadas em cache colunar (Parquet)
+            cache_dir: Diretório do cache (padrão: <data_dir>/.cache)
+            compact: Se deve aplicar o schema de tipos compactos (categóricos,
+                inteiros reduzidos, float32 e booleanos Sim/Não)
+            incremental: Se deve ingerir apenas as compras acrescentadas a
+                Compras.csv desde a última carga (marca d'água no diretório do cache)
+            chunk_size: Número de compras por bloco nas leituras em streaming de
+                Compras.csv (iter_compras, aggregate_compras, get_store, get_interactions)
+        """
         self.data_dir = Path(data_dir)
         self.clientes = None
         self.produtos = None
         self.compras = None
         self.data_merged = None
+        self.cache = DataCache(cache_dir or self.data_dir / '.cache') if use_cache else None
+        self.compact = compact
+        self.chunk_size = chunk_size
+        self.stream_stats = {}
+        self.joiner = None
+        self.join_report = {}
+        self.validator = DataValidator()
+        self.validation_report = None
+        self.stream_report = None
+        self.ingestor = None
+        if incremental:
+            self.ingestor = IncrementalIngestor(
+                self.data_dir / self.SOURCE_FILES['compras'],
+                self.cache or DataCache(cache_dir or self.data_dir / '.cache')
+            )
+        self.compras_delta = None
+        self.ingestion_info = {}
+        self.store = None
+        self.interactions = None
+
+    def get_joiner(self) -> DimensionJoiner:
+        """
+        Retorna o join por índice posicional de clientes e produtos
+
+        O índice é construído uma vez e reutilizado enquanto as tabelas de
+        dimensão não forem substituídas (inclusive para novos lotes de compras).
+
+        Returns:
+            DimensionJoiner das tabelas atuais
+        """
+        if self.clientes is None or self.produtos is None:
+            raise ValueError("Execute load_data() primeiro")
+
+        if self.joiner is None or not self.joiner.uses(self.clientes, self.produtos):
+            self.joiner = DimensionJoiner(self.clientes, self.produtos)
+
+        return self.joiner
+
+    def _cache_name(self, name: str) -> str:
+        """Nome da entrada no cache (tabelas compactas ficam em entradas separadas)"""
+        return f"{name}_compact" if self.compact else name
+
+    def _source_paths(self) -> list:
+        """
+        Retorna os caminhos dos três CSVs de origem
+
+        No modo incremental inclui a marca d'água da ingestão: compras
+        recebidas por refresh_compras (inclusive de arquivos delta) também
+        invalidam as tabelas derivadas (merged, clean, SQLite, interações).
+        """
+        paths = self._csv_paths()
+        if self.ingestor is not None and self.ingestor.watermark_path.exists():
+            paths.append(self.ingestor.watermark_path)
+        return paths
+
+    def _csv_paths(self) -> list:
+        """Retorna os caminhos dos três CSVs de origem (sem a marca d'água)"""
+        return [self.data_dir / arquivo for arquivo in self.SOURCE_FILES.values()]
+
+    def _ensure_ingested(self) -> None:
+        """No modo incremental, garante a tabela acumulada de compras (com os arquivos delta)"""
+        if self.ingestor is not None and self.compras is None:
+            self.refresh_compras()
+
+    def get_store(self, db_path: Optional[str] = None) -> SQLiteStore:
+        """
+        Retorna o banco SQLite com clientes, produtos e compras indexados
+
+        O banco é (re)construído apenas quando os CSVs de origem mudam (no
+        modo incremental, também quando novas compras são ingeridas). As
+        compras são gravadas em blocos, sem carregar o histórico inteiro em
+        memória. Consultas por cliente, produto e período usam os índices.
+
+        Args:
+            db_path: Caminho do banco (padrão: adega.sqlite no diretório do cache)
+
+        Returns:
+            SQLiteStore pronto para consultas
+        """
+        if self.store is not None:
+            return self.store
+
+        if db_path is None:
+            cache_dir = self.cache.cache_dir if self.cache is not None else self.data_dir / '.cache'
+            db_path = cache_dir / 'adega.sqlite'
+
+        faltando = [str(path) for path in self._csv_paths() if not path.exists()]
+        if faltando:
+            raise FileNotFoundError(f"📂 Arquivos de dados não encontrados: {', '.join(faltando)}")
+
+        self._ensure_ingested()
+        sources = self._source_paths()
+
+        store = SQLiteStore(db_path)
+
+        if not store.is_current(sources):
+            logger.info(f"Construindo banco SQLite em: {db_path}")
+
+            store.write_table('clientes', self.clientes if self.clientes is not None else self._read_table('clientes'))
+            store.write_table('produtos', self.produtos if self.produtos is not None else self._read_table('produtos'))
+
+            if self.compras is not None:
+                store.write_table('compras', self.compras)
+            else:
+                reader = pd.read_csv(
+                    self.data_dir / self.SOURCE_FILES['compras'],
+                    delimiter=';',
+                    encoding='utf-8',
+                    dtype=self.COMPRAS_DTYPES,
+                    chunksize=self.chunk_size
+                )
+                for i, chunk in enumerate(reader):
+                    store.write_table('compras', chunk, append=i > 0)
+
+            store.create_indexes()
+            store.mark_built(sources)
+            logger.info("✅ Banco SQLite construído")
+
+        self.store = store
+        return store
+
+    def get_interactions(self, path: Optional[str] = None) -> InteractionStore:
+        """
+        Retorna a matriz esparsa de interações cliente × produto
+
+        A matriz é (re)construída apenas quando os CSVs de origem mudam (no
+        modo incremental, também quando novas compras são ingeridas), lendo
+        as compras em blocos, e fica salva em .npy para ser carregada com
+        memory-map nas próximas execuções. As tabelas de clientes e produtos
+        ficam em self.clientes e self.produtos.
+
+        Args:
+            path: Diretório da matriz (padrão: interactions no diretório do cache)
+
+        Returns:
+            InteractionStore pronto para consultas
+        """
+        if self.interactions is not None:
+            return self.interactions
+
+        if path is None:
+            cache_dir = self.cache.cache_dir if self.cache is not None else self.data_dir / '.cache'
+            path = cache_dir / 'interactions'
+
+        faltando = [str(source) for source in self._csv_paths() if not source.exists()]
+        if faltando:
+            raise FileNotFoundError(f"📂 Arquivos de dados não encontrados: {', '.join(faltando)}")
+
+        self._ensure_ingested()
+        sources = self._source_paths()
+
+        if self.clientes is None:
+            self.clientes = self._read_table('clientes')
+        if self.produtos is None:
+            self.produtos = self._read_table('produtos')
+
+        if InteractionStore.is_current(path, sources):
+            self.interactions = InteractionStore.load(path)
+            return self.interactions
+
+        logger.info(f"Construindo matriz de interações em: {path}")
+
+        if self.compras is not None:
+            store = InteractionStore.from_purchases(self.compras)
+        else:
+            reader = pd.read_csv(
+                self.data_dir / self.SOURCE_FILES['compras'],
+                delimiter=';',
+                encoding='utf-8',
+                dtype=self.COMPRAS_DTYPES,
+                chunksize=self.chunk_size
+            )
+            store = InteractionStore.from_chunks(reader)
+
+        store.save(path, sources)
+        self.interactions = InteractionStore.load(path)
+        return self.interactions
+
+    def _read_table(self, name: str) -> pd.DataFrame:
+        """
+        Lê uma tabela do CSV de origem (ou do cache, se habilitado)
+
+        Args:
+            name: Nome da tabela ('clientes', 'produtos' ou 'compras')
+
+        Returns:
+            DataFrame com a tabela
+        """
+        arquivo = self.SOURCE_FILES[name]
+        caminho = self.data_dir / arquivo
+
+        if self.cache is not None:
+            cached = self.cache.load(self._cache_name(name), [caminho])
+            if cached is not None:
+                return cached
+
+        try:
+            table = pd.read_csv(
+                caminho,
+                delimiter=';',
+                encoding='utf-8'
+            )
+        except Exception as e:
+            raise ValueError(f"❌ Erro ao ler {arquivo}: {str(e)}\n\n💡 Verifique se o arquivo está no formato correto (separado por ponto-e-vírgula).")
+
+        if self.compact:
+            apply_schema(table)
+
+        if self.cache is not None:
+            self.cache.save(self._cache_name(name), table, [caminho])
+
+        return table
 
     def load_data(self) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
         """
@@ -57,32 +308,12 @@ class DataLoader:
                 raise FileNotFoundError(mensagem_erro)
 
             # Carregar CSVs com o delimitador correto
-            try:
-                self.clientes = pd.read_csv(
-                    self.data_dir / 'Cliente.csv',
-                    delimiter=';',
-                    encoding='utf-8'
-                )
-            except Exception as e:
-                raise ValueError(f"❌ Erro ao ler Cliente.csv: {str(e)}\n\n💡 Verifique se o arquivo está no formato correto (separado por ponto-e-vírgula).")
-
-            try:
-                self.produtos = pd.read_csv(
-                    self.data_dir / 'produtos.csv',
-                    delimiter=';',
-                    encoding='utf-8'
-                )
-            except Exception as e:
-                raise ValueError(f"❌ Erro ao ler produtos.csv: {str(e)}\n\n💡 Verifique se o arquivo está no formato correto (separado por ponto-e-vírgula).")
-
-            try:
-                self.compras = pd.read_csv(
-                    self.data_dir / 'Compras.csv',
-                    delimiter=';',
-                    encoding='utf-8'
-                )
-            except Exception as e:
-                raise ValueError(f"❌ Erro ao ler Compras.csv: {str(e)}\n\n💡 Verifique se o arquivo está no formato correto (separado por ponto-e-vírgula).")
+            self.clientes = self._read_table('clientes')
+            self.produtos = self._read_table('produtos')
+            if self.ingestor is not None:
+                self.refresh_compras()
+            else:
+                self.compras = self._read_table('compras')
 
             logger.info(f"✅ Clientes carregados: {len(self.clientes)} registros")
             logger.info(f"✅ Produtos carregados: {len(self.produtos)} registros")
@@ -100,36 +331,236 @@ class DataLoader:
             logger.error(mensagem_erro)
             raise Exception(mensagem_erro)
 
-    def validate_data(self) -> bool:
+    def refresh_compras(self, delta_path: Optional[str] = None) -> pd.DataFrame:
         """
-        Valida a integridade dos dados
+        Atualiza as compras a partir da marca d'água (modo incremental)
+
+        Apenas as linhas acrescentadas a Compras.csv desde a última carga (e,
+        opcionalmente, as de um arquivo delta) são lidas e gravadas como uma
+        nova parte da tabela acumulada em cache. Com as compras já em memória,
+        as novas são apenas anexadas a self.compras; a tabela acumulada só é
+        lida do cache na primeira carga. O resumo da atualização fica em
+        self.ingestion_info.
+
+        Args:
+            delta_path: CSV opcional apenas com as compras novas
+
+        Returns:
+            DataFrame apenas com as compras novas
+        """
+        if self.ingestor is None:
+            raise ValueError("Ingestão incremental desabilitada (use DataLoader(incremental=True))")
+
+        try:
+            delta, self.ingestion_info = self.ingestor.refresh(
+                Path(delta_path) if delta_path is not None else None
+            )
+            if self.ingestion_info['modo'] == 'completo':
+                compras = delta
+            elif self.compras is not None and len(self.compras) + len(delta) == self.ingestion_info['total_compras']:
+                # Tabela em memória atualizada até a marca anterior: basta anexar
+                compras = self.ingestor.append(self.compras, delta)
+            else:
+                compras = self.ingestor.load_store()
+        except (OSError, ValueError, pd.errors.ParserError) as e:
+            raise ValueError(f"❌ Erro na ingestão incremental de compras: {str(e)}")
+
+        if self.compact:
+            apply_schema(compras)
+            apply_schema(delta)
+
+        self.compras = compras
+        self.compras_delta = delta
+
+        return delta
+
+    def merge_delta(self) -> pd.DataFrame:
+        """
+        Combina apenas as compras novas com clientes e produtos
 
         Returns:
-            True se os dados são válidos
+            DataFrame com as compras da última atualização incremental
+        """
+        if self.compras_delta is None:
+            raise ValueError("Execute load_data() ou refresh_compras() primeiro")
+
+        merged, _ = self.get_joiner().join(self.compras_delta)
+
+        if self.compact:
+            apply_schema(merged)
+
+        return merged
+
+    def iter_compras(self, chunksize: Optional[int] = None, drop_orphans: bool = False) -> Iterator[pd.DataFrame]:
+        """
+        Lê Compras.csv em blocos e gera cada bloco já combinado com clientes e produtos
+
+        Apenas as tabelas de dimensão (clientes e produtos) ficam inteiras em
+        memória; o histórico de compras é processado bloco a bloco, com memória
+        limitada pelo tamanho do bloco. As estatísticas acumuladas ficam em
+        self.stream_stats e o relatório de validação completo em
+        self.stream_report (ao final da leitura).
+
+        Args:
+            chunksize: Número de compras por bloco (None = self.chunk_size)
+            drop_orphans: Se deve descartar compras com cliente_id/produto_id inexistente
+
+        Yields:
+            DataFrame com um bloco de compras enriquecido
+        """
+        chunksize = chunksize or self.chunk_size
+        caminho = self.data_dir / self.SOURCE_FILES['compras']
+        if not caminho.exists():
+            raise FileNotFoundError(f"📂 Arquivo de compras não encontrado: {caminho}")
+
+        # Tabelas de dimensão em memória
+        if self.clientes is None:
+            self.clientes = self._read_table('clientes')
+        if self.produtos is None:
+            self.produtos = self._read_table('produtos')
+
+        self.stream_stats = {
+            'blocos': 0,
+            'compras_lidas': 0,
+            'compras_geradas': 0,
+            'clientes_invalidos': 0,
+            'produtos_invalidos': 0,
+            'datas_invalidas': 0,
+        }
+
+        self.validator.start_stream()
+        self.stream_report = None
+
+        logger.info(f"Lendo compras em blocos de {chunksize} registros...")
+
+        try:
+            reader = pd.read_csv(
+                caminho,
+                delimiter=';',
+                encoding='utf-8',
+                dtype=self.COMPRAS_DTYPES,
+                chunksize=chunksize
+            )
+
+            for chunk in reader:
+                yield self._enrich_compras_chunk(chunk, drop_orphans)
+        except ValueError as e:
+            raise ValueError(f"❌ Erro ao ler Compras.csv em blocos: {str(e)}\n\n💡 Verifique se as colunas seguem os tipos esperados: {self.COMPRAS_DTYPES}")
+
+        self.stream_report = self.validator.finish_stream()
+        self.stream_report.log()
+
+        logger.info(
+            f"✅ Leitura em blocos concluída: {self.stream_stats['compras_lidas']} compras "
+            f"em {self.stream_stats['blocos']} blocos"
+        )
+
+    def aggregate_compras(self, chunksize: Optional[int] = None, drop_orphans: bool = False) -> AggregateState:
+        """
+        Calcula o estado agregado por cliente e por produto lendo Compras.csv em blocos
+
+        Cada bloco gera um estado parcial que é combinado aos anteriores, então
+        a memória fica limitada ao tamanho do bloco mais uma linha de estado
+        por cliente/produto. Com o estado, as features agregadas de cada bloco
+        saem de FeatureEngineer.create_aggregated_features(bloco, aggregates=estado)
+        em uma segunda leitura.
+
+        Args:
+            chunksize: Número de compras por bloco (None = self.chunk_size)
+            drop_orphans: Se deve descartar compras com cliente_id/produto_id inexistente
+
+        Returns:
+            AggregateState de todo o histórico
+        """
+        return AggregateState.from_chunks(self.iter_compras(chunksize, drop_orphans))
+
+    def _enrich_compras_chunk(self, chunk: pd.DataFrame, drop_orphans: bool) -> pd.DataFrame:
+        """
+        Valida e combina um bloco de compras com as tabelas de dimensão
+
+        Args:
+            chunk: Bloco de compras
+            drop_orphans: Se deve descartar compras com chaves inexistentes
+
+        Returns:
+            Bloco enriquecido
+        """
+        joiner = self.get_joiner()
+        cliente_pos, produto_pos = joiner.lookup(chunk)
+
+        # Validação do bloco ainda com as datas em texto (detecta falhas de conversão)
+        self.validator.validate_chunk(chunk, positions=(cliente_pos, produto_pos))
+
+        chunk['data_compra'] = pd.to_datetime(chunk['data_compra'], errors='coerce')
+        clientes_invalidos = cliente_pos < 0
+        produtos_invalidos = produto_pos < 0
+
+        stats = self.stream_stats
+        stats['blocos'] += 1
+        stats['compras_lidas'] += len(chunk)
+        stats['clientes_invalidos'] += int(clientes_invalidos.sum())
+        stats['produtos_invalidos'] += int(produtos_invalidos.sum())
+        stats['datas_invalidas'] += int(chunk['data_compra'].isna().sum())
+
+        if clientes_invalidos.any() or produtos_invalidos.any():
+            logger.warning(
+                f"Bloco {stats['blocos']}: {int(clientes_invalidos.sum())} compras com cliente_id inválido, "
+                f"{int(produtos_invalidos.sum())} com produto_id inválido"
+            )
+
+        if drop_orphans:
+            chunk = chunk[~(clientes_invalidos | produtos_invalidos)]
+
+        enriched, _ = joiner.join(chunk)
+
+        if self.compact:
+            apply_schema(enriched)
+
+        stats['compras_geradas'] += len(enriched)
+
+        return enriched
+
+    def validate_data(self, strict: bool = True) -> ValidationReport:
+        """
+        Valida a integridade e a qualidade dos dados
+
+        Todas as verificações (nulos, duplicatas, intervalos de valores, datas
+        e integridade referencial) são feitas em uma passada por tabela.
+
+        Args:
+            strict: Se deve lançar ValueError quando houver erros críticos
+                (IDs nulos ou duplicados)
+
+        Returns:
+            ValidationReport (avaliado como True se não houver erros críticos)
         """
         logger.info("Validando integridade dos dados...")
 
-        # Verificar valores nulos críticos
-        assert not self.clientes['cliente_id'].isnull().any(), "IDs de clientes nulos encontrados"
-        assert not self.produtos['produto_id'].isnull().any(), "IDs de produtos nulos encontrados"
-        assert not self.compras['compra_id'].isnull().any(), "IDs de compras nulos encontrados"
+        if self.clientes is None or self.produtos is None or self.compras is None:
+            raise ValueError("Execute load_data() primeiro")
 
-        # Verificar duplicatas
-        assert not self.clientes['cliente_id'].duplicated().any(), "IDs de clientes duplicados"
-        assert not self.produtos['produto_id'].duplicated().any(), "IDs de produtos duplicados"
-        assert not self.compras['compra_id'].duplicated().any(), "IDs de compras duplicados"
+        # Mesmo índice usado no merge para a integridade referencial
+        # (indisponível se as chaves das dimensões forem nulas/duplicadas,
+        # o que já é reportado como erro crítico)
+        try:
+            joiner = self.get_joiner()
+        except ValueError:
+            joiner = None
 
-        # Verificar integridade referencial
-        clientes_invalidos = ~self.compras['cliente_id'].isin(self.clientes['cliente_id'])
-        if clientes_invalidos.any():
-            logger.warning(f"Encontradas {clientes_invalidos.sum()} compras com cliente_id inválido")
+        self.validation_report = self.validator.validate(
+            self.clientes, self.produtos, self.compras, joiner=joiner
+        )
+        self.validation_report.log()
 
-        produtos_invalidos = ~self.compras['produto_id'].isin(self.produtos['produto_id'])
-        if produtos_invalidos.any():
-            logger.warning(f"Encontradas {produtos_invalidos.sum()} compras com produto_id inválido")
+        if not self.validation_report:
+            if strict:
+                raise ValueError(
+                    "❌ Dados inválidos:\n" + "\n".join(f"  • {erro}" for erro in self.validation_report.erros)
+                )
+            return self.validation_report
 
         logger.info("Validação concluída com sucesso!")
-        return True
+        return self.validation_report
 
     def merge_data(self) -> pd.DataFrame:
         """
@@ -140,23 +571,27 @@ class DataLoader:
         """
         logger.info("Realizando merge dos dados...")
 
-        # Primeiro merge: compras + clientes
-        data_merged = pd.merge(
-            self.compras,
-            self.clientes,
-            on='cliente_id',
-            how='left',
-            suffixes=('', '_cliente')
-        )
+        if self.cache is not None:
+            cached = self.cache.load(self._cache_name('merged'), self._source_paths())
+            if cached is not None:
+                self.data_merged = cached
+                return self.data_merged
 
-        # Segundo merge: resultado + produtos
-        self.data_merged = pd.merge(
-            data_merged,
-            self.produtos,
-            on='produto_id',
-            how='left',
-            suffixes=('', '_produto')
-        )
+        # Join por índice posicional: compras + clientes + produtos em uma passada
+        self.data_merged, self.join_report = self.get_joiner().join(self.compras)
+
+        if self.join_report['clientes_invalidos'] or self.join_report['produtos_invalidos']:
+            logger.info(
+                f"Chaves órfãs no merge: {self.join_report['clientes_invalidos']} clientes, "
+                f"{self.join_report['produtos_invalidos']} produtos"
+            )
+
+        if self.compact:
+            # Chaves órfãs introduzem lacunas nas colunas das dimensões
+            apply_schema(self.data_merged)
+
+        if self.cache is not None:
+            self.cache.save(self._cache_name('merged'), self.data_merged, self._source_paths())
 
         logger.info(f"Dados combinados: {len(self.data_merged)} registros")
         logger.info(f"Features disponíveis: {len(self.data_merged.columns)} colunas")
@@ -184,6 +619,11 @@ class DataLoader:
             'ticket_medio': self.data_merged['valor'].mean(),
         }
 
+        # Uso de memória do DataFrame combinado
+        memoria = memory_report(self.data_merged)
+        summary['memoria_mb'] = round(memoria['total_mb'], 3)
+        summary['memoria'] = memoria
+
         return summary
 
     def clean_data(self, drop_na: bool = True) -> pd.DataFrame:
@@ -201,6 +641,13 @@ class DataLoader:
         if self.data_merged is None:
             raise ValueError("Execute merge_data() primeiro")
 
+        cache_name = self._cache_name('clean' if drop_na else 'clean_keepna')
+        if self.cache is not None:
+            cached = self.cache.load(cache_name, self._source_paths())
+            if cached is not None:
+                self.data_merged = cached
+                return cached
+
         data_clean = self.data_merged.copy()
 
         # Remover valores nulos se solicitado
@@ -222,5 +669,8 @@ class DataLoader:
 
         self.data_merged = data_clean
 
+        if self.cache is not None:
+            self.cache.save(cache_name, data_clean, self._source_paths())
+
         logger.info(f"Dados limpos: {len(data_clean)} registros mantidos")
         return data_clean
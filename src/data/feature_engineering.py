@@ -3,13 +3,37 @@ Módulo para Feature Engineering e Transformação de Dados
 """
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder, StandardScaler, MinMaxScaler
-from sklearn.feature_selection import SelectKBest, f_classif, mutual_info_classif
+from sklearn.preprocessing import StandardScaler, MinMaxScaler
 from typing import Tuple, List, Optional
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .calendar_features import CalendarTable, TEMPORAL_FEATURES
+from .categorical_encoding import CategoricalEncoder
+from .feature_registry import FeaturePlan
+from .feature_selection import FeatureSelector
+from .partial_aggregates import AggregateState
+from .schema import FLAG_LABELS
+from .window_features import WINDOW_DAYS, trailing_window_features
 
 logger = logging.getLogger(__name__)
 
+# Agregações por cliente e por produto: {feature: (coluna, função)}
+CLIENT_AGGREGATIONS = {
+    'total_gasto': ('valor', 'sum'),
+    'ticket_medio': ('valor', 'mean'),
+    'std_gasto': ('valor', 'std'),
+    'num_compras': ('valor', 'count'),
+    'total_itens': ('quantidade', 'sum'),
+    'media_itens': ('quantidade', 'mean'),
+}
+PRODUCT_AGGREGATIONS = {
+    'preco_medio_produto': ('valor', 'mean'),
+    'popularidade_produto': ('valor', 'count'),
+    'total_vendido_produto': ('quantidade', 'sum'),
+}
+
 
 class FeatureEngineer:
     """Classe para engenharia de features e transformação de dados"""
@@ -18,21 +42,44 @@ class FeatureEngineer:
         self.label_encoders = {}
         self.scaler = None
         self.selected_features = None
+        self.selector = None
+        self._selector_params = None
+        self.selection_report = None
+        self.calendar = CalendarTable()
+
+    @staticmethod
+    def _output_frame(data: pd.DataFrame, copy: bool) -> pd.DataFrame:
+        """
+        DataFrame de saída de uma etapa
 
-    def create_temporal_features(self, data: pd.DataFrame, date_column: str = 'data_compra') -> pd.DataFrame:
+        A cópia rasa compartilha as colunas de entrada; as etapas só adicionam
+        ou substituem colunas inteiras, então a entrada nunca é alterada.
+        """
+        return data.copy() if copy else data.copy(deep=False)
+
+    @staticmethod
+    def _wanted(plan: Optional[FeaturePlan], names: List[str]) -> List[str]:
+        """Features da lista que devem ser calculadas (todas sem plano)"""
+        return list(names) if plan is None else plan.select(names)
+
+    def create_temporal_features(self, data: pd.DataFrame, date_column: str = 'data_compra',
+                                 copy: bool = True, plan: Optional[FeaturePlan] = None) -> pd.DataFrame:
         """
         Cria features temporais a partir da data de compra
 
         Args:
             data: DataFrame com os dados
             date_column: Nome da coluna de data
+            copy: Se deve copiar os dados de entrada (False = novas colunas são
+                adicionadas a uma cópia rasa, sem duplicar as colunas existentes)
+            plan: Plano com as features necessárias (None = todas)
 
         Returns:
             DataFrame com features temporais adicionadas
         """
         logger.info("Criando features temporais...")
 
-        df = data.copy()
+        df = self._output_frame(data, copy)
 
         if date_column not in df.columns:
             logger.warning(f"Coluna {date_column} não encontrada")
@@ -41,157 +88,319 @@ class FeatureEngineer:
         # Garantir que é datetime
         df[date_column] = pd.to_datetime(df[date_column])
 
-        # Extrair componentes temporais
-        df['ano'] = df[date_column].dt.year
-        df['mes'] = df[date_column].dt.month
-        df['dia'] = df[date_column].dt.day
-        df['dia_semana'] = df[date_column].dt.dayofweek
-        df['trimestre'] = df[date_column].dt.quarter
-        df['semana_ano'] = df[date_column].dt.isocalendar().week
-
-        # Features cíclicas (para capturar a natureza circular do tempo)
-        df['mes_sin'] = np.sin(2 * np.pi * df['mes'] / 12)
-        df['mes_cos'] = np.cos(2 * np.pi * df['mes'] / 12)
-        df['dia_semana_sin'] = np.sin(2 * np.pi * df['dia_semana'] / 7)
-        df['dia_semana_cos'] = np.cos(2 * np.pi * df['dia_semana'] / 7)
+        # Componentes temporais e features cíclicas calculados uma vez por data
+        # distinta (tabela de calendário) e replicados para as linhas
+        wanted = self._wanted(plan, TEMPORAL_FEATURES)
+        for col, values in self.calendar.features(df[date_column]).items():
+            if col in wanted:
+                df[col] = values
 
         logger.info(f"Criadas features temporais: ano, mes, dia, dia_semana, trimestre, etc.")
 
         return df
 
-    def create_aggregated_features(self, data: pd.DataFrame) -> pd.DataFrame:
+    @staticmethod
+    def _group_stats(data: pd.DataFrame, key: str, **aggregations) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        Agrega estatísticas por chave em uma única passada
+
+        Args:
+            data: DataFrame com os dados
+            key: Coluna de agrupamento
+            **aggregations: Agregações nomeadas (nome=(coluna, função))
+
+        Returns:
+            Tupla com as estatísticas (uma linha por grupo, na ordem de
+            aparição) e o código do grupo de cada linha (-1 para chave nula)
+        """
+        codes, uniques = pd.factorize(data[key])
+        stats = data.groupby(codes, sort=False).agg(**aggregations)
+
+        # Linhas com chave nula (código -1) não formam grupo
+        stats = stats.reindex(np.arange(len(uniques)))
+
+        return stats, codes
+
+    @staticmethod
+    def _broadcast(df: pd.DataFrame, stats: pd.DataFrame, codes: np.ndarray, suffix: str) -> None:
+        """
+        Replica as estatísticas de cada grupo para as linhas (equivalente a um left join)
+
+        Colunas já existentes recebem o sufixo informado, como no merge.
+        """
+        for col in stats.columns:
+            name = f"{col}{suffix}" if col in df.columns else col
+            df[name] = stats[col].array.take(codes, allow_fill=True)
+
+    def create_aggregated_features(self, data: pd.DataFrame, copy: bool = True,
+                                   reference_date: Optional[pd.Timestamp] = None,
+                                   aggregates: Optional[AggregateState] = None,
+                                   plan: Optional[FeaturePlan] = None) -> pd.DataFrame:
         """
         Cria features agregadas baseadas em cliente e produto
 
+        As estatísticas de cliente e o RFM saem de um único groupby (a recência
+        é uma subtração vetorizada sobre a última data de cada cliente) e são
+        replicadas para as linhas pelo código do grupo, sem merge.
+
         Args:
             data: DataFrame com os dados
+            copy: Se deve copiar os dados de entrada (False = novas colunas são
+                adicionadas a uma cópia rasa, sem duplicar as colunas existentes)
+            reference_date: Data de referência da recência (None = última data dos dados)
+            aggregates: Estado agregado de todo o histórico (ex.: DataLoader.aggregate_compras);
+                se informado, as features vêm do estado e data pode ser apenas um
+                bloco do histórico (o índice do bloco é mantido)
+            plan: Plano com as features necessárias (None = todas)
 
         Returns:
             DataFrame com features agregadas
         """
         logger.info("Criando features agregadas...")
 
-        df = data.copy()
+        df = self._output_frame(data, copy)
 
-        # Features agregadas por cliente
-        if 'cliente_id' in df.columns:
-            cliente_stats = df.groupby('cliente_id').agg({
-                'valor': ['sum', 'mean', 'std', 'count'],
-                'quantidade': ['sum', 'mean'],
-            }).reset_index()
+        if aggregates is not None:
+            self._broadcast_aggregates(df, aggregates, reference_date, plan)
+            logger.info(f"Features agregadas criadas a partir do estado agregado")
+            return df
+
+        if 'cliente_id' in df.columns or 'produto_id' in df.columns:
+            # Mesmo índice resultante do merge (sem reset_index, que copia os dados)
+            df.index = pd.RangeIndex(len(df))
+
+        has_rfm = 'data_compra' in df.columns and 'cliente_id' in df.columns
+        if has_rfm:
+            df['data_compra'] = pd.to_datetime(df['data_compra'])
+
+        aggregations = {name: CLIENT_AGGREGATIONS[name] for name in self._wanted(plan, CLIENT_AGGREGATIONS)}
+        rfm_columns = self._wanted(plan, ['recencia', 'frequencia', 'valor_total']) if has_rfm else []
+        if 'recencia' in rfm_columns:
+            aggregations['ultima_compra'] = ('data_compra', 'max')
+        if 'frequencia' in rfm_columns:
+            aggregations['frequencia'] = ('compra_id', 'count')
 
-            cliente_stats.columns = ['cliente_id', 'total_gasto', 'ticket_medio', 'std_gasto',
-                                      'num_compras', 'total_itens', 'media_itens']
+        # Features agregadas por cliente (e RFM) em uma única agregação
+        if 'cliente_id' in df.columns and aggregations:
 
-            df = df.merge(cliente_stats, on='cliente_id', how='left', suffixes=('', '_agg'))
+            cliente_stats, cliente_codes = self._group_stats(df, 'cliente_id', **aggregations)
+
+            rfm = {}
+            if 'recencia' in rfm_columns:
+                # RFM (Recency, Frequency, Monetary)
+                data_ref = df['data_compra'].max() if reference_date is None else reference_date
+                rfm['recencia'] = (data_ref - cliente_stats.pop('ultima_compra')).dt.days
+            if 'frequencia' in rfm_columns:
+                rfm['frequencia'] = cliente_stats.pop('frequencia')
+            if 'valor_total' in rfm_columns:
+                rfm['valor_total'] = cliente_stats['total_gasto']
+            rfm = pd.DataFrame(rfm, index=cliente_stats.index)
+
+            self._broadcast(df, cliente_stats, cliente_codes, '_agg')
 
         # Features agregadas por produto
-        if 'produto_id' in df.columns:
-            produto_stats = df.groupby('produto_id').agg({
-                'valor': ['mean', 'count'],
-                'quantidade': 'sum'
-            }).reset_index()
+        produto_aggregations = {
+            name: PRODUCT_AGGREGATIONS[name] for name in self._wanted(plan, PRODUCT_AGGREGATIONS)
+        }
+        if 'produto_id' in df.columns and produto_aggregations:
+            produto_stats, produto_codes = self._group_stats(df, 'produto_id', **produto_aggregations)
 
-            produto_stats.columns = ['produto_id', 'preco_medio_produto', 'popularidade_produto',
-                                      'total_vendido_produto']
+            self._broadcast(df, produto_stats, produto_codes, '_prod')
 
-            df = df.merge(produto_stats, on='produto_id', how='left', suffixes=('', '_prod'))
+        if 'cliente_id' in df.columns and rfm_columns:
+            self._broadcast(df, rfm, cliente_codes, '_rfm')
+
+        logger.info(f"Features agregadas criadas com sucesso")
 
-        # RFM (Recency, Frequency, Monetary) - se houver data
-        if 'data_compra' in df.columns and 'cliente_id' in df.columns:
+        return df
+
+    def _broadcast_aggregates(self, df: pd.DataFrame, aggregates: AggregateState,
+                              reference_date: Optional[pd.Timestamp],
+                              plan: Optional[FeaturePlan] = None) -> None:
+        """Replica as features do estado agregado para as linhas (mesmas colunas e tipos do groupby)"""
+        has_rfm = 'data_compra' in df.columns and 'cliente_id' in df.columns
+        rfm_columns = ['recencia', 'frequencia', 'valor_total']
+
+        if has_rfm:
             df['data_compra'] = pd.to_datetime(df['data_compra'])
-            data_ref = df['data_compra'].max()
 
-            rfm = df.groupby('cliente_id').agg({
-                'data_compra': lambda x: (data_ref - x.max()).days,  # Recency
-                'compra_id': 'count',  # Frequency
-                'valor': 'sum'  # Monetary
-            }).reset_index()
+        if 'cliente_id' in df.columns:
+            cliente_stats = self._match_groupby_dtypes(
+                aggregates.client_features(reference_date), df, 'cliente_id',
+                dict(CLIENT_AGGREGATIONS, valor_total=CLIENT_AGGREGATIONS['total_gasto'])
+            )
+            cliente_codes = cliente_stats.index.get_indexer(df['cliente_id'])
+            stats_columns = [col for col in cliente_stats.columns if col not in rfm_columns]
+            self._broadcast(df, cliente_stats[self._wanted(plan, stats_columns)], cliente_codes, '_agg')
+
+        if 'produto_id' in df.columns:
+            produto_stats = self._match_groupby_dtypes(aggregates.product_features(), df, 'produto_id',
+                                                       PRODUCT_AGGREGATIONS)
+            produto_stats = produto_stats[self._wanted(plan, produto_stats.columns)]
+            self._broadcast(df, produto_stats, produto_stats.index.get_indexer(df['produto_id']), '_prod')
 
-            rfm.columns = ['cliente_id', 'recencia', 'frequencia', 'valor_total']
+        if has_rfm:
+            self._broadcast(df, cliente_stats[self._wanted(plan, rfm_columns)], cliente_codes, '_rfm')
 
-            df = df.merge(rfm, on='cliente_id', how='left', suffixes=('', '_rfm'))
+    @staticmethod
+    def _match_groupby_dtypes(stats: pd.DataFrame, df: pd.DataFrame, key: str,
+                              aggregations: dict) -> pd.DataFrame:
+        """
+        Converte as features do estado agregado (acumuladas em float64) para os tipos do groupby
 
-        logger.info(f"Features agregadas criadas com sucesso")
+        O tipo de cada agregação é o do groupby sobre a primeira linha dos
+        dados (ex.: quantidades int64 somam em int64, valores float32 em float32).
+        Colunas com lacunas (chaves ausentes do estado) não são convertidas para inteiro.
+        """
+        sample = df.head(1)
+        for name, (col, func) in aggregations.items():
+            if name not in stats.columns or col not in sample.columns or key not in sample.columns:
+                continue
+            dtype = sample.groupby(key)[col].agg(func).dtype
+            if pd.api.types.is_integer_dtype(dtype) and stats[name].isna().any():
+                continue
+            stats[name] = stats[name].astype(dtype)
+        return stats
+
+    def create_window_features(self, data: pd.DataFrame, windows: Tuple[int, ...] = WINDOW_DAYS,
+                               copy: bool = True, plan: Optional[FeaturePlan] = None) -> pd.DataFrame:
+        """
+        Cria features de gasto recente por cliente em janelas de dias
+
+        Para cada linha, considera apenas as compras do cliente até a data
+        da própria linha (sem informação futura): gasto, número de compras e
+        ticket médio nos últimos 30/90/180/365 dias.
+
+        Args:
+            data: DataFrame com os dados
+            windows: Tamanhos das janelas em dias
+            copy: Se deve copiar os dados de entrada (False = novas colunas são
+                adicionadas a uma cópia rasa, sem duplicar as colunas existentes)
+            plan: Plano com as features necessárias (None = todas)
+
+        Returns:
+            DataFrame com features de janela
+        """
+        logger.info("Criando features de janela temporal...")
+
+        df = self._output_frame(data, copy)
+
+        missing = [col for col in ('cliente_id', 'data_compra', 'valor') if col not in df.columns]
+        if missing:
+            logger.warning(f"Colunas {missing} não encontradas")
+            return df
+
+        if plan is not None:
+            windows = tuple(
+                days for days in windows
+                if plan.select([f'gasto_{days}d', f'compras_{days}d', f'ticket_medio_{days}d'])
+            )
+
+        features = trailing_window_features(df['cliente_id'], df['data_compra'], df['valor'], windows)
+        for col in self._wanted(plan, features):
+            df[col] = features[col]
+
+        logger.info(f"Features de janela criadas: {list(windows)} dias")
 
         return df
 
-    def create_interaction_features(self, data: pd.DataFrame) -> pd.DataFrame:
+    def create_interaction_features(self, data: pd.DataFrame, copy: bool = True,
+                                    plan: Optional[FeaturePlan] = None) -> pd.DataFrame:
         """
         Cria features de interação entre variáveis
 
         Args:
             data: DataFrame com os dados
+            copy: Se deve copiar os dados de entrada (False = novas colunas são
+                adicionadas a uma cópia rasa, sem duplicar as colunas existentes)
+            plan: Plano com as features necessárias (None = todas)
 
         Returns:
             DataFrame com features de interação
         """
         logger.info("Criando features de interação...")
 
-        df = data.copy()
+        df = self._output_frame(data, copy)
+
+        wanted = self._wanted(plan, ['valor_por_unidade', 'engajamento_por_idade',
+                                     'engajamento_x_idade', 'valor_por_idade'])
 
         # Valor por unidade
-        if 'valor' in df.columns and 'quantidade' in df.columns:
+        if 'valor' in df.columns and 'quantidade' in df.columns and 'valor_por_unidade' in wanted:
             df['valor_por_unidade'] = df['valor'] / (df['quantidade'] + 1)  # +1 para evitar divisão por zero
 
         # Engajamento x Idade
         if 'pontuacao_engajamento' in df.columns and 'idade' in df.columns:
-            df['engajamento_por_idade'] = df['pontuacao_engajamento'] / (df['idade'] + 1)
-            df['engajamento_x_idade'] = df['pontuacao_engajamento'] * df['idade']
+            if 'engajamento_por_idade' in wanted:
+                df['engajamento_por_idade'] = df['pontuacao_engajamento'] / (df['idade'] + 1)
+            if 'engajamento_x_idade' in wanted:
+                df['engajamento_x_idade'] = df['pontuacao_engajamento'] * df['idade']
 
         # Ticket médio por idade
-        if 'valor' in df.columns and 'idade' in df.columns:
+        if 'valor' in df.columns and 'idade' in df.columns and 'valor_por_idade' in wanted:
             df['valor_por_idade'] = df['valor'] / (df['idade'] + 1)
 
         logger.info("Features de interação criadas")
 
         return df
 
-    def encode_categorical_features(self, data: pd.DataFrame, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    def encode_categorical_features(self, data: pd.DataFrame, columns: Optional[List[str]] = None,
+                                    copy: bool = True) -> pd.DataFrame:
         """
-        Codifica features categóricas usando Label Encoding
+        Codifica features categóricas em códigos inteiros (classes ordenadas,
+        como no Label Encoding) com vocabulário congelado no primeiro ajuste
 
         Args:
             data: DataFrame com os dados
             columns: Lista de colunas para codificar (None = detectar automaticamente)
+            copy: Se deve copiar os dados de entrada (False = novas colunas são
+                adicionadas a uma cópia rasa, sem duplicar as colunas existentes)
 
         Returns:
             DataFrame com features codificadas
         """
         logger.info("Codificando features categóricas...")
 
-        df = data.copy()
+        df = self._output_frame(data, copy)
 
         if columns is None:
-            # Detectar colunas categóricas automaticamente
-            columns = df.select_dtypes(include=['object']).columns.tolist()
+            # Detectar colunas categóricas automaticamente (inclui tipos compactos)
+            columns = df.select_dtypes(include=['object', 'category', 'bool', 'boolean']).columns.tolist()
 
         for col in columns:
             if col in df.columns:
+                values = df[col]
+                if pd.api.types.is_bool_dtype(values):
+                    # Flags compactas são codificadas pelos rótulos originais (Sim/Não)
+                    values = values.map(FLAG_LABELS)
+
+                # Valores não vistos no ajuste recebem UNKNOWN_CODE
                 if col not in self.label_encoders:
-                    self.label_encoders[col] = LabelEncoder()
-                    df[col] = self.label_encoders[col].fit_transform(df[col].astype(str))
+                    self.label_encoders[col] = CategoricalEncoder()
+                    df[col] = self.label_encoders[col].fit_transform(values)
                 else:
-                    df[col] = self.label_encoders[col].transform(df[col].astype(str))
+                    df[col] = self.label_encoders[col].transform(values)
 
                 logger.info(f"Coluna '{col}' codificada com {len(self.label_encoders[col].classes_)} classes")
 
         return df
 
-    def scale_features(self, data: pd.DataFrame, method: str = 'standard') -> pd.DataFrame:
+    def scale_features(self, data: pd.DataFrame, method: str = 'standard', copy: bool = True) -> pd.DataFrame:
         """
         Normaliza/Padroniza features numéricas
 
         Args:
             data: DataFrame com os dados
             method: 'standard' para StandardScaler ou 'minmax' para MinMaxScaler
+            copy: Se deve copiar os dados de entrada (False = novas colunas são
+                adicionadas a uma cópia rasa, sem duplicar as colunas existentes)
 
         Returns:
             DataFrame com features normalizadas
         """
         logger.info(f"Normalizando features usando método: {method}")
 
-        df = data.copy()
+        df = self._output_frame(data, copy)
         numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
 
         if len(numeric_cols) == 0:
@@ -201,50 +410,73 @@ class FeatureEngineer:
         if method == 'standard':
             if self.scaler is None:
                 self.scaler = StandardScaler()
-                df[numeric_cols] = self.scaler.fit_transform(df[numeric_cols])
+                scaled = self.scaler.fit_transform(df[numeric_cols])
             else:
-                df[numeric_cols] = self.scaler.transform(df[numeric_cols])
+                scaled = self.scaler.transform(df[numeric_cols])
         elif method == 'minmax':
             if self.scaler is None:
                 self.scaler = MinMaxScaler()
-                df[numeric_cols] = self.scaler.fit_transform(df[numeric_cols])
+                scaled = self.scaler.fit_transform(df[numeric_cols])
             else:
-                df[numeric_cols] = self.scaler.transform(df[numeric_cols])
+                scaled = self.scaler.transform(df[numeric_cols])
+        else:
+            scaled = None
+
+        if scaled is not None:
+            # Coluna a coluna: cada uma é uma visão da matriz normalizada
+            for i, col in enumerate(numeric_cols):
+                df[col] = scaled[:, i]
 
         logger.info(f"{len(numeric_cols)} features normalizadas")
 
         return df
 
-    def select_features(self, X: pd.DataFrame, y: pd.Series, k: int = 10, method: str = 'f_classif') -> pd.DataFrame:
+    def select_features(self, X: pd.DataFrame, y: pd.Series, k: int = 10, method: str = 'f_classif',
+                        sample_size: Optional[int] = None, n_repeats: int = 3,
+                        n_jobs: int = 1) -> pd.DataFrame:
         """
         Seleciona as K melhores features
 
+        Por padrão os scores usam todas as linhas (mesmo resultado do
+        SelectKBest). Com sample_size, são calculados em n_repeats subamostras
+        estratificadas: mais rápido em bases grandes, mas a seleção pode
+        diferir da obtida com todos os dados. Os scores ficam em cache
+        (self.selector): uma nova seleção com outro k nos mesmos dados não
+        recalcula os scores. A estabilidade entre subamostras fica em
+        self.selection_report.
+
         Args:
             X: Features
             y: Target
             k: Número de features a selecionar
             method: 'f_classif' ou 'mutual_info'
+            sample_size: Linhas por subamostra (None = todas, sem subamostragem)
+            n_repeats: Número de subamostras (com sample_size)
+            n_jobs: Processos no cálculo por feature (-1 = todos os núcleos)
 
         Returns:
             DataFrame com features selecionadas
         """
         logger.info(f"Selecionando top {k} features usando {method}...")
 
-        if method == 'f_classif':
-            selector = SelectKBest(f_classif, k=min(k, X.shape[1]))
-        else:
-            selector = SelectKBest(mutual_info_classif, k=min(k, X.shape[1]))
+        params = (method, sample_size, n_repeats, n_jobs)
+        if self.selector is None or self._selector_params != params:
+            self.selector = FeatureSelector(
+                method=method, sample_size=sample_size, n_repeats=n_repeats, n_jobs=n_jobs
+            )
+            self._selector_params = params
 
-        X_selected = selector.fit_transform(X, y)
-        selected_indices = selector.get_support(indices=True)
-        self.selected_features = X.columns[selected_indices].tolist()
+        self.selected_features = self.selector.select(X, y, k)
+        self.selection_report = self.selector.stability_report(k=min(k, X.shape[1]))
 
         logger.info(f"Features selecionadas: {self.selected_features}")
 
-        return pd.DataFrame(X_selected, columns=self.selected_features, index=X.index)
+        return X[self.selected_features]
 
     def engineer_all_features(self, data: pd.DataFrame, include_temporal: bool = True,
-                               include_aggregated: bool = True, include_interactions: bool = True) -> pd.DataFrame:
+                               include_aggregated: bool = True, include_interactions: bool = True,
+                               copy: bool = True, include_windows: bool = False,
+                               n_jobs: int = 1, features: Optional[List[str]] = None) -> pd.DataFrame:
         """
         Executa todo o pipeline de feature engineering
 
@@ -253,23 +485,164 @@ class FeatureEngineer:
             include_temporal: Se deve incluir features temporais
             include_aggregated: Se deve incluir features agregadas
             include_interactions: Se deve incluir features de interação
+            copy: Se deve copiar os dados de entrada (False = todas as etapas
+                adicionam colunas ao mesmo DataFrame de saída, sem duplicar a entrada)
+            include_windows: Se deve incluir features de janela temporal (point-in-time)
+            n_jobs: Número de processos (1 = serial, -1 = todos os núcleos); em
+                paralelo as compras são particionadas por cliente
+            features: Colunas usadas pelo modelo (None = todas as features); apenas
+                as features registradas dessa lista e suas dependências são calculadas
 
         Returns:
             DataFrame com todas as features engineered
         """
         logger.info("Iniciando pipeline completo de feature engineering...")
 
-        df = data.copy()
+        plan = FeaturePlan.resolve(features) if features is not None else None
+
+        def included(step: str, flag: bool) -> bool:
+            return flag and (plan is None or plan.wants_step(step))
+
+        options = {
+            'include_temporal': included('temporal', include_temporal),
+            'include_aggregated': included('aggregated', include_aggregated),
+            'include_interactions': included('interaction', include_interactions),
+            'include_windows': included('window', include_windows),
+            'plan': plan,
+        }
+
+        n_jobs = (os.cpu_count() or 1) if n_jobs < 1 else n_jobs
+        n_jobs = min(n_jobs, len(data))
 
+        if n_jobs > 1 and 'cliente_id' in data.columns:
+            df = self._engineer_parallel(data, n_jobs, options, copy)
+        else:
+            df = self._run_steps(self._output_frame(data, copy), **options)
+
+        logger.info(f"Feature engineering concluído. Total de features: {len(df.columns)}")
+
+        return df
+
+    def _run_steps(self, df: pd.DataFrame, include_temporal: bool, include_aggregated: bool,
+                   include_interactions: bool, include_windows: bool,
+                   plan: Optional[FeaturePlan] = None,
+                   reference_date: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """Executa as etapas selecionadas sobre o DataFrame de saída (sem cópias)"""
         if include_temporal:
-            df = self.create_temporal_features(df)
+            df = self.create_temporal_features(df, copy=False, plan=plan)
 
         if include_aggregated:
-            df = self.create_aggregated_features(df)
+            df = self.create_aggregated_features(df, copy=False, reference_date=reference_date, plan=plan)
+
+        if include_windows:
+            df = self.create_window_features(df, copy=False, plan=plan)
 
         if include_interactions:
-            df = self.create_interaction_features(df)
+            df = self.create_interaction_features(df, copy=False, plan=plan)
 
-        logger.info(f"Feature engineering concluído. Total de features: {len(df.columns)}")
+        return df
+
+    def _engineer_parallel(self, data: pd.DataFrame, n_jobs: int, options: dict,
+                           copy: bool = True) -> pd.DataFrame:
+        """
+        Executa o pipeline em partições de clientes em um pool de processos
+
+        As compras são particionadas pelo hash de cliente_id, então cada
+        cliente fica inteiro em uma partição e as features de cliente são
+        exatas localmente. A recência usa a data de referência global, e as
+        features de produto são recalculadas a partir dos agregados parciais
+        de cada partição. Os processos devolvem apenas as colunas criadas ou
+        substituídas, que voltam à ordem original das linhas e são adicionadas
+        ao DataFrame de saída montado como no pipeline serial (copy=False
+        compartilha as colunas de entrada inalteradas).
+
+        Args:
+            data: DataFrame com os dados
+            n_jobs: Número de processos (e de partições)
+            options: Etapas a executar (argumentos de _run_steps)
+            copy: Se deve copiar os dados de entrada (ver engineer_all_features)
+
+        Returns:
+            DataFrame igual ao do pipeline serial
+        """
+        shard_of = pd.util.hash_pandas_object(data['cliente_id'], index=False).to_numpy() % n_jobs
+        order = np.argsort(shard_of, kind='stable')
+        bounds = np.searchsorted(shard_of[order], np.arange(n_jobs + 1))
+        shards = [order[bounds[i]:bounds[i + 1]] for i in range(n_jobs)]
+        shards = [positions for positions in shards if len(positions)]
+
+        reference_date = None
+        if options['include_aggregated'] and 'data_compra' in data.columns:
+            reference_date = pd.to_datetime(data['data_compra']).max()
+
+        logger.info(f"Feature engineering paralelo: {len(shards)} partições em {n_jobs} processos")
+
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [
+                executor.submit(_engineer_shard, data.iloc[positions], options, reference_date)
+                for positions in shards
+            ]
+            results = [future.result() for future in futures]
+
+        # Colunas devolvidas por alguma partição; nas demais a coluna não mudou
+        columns = list(dict.fromkeys(col for result, _ in results for col in result.columns))
+        parts = []
+        for (result, _), positions in zip(results, shards):
+            result = result.reset_index(drop=True)
+            for col in columns:
+                if col not in result.columns:
+                    result[col] = data[col].iloc[positions].to_numpy()
+            parts.append(result[columns])
+
+        computed = pd.concat(parts, ignore_index=True)
+        computed = computed.take(np.argsort(np.concatenate(shards), kind='stable'))
+
+        df = self._output_frame(data, copy)
+        # Mesmo índice do pipeline serial (as features agregadas reiniciam o índice)
+        if options['include_aggregated']:
+            df.index = pd.RangeIndex(len(df))
+        computed.index = df.index
+        for col in columns:
+            df[col] = computed[col]
+
+        partials = [partial for _, partial in results if partial is not None]
+        if partials:
+            self._broadcast_product_stats(df, AggregateState.combine(partials).product_features())
 
         return df
+
+    @staticmethod
+    def _broadcast_product_stats(df: pd.DataFrame, stats: pd.DataFrame) -> None:
+        """Substitui as features de produto das partições pelas globais (mesmo tipo)"""
+        codes = stats.index.get_indexer(df['produto_id'])
+        for col in stats.columns:
+            name = f"{col}_prod" if f"{col}_prod" in df.columns else col
+            if name not in df.columns:
+                continue
+            df[name] = stats[col].array.take(codes, allow_fill=True).astype(df[name].dtype)
+
+
+def _engineer_shard(shard: pd.DataFrame, options: dict,
+                    reference_date: Optional[pd.Timestamp]) -> Tuple[pd.DataFrame, Optional[AggregateState]]:
+    """
+    Executa o pipeline em uma partição (função de nível de módulo para o pool)
+
+    Returns:
+        Tupla com as colunas criadas ou substituídas na partição (na ordem do
+        DataFrame de saída) e o estado parcial de produto
+    """
+    result = FeatureEngineer()._run_steps(shard.copy(deep=False), reference_date=reference_date, **options)
+
+    # Colunas de entrada inalteradas não voltam ao processo principal
+    original = shard.reset_index(drop=True)
+    changed = [
+        col for col in result.columns
+        if col not in original.columns or not result[col].reset_index(drop=True).equals(original[col])
+    ]
+    result = result[changed]
+
+    partial = None
+    if options['include_aggregated'] and 'produto_id' in shard.columns:
+        partial = AggregateState.from_frame(shard, include_clients=False)
+
+    return result, partial
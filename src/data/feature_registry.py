@@ -0,0 +1,130 @@
+"""
+Módulo com o registro das features geradas e suas dependências
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from .calendar_features import TEMPORAL_FEATURES
+from .window_features import WINDOW_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Sufixos adicionados quando a feature já existe nos dados (como no merge)
+FEATURE_SUFFIXES = ('_agg', '_prod', '_rfm')
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    """Feature gerada pelo FeatureEngineer"""
+
+    name: str
+    step: str                                   # temporal, aggregated, window ou interaction
+    inputs: Tuple[str, ...]                     # colunas brutas usadas
+    depends_on: Tuple[str, ...] = ()            # outras features necessárias
+
+
+def _build_registry() -> Dict[str, FeatureSpec]:
+    specs = [FeatureSpec(name, 'temporal', ('data_compra',)) for name in TEMPORAL_FEATURES]
+
+    # Agregados por cliente (um groupby por cliente_id)
+    specs += [
+        FeatureSpec('total_gasto', 'aggregated', ('cliente_id', 'valor')),
+        FeatureSpec('ticket_medio', 'aggregated', ('cliente_id', 'valor')),
+        FeatureSpec('std_gasto', 'aggregated', ('cliente_id', 'valor')),
+        FeatureSpec('num_compras', 'aggregated', ('cliente_id', 'valor')),
+        FeatureSpec('total_itens', 'aggregated', ('cliente_id', 'quantidade')),
+        FeatureSpec('media_itens', 'aggregated', ('cliente_id', 'quantidade')),
+    ]
+
+    # RFM: sai do mesmo groupby por cliente
+    specs += [
+        FeatureSpec('recencia', 'aggregated', ('cliente_id', 'data_compra')),
+        FeatureSpec('frequencia', 'aggregated', ('cliente_id', 'data_compra', 'compra_id')),
+        FeatureSpec('valor_total', 'aggregated', ('cliente_id', 'data_compra'), ('total_gasto',)),
+    ]
+
+    # Agregados por produto (um groupby por produto_id)
+    specs += [
+        FeatureSpec('preco_medio_produto', 'aggregated', ('produto_id', 'valor')),
+        FeatureSpec('popularidade_produto', 'aggregated', ('produto_id', 'valor')),
+        FeatureSpec('total_vendido_produto', 'aggregated', ('produto_id', 'quantidade')),
+    ]
+
+    for days in WINDOW_DAYS:
+        specs += [
+            FeatureSpec(f'{name}_{days}d', 'window', ('cliente_id', 'data_compra', 'valor'))
+            for name in ('gasto', 'compras', 'ticket_medio')
+        ]
+
+    specs += [
+        FeatureSpec('valor_por_unidade', 'interaction', ('valor', 'quantidade')),
+        FeatureSpec('engajamento_por_idade', 'interaction', ('pontuacao_engajamento', 'idade')),
+        FeatureSpec('engajamento_x_idade', 'interaction', ('pontuacao_engajamento', 'idade')),
+        FeatureSpec('valor_por_idade', 'interaction', ('valor', 'idade')),
+    ]
+
+    return {spec.name: spec for spec in specs}
+
+
+FEATURE_REGISTRY = _build_registry()
+
+
+def registry_name(column: str) -> Optional[str]:
+    """Nome da feature registrada de uma coluna (considera os sufixos de conflito)"""
+    if column in FEATURE_REGISTRY:
+        return column
+    for suffix in FEATURE_SUFFIXES:
+        if column.endswith(suffix) and column[:-len(suffix)] in FEATURE_REGISTRY:
+            return column[:-len(suffix)]
+    return None
+
+
+@dataclass
+class FeaturePlan:
+    """Features a calcular para atender uma lista de colunas"""
+
+    features: Set[str] = field(default_factory=set)
+    inputs: Set[str] = field(default_factory=set)
+
+    def wants(self, name: str) -> bool:
+        """Verifica se a feature deve ser calculada"""
+        return name in self.features
+
+    def wants_step(self, step: str) -> bool:
+        """Verifica se alguma feature da etapa deve ser calculada"""
+        return any(FEATURE_REGISTRY[name].step == step for name in self.features)
+
+    def select(self, names: Iterable[str]) -> list:
+        """Filtra os nomes informados, mantendo a ordem"""
+        return [name for name in names if name in self.features]
+
+    @classmethod
+    def resolve(cls, columns: Iterable[str]) -> 'FeaturePlan':
+        """
+        Resolve as features (e dependências) necessárias para as colunas informadas
+
+        Colunas que não são features registradas (ex.: colunas brutas e
+        categóricas) não geram cálculo.
+
+        Args:
+            columns: Colunas usadas pelo modelo
+
+        Returns:
+            FeaturePlan com as features e as colunas brutas necessárias
+        """
+        plan = cls()
+        pending = [name for name in map(registry_name, columns) if name is not None]
+
+        while pending:
+            name = pending.pop()
+            if name in plan.features:
+                continue
+            spec = FEATURE_REGISTRY[name]
+            plan.features.add(name)
+            plan.inputs.update(spec.inputs)
+            pending.extend(spec.depends_on)
+
+        logger.info(f"Plano de features: {len(plan.features)} de {len(FEATURE_REGISTRY)} features registradas")
+
+        return plan
@@ -0,0 +1,215 @@
+"""
+Módulo de seleção de features com amostragem estratificada e cache de scores
+"""
+import pandas as pd
+import numpy as np
+import hashlib
+import joblib
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+from sklearn.feature_selection import f_classif, mutual_info_classif
+from sklearn.model_selection import StratifiedShuffleSplit
+
+logger = logging.getLogger(__name__)
+
+# Versão do cálculo dos scores (incrementar invalida o cache em disco)
+SELECTION_VERSION = 1
+
+SELECTION_METHODS = ('f_classif', 'mutual_info')
+
+
+def _mutual_info_column(values: np.ndarray, y: np.ndarray, random_state: int) -> float:
+    """Informação mútua de uma única feature (unidade de trabalho paralela)"""
+    return float(mutual_info_classif(values.reshape(-1, 1), y, random_state=random_state)[0])
+
+
+class FeatureSelector:
+    """
+    Seleção das K melhores features com scores calculados em subamostras
+
+    Por padrão os scores são calculados uma vez sobre todas as linhas (mesmo
+    resultado do SelectKBest). Com sample_size, são calculados em n_repeats
+    subamostras estratificadas de sample_size linhas, o que aproxima o
+    resultado em bases grandes (features em paralelo com joblib no método
+    mutual_info). Os scores ficam em cache pela impressão
+    digital dos dados e dos parâmetros, então selecionar com outro k não
+    recalcula nada. A variação entre subamostras é resumida em
+    stability_report.
+    """
+
+    def __init__(self, method: str = 'f_classif', sample_size: Optional[int] = None,
+                 n_repeats: int = 3, n_jobs: int = 1, random_state: int = 42,
+                 cache_dir: Optional[str] = None):
+        """
+        Args:
+            method: 'f_classif' ou 'mutual_info'
+            sample_size: Linhas por subamostra (None = todas, sem subamostragem)
+            n_repeats: Número de subamostras (ignorado quando a base cabe em uma amostra)
+            n_jobs: Processos no cálculo por feature (-1 = todos os núcleos)
+            random_state: Semente das subamostras e do estimador
+            cache_dir: Diretório do cache de scores em disco (None = apenas memória)
+        """
+        if method not in SELECTION_METHODS:
+            raise ValueError(f"Método de seleção inválido: {method} (use {SELECTION_METHODS})")
+
+        self.method = method
+        self.sample_size = sample_size
+        self.n_repeats = max(1, n_repeats)
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._cache: Dict[str, pd.DataFrame] = {}
+        self.scores_: Optional[pd.DataFrame] = None
+        self.hits = 0
+        self.misses = 0
+
+    def fingerprint(self, X: pd.DataFrame, y: pd.Series) -> str:
+        """
+        Impressão digital dos dados e dos parâmetros de cálculo
+
+        Args:
+            X: Features
+            y: Target
+
+        Returns:
+            Hash hexadecimal (igual para dados e parâmetros iguais)
+        """
+        digest = hashlib.sha256()
+        digest.update(repr((
+            SELECTION_VERSION, self.method, self.sample_size, self.n_repeats,
+            self.random_state, list(map(str, X.columns)), [str(dtype) for dtype in X.dtypes],
+        )).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+        digest.update(pd.util.hash_pandas_object(pd.Series(np.asarray(y)), index=False).to_numpy().tobytes())
+        return digest.hexdigest()
+
+    def _samples(self, y: np.ndarray) -> List[np.ndarray]:
+        """Posições das subamostras estratificadas pelo target"""
+        n_rows = len(y)
+        if self.sample_size is None or self.sample_size >= n_rows:
+            # Amostras iguais dariam os mesmos scores: uma única passada sobre todas as linhas
+            return [np.arange(n_rows)]
+
+        splitter = StratifiedShuffleSplit(
+            n_splits=self.n_repeats, train_size=self.sample_size, random_state=self.random_state
+        )
+        return [np.sort(sample) for sample, _ in splitter.split(np.zeros(n_rows), y)]
+
+    def _score_sample(self, values: np.ndarray, y: np.ndarray, random_state: int) -> np.ndarray:
+        """Scores de todas as features em uma subamostra"""
+        if self.method == 'f_classif':
+            # Vetorizado sobre todas as colunas
+            scores, _ = f_classif(values, y)
+            return scores
+
+        scores = joblib.Parallel(n_jobs=self.n_jobs)(
+            joblib.delayed(_mutual_info_column)(values[:, i], y, random_state)
+            for i in range(values.shape[1])
+        )
+        return np.asarray(scores)
+
+    def _cache_path(self, key: str) -> Optional[Path]:
+        return self.cache_dir / f"selection_{key}.pkl" if self.cache_dir else None
+
+    def score(self, X: pd.DataFrame, y: pd.Series) -> pd.DataFrame:
+        """
+        Calcula (ou recupera do cache) os scores das features
+
+        Args:
+            X: Features numéricas
+            y: Target
+
+        Returns:
+            DataFrame indexado pela feature com uma coluna por subamostra
+        """
+        key = self.fingerprint(X, y)
+        path = self._cache_path(key)
+
+        if key in self._cache:
+            self.hits += 1
+            self.scores_ = self._cache[key]
+            return self.scores_
+
+        if path is not None and path.exists():
+            self.hits += 1
+            self.scores_ = self._cache[key] = joblib.load(path)
+            logger.info(f"Scores de seleção carregados do cache: {path}")
+            return self.scores_
+
+        self.misses += 1
+        values = X.to_numpy(dtype=np.float64)
+        target = np.asarray(y)
+        samples = self._samples(target)
+
+        logger.info(
+            f"Calculando scores ({self.method}) de {X.shape[1]} features em "
+            f"{len(samples)} subamostras de {len(samples[0])} linhas..."
+        )
+
+        scores = {}
+        for repeat, sample in enumerate(samples):
+            scores[f'amostra_{repeat}'] = self._score_sample(
+                values[sample], target[sample], self.random_state + repeat
+            )
+
+        self.scores_ = self._cache[key] = pd.DataFrame(scores, index=X.columns)
+
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            joblib.dump(self.scores_, path)
+
+        return self.scores_
+
+    def select(self, X: pd.DataFrame, y: pd.Series, k: int) -> List[str]:
+        """
+        Seleciona as K features com maior score médio
+
+        Args:
+            X: Features numéricas
+            y: Target
+            k: Número de features
+
+        Returns:
+            Features selecionadas, na ordem das colunas de X
+        """
+        # Scores NaN (features constantes) ficam abaixo de todos os demais, como no SelectKBest
+        mean_scores = self.score(X, y).mean(axis=1).fillna(-np.inf).to_numpy()
+        k = min(k, X.shape[1])
+
+        # Mesmo critério de desempate do SelectKBest
+        top = np.argsort(mean_scores, kind='mergesort')[len(mean_scores) - k:]
+        mask = np.zeros(len(mean_scores), dtype=bool)
+        mask[top] = True
+
+        return X.columns[mask].tolist()
+
+    def stability_report(self, k: Optional[int] = None) -> pd.DataFrame:
+        """
+        Estabilidade dos scores entre as subamostras do último cálculo
+
+        Args:
+            k: Tamanho da seleção usada na frequência de top-k (None = sem essa coluna)
+
+        Returns:
+            DataFrame por feature com média, desvio e coeficiente de variação
+            do score, posição média e desvio da posição e, com k, a fração
+            das subamostras em que a feature ficou entre as k melhores
+        """
+        if self.scores_ is None:
+            raise ValueError("Nenhum score calculado: execute score ou select antes")
+
+        ranks = self.scores_.rank(ascending=False, method='min', na_option='bottom')
+
+        report = pd.DataFrame({
+            'score_medio': self.scores_.mean(axis=1),
+            'score_std': self.scores_.std(axis=1, ddof=0),
+            'rank_medio': ranks.mean(axis=1),
+            'rank_std': ranks.std(axis=1, ddof=0),
+        })
+        report['cv_score'] = (report['score_std'] / report['score_medio'].abs()).where(report['score_medio'] != 0)
+
+        if k is not None:
+            report['freq_top_k'] = (ranks <= k).mean(axis=1)
+
+        return report.sort_values('rank_medio')
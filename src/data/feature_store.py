@@ -0,0 +1,408 @@
+"""
+Módulo de feature store online com agregados por cliente e por produto
+"""
+import pandas as pd
+import numpy as np
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Any
+
+from .partial_aggregates import group_moments, merge_moments
+
+logger = logging.getLogger(__name__)
+
+# Versão do formato em disco (incrementar invalida stores existentes)
+FEATURE_STORE_VERSION = 2
+
+# Sem compra registrada na coluna de última data (dias desde 1970-01-01)
+NO_DATE = np.iinfo(np.int64).min
+
+# Campos de estado por entidade e seus tipos
+CLIENT_FIELDS = {
+    'compras': np.int64,      # número de compras (frequência)
+    'n_valor': np.int64,      # compras com valor informado
+    'soma': np.float64,       # soma de valor
+    'media': np.float64,      # média de valor (Welford)
+    'm2': np.float64,         # soma dos quadrados dos desvios (Welford)
+    'itens': np.int64,        # total de itens
+    'n_itens': np.int64,      # compras com quantidade informada
+    'ultima_data': np.int64,  # dia da última compra
+}
+
+PRODUCT_FIELDS = {
+    'n_valor': np.int64,
+    'soma': np.float64,
+    'itens': np.int64,
+}
+
+
+def _to_days(dates) -> np.ndarray:
+    """Converte datas para dias desde 1970-01-01 (NaT = NO_DATE)"""
+    dates = pd.to_datetime(pd.Series(dates), errors='coerce')
+    days = dates.dt.normalize().to_numpy(dtype='datetime64[D]').astype(np.int64)
+    days[dates.isna().to_numpy()] = NO_DATE
+    return days
+
+
+def _to_day(date) -> int:
+    """Converte uma data para dias desde 1970-01-01 (NaT = NO_DATE)"""
+    date = pd.Timestamp(date)
+    if pd.isna(date):
+        return NO_DATE
+    return int(date.value // 86_400_000_000_000)
+
+
+class _EntityState:
+    """Arrays de estado alinhados a um array ordenado de IDs (posição por busca binária)"""
+
+    def __init__(self, fields: Dict[str, type], ids: Optional[np.ndarray] = None,
+                 arrays: Optional[Dict[str, np.ndarray]] = None):
+        self.fields = fields
+        self.ids = ids if ids is not None else np.empty(0, dtype=np.int64)
+        if arrays is None:
+            arrays = {name: self._empty(name, len(self.ids)) for name in fields}
+        self.arrays = arrays
+
+    def _empty(self, name: str, size: int) -> np.ndarray:
+        fill = NO_DATE if name == 'ultima_data' else 0
+        return np.full(size, fill, dtype=self.fields[name])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def positions(self, ids: np.ndarray) -> np.ndarray:
+        """Posição de cada ID nos arrays de estado (-1 = desconhecido)"""
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.full(len(ids), -1, dtype=np.int64)
+        pos = np.searchsorted(self.ids, ids).clip(max=len(self.ids) - 1)
+        return np.where(self.ids[pos] == ids, pos, -1)
+
+    def ensure(self, ids: np.ndarray) -> np.ndarray:
+        """
+        Garante uma posição gravável para cada ID
+
+        IDs novos são inseridos na ordem (memória proporcional ao número de
+        entidades, não ao maior ID); arrays mapeados do disco viram cópias
+        graváveis na primeira atualização.
+
+        Returns:
+            Posições dos IDs nos arrays de estado
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        positions = self.positions(ids)
+        writable = all(array.flags.writeable for array in self.arrays.values())
+
+        if writable and (positions >= 0).all():
+            return positions
+
+        merged = np.union1d(self.ids, ids)
+        where = np.searchsorted(merged, self.ids)
+        for name, array in self.arrays.items():
+            grown = self._empty(name, len(merged))
+            grown[where] = array
+            self.arrays[name] = grown
+        self.ids = merged
+
+        return self.positions(ids)
+
+    def take(self, ids: np.ndarray) -> Dict[str, np.ndarray]:
+        """Estado de cada ID (IDs desconhecidos recebem estado vazio)"""
+        positions = self.positions(ids)
+        known = positions >= 0
+        positions = np.where(known, positions, 0)
+
+        result = {}
+        for name, array in self.arrays.items():
+            values = array[positions] if len(array) else self._empty(name, len(positions))
+            empty = self._empty(name, 1)[0]
+            result[name] = np.where(known, values, empty)
+        return result
+
+
+class FeatureStore:
+    """
+    Agregados de clientes e produtos atualizados a cada compra
+
+    O estado fica em arrays numpy alinhados ao array ordenado de IDs de cada
+    entidade (cliente_id e produto_id inteiros não negativos): soma/contagem,
+    média e desvio padrão pelo algoritmo de Welford, total de itens e data
+    da última compra. A posição de um ID é achada por busca binária, então
+    a memória acompanha o número de entidades e não o maior ID. Cada compra
+    de uma entidade conhecida atualiza o estado em O(log n); entidades novas
+    são inseridas na ordem. O store pode ser salvo como arquivos .npy e
+    carregado com memory-map.
+    """
+
+    def __init__(self):
+        self.clientes = _EntityState(CLIENT_FIELDS)
+        self.produtos = _EntityState(PRODUCT_FIELDS)
+        self.max_date = NO_DATE
+        self.version = 0
+
+    @staticmethod
+    def _validate_ids(ids: np.ndarray, name: str) -> np.ndarray:
+        values = pd.to_numeric(pd.Series(ids), errors='coerce')
+        if values.isna().any() or (values < 0).any() or (values != np.floor(values)).any():
+            raise ValueError(f"{name} deve conter apenas inteiros não negativos")
+        return values.to_numpy().astype(np.int64)
+
+    @staticmethod
+    def _validate_id(value, name: str) -> int:
+        if pd.isna(value) or value < 0 or value != int(value):
+            raise ValueError(f"{name} deve conter apenas inteiros não negativos")
+        return int(value)
+
+    def update(self, cliente_id: int, produto_id: int, valor: Optional[float],
+               quantidade: Optional[int], data_compra) -> None:
+        """
+        Registra uma compra (passo de Welford)
+
+        Args:
+            cliente_id: ID do cliente
+            produto_id: ID do produto
+            valor: Valor da compra
+            quantidade: Quantidade de itens
+            data_compra: Data da compra
+        """
+        cliente_id = self._validate_id(cliente_id, 'cliente_id')
+        produto_id = self._validate_id(produto_id, 'produto_id')
+        tem_valor = valor is not None and not pd.isna(valor)
+        tem_quantidade = quantidade is not None and not pd.isna(quantidade)
+
+        pos = int(self.clientes.ensure([cliente_id])[0])
+        cliente = self.clientes.arrays
+        cliente['compras'][pos] += 1
+
+        if tem_valor:
+            n = cliente['n_valor'][pos] + 1
+            delta = valor - cliente['media'][pos]
+            cliente['media'][pos] += delta / n
+            cliente['m2'][pos] += delta * (valor - cliente['media'][pos])
+            cliente['n_valor'][pos] = n
+            cliente['soma'][pos] += valor
+
+        if tem_quantidade:
+            cliente['itens'][pos] += int(quantidade)
+            cliente['n_itens'][pos] += 1
+
+        dia = _to_day(data_compra)
+        cliente['ultima_data'][pos] = max(int(cliente['ultima_data'][pos]), dia)
+
+        pos = int(self.produtos.ensure([produto_id])[0])
+        produto = self.produtos.arrays
+        if tem_valor:
+            produto['n_valor'][pos] += 1
+            produto['soma'][pos] += valor
+        if tem_quantidade:
+            produto['itens'][pos] += int(quantidade)
+
+        self.max_date = max(self.max_date, dia)
+        self.version += 1
+
+    def update_batch(self, purchases: pd.DataFrame) -> None:
+        """
+        Registra um lote de compras (custo proporcional ao lote)
+
+        Args:
+            purchases: DataFrame com cliente_id, produto_id, valor, quantidade e data_compra
+        """
+        if len(purchases) == 0:
+            return
+
+        valor = pd.to_numeric(purchases['valor'], errors='coerce').to_numpy(dtype=np.float64)
+        quantidade = pd.to_numeric(purchases['quantidade'], errors='coerce').to_numpy(dtype=np.float64)
+        dias = _to_days(purchases['data_compra'])
+
+        # Clientes
+        cliente_ids = self._validate_ids(purchases['cliente_id'], 'cliente_id')
+        codes, ids = pd.factorize(cliente_ids)
+        positions = self.clientes.ensure(np.asarray(ids, dtype=np.int64))
+        state = self.clientes.arrays
+
+        moments = group_moments(codes, len(positions), valor)
+        n, mean, m2 = merge_moments(
+            state['n_valor'][positions], state['media'][positions], state['m2'][positions],
+            moments['n'], moments['media'], moments['m2']
+        )
+        state['n_valor'][positions] = n
+        state['soma'][positions] += moments['total']
+        state['media'][positions] = mean
+        state['m2'][positions] = m2
+        state['compras'][positions] += np.bincount(codes, minlength=len(positions))
+
+        itens_validos = ~np.isnan(quantidade)
+        state['itens'][positions] += np.bincount(
+            codes[itens_validos], weights=quantidade[itens_validos], minlength=len(positions)
+        ).astype(np.int64)
+        state['n_itens'][positions] += np.bincount(codes[itens_validos], minlength=len(positions))
+
+        ultima = np.full(len(positions), NO_DATE, dtype=np.int64)
+        np.maximum.at(ultima, codes, dias)
+        state['ultima_data'][positions] = np.maximum(state['ultima_data'][positions], ultima)
+
+        # Produtos
+        produto_ids = self._validate_ids(purchases['produto_id'], 'produto_id')
+        codes, ids = pd.factorize(produto_ids)
+        positions = self.produtos.ensure(np.asarray(ids, dtype=np.int64))
+        state = self.produtos.arrays
+
+        valor_valido = ~np.isnan(valor)
+        state['n_valor'][positions] += np.bincount(codes[valor_valido], minlength=len(positions))
+        state['soma'][positions] += np.bincount(
+            codes[valor_valido], weights=valor[valor_valido], minlength=len(positions)
+        )
+        state['itens'][positions] += np.bincount(
+            codes[itens_validos], weights=quantidade[itens_validos], minlength=len(positions)
+        ).astype(np.int64)
+
+        self.max_date = max(self.max_date, int(dias.max()))
+        self.version += 1
+
+    @classmethod
+    def from_purchases(cls, purchases: pd.DataFrame) -> 'FeatureStore':
+        """
+        Constrói o store a partir do histórico de compras
+
+        Args:
+            purchases: DataFrame de compras (cliente_id, produto_id, valor, quantidade, data_compra)
+
+        Returns:
+            FeatureStore preenchido
+        """
+        store = cls()
+        store.update_batch(purchases)
+        logger.info(
+            f"Feature store construído: {int((store.clientes.arrays['compras'] > 0).sum())} clientes, "
+            f"{int((store.produtos.arrays['n_valor'] > 0).sum())} produtos"
+        )
+        return store
+
+    def client_features(self, cliente_ids, as_of=None) -> Dict[str, np.ndarray]:
+        """
+        Features agregadas de clientes (mesmas colunas de create_aggregated_features)
+
+        Args:
+            cliente_ids: IDs dos clientes
+            as_of: Data de referência da recência (None = última compra registrada)
+
+        Returns:
+            Dicionário {feature: array}; clientes sem histórico têm num_compras = 0
+        """
+        ids = pd.to_numeric(pd.Series(cliente_ids), errors='coerce').fillna(-1).to_numpy().astype(np.int64)
+        state = self.clientes.take(ids)
+
+        n = state['n_valor']
+        total = state['soma']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.where(n > 1, np.sqrt(state['m2'] / np.maximum(n - 1, 1)), np.nan)
+            media_itens = np.where(state['n_itens'] > 0, state['itens'] / np.maximum(state['n_itens'], 1), np.nan)
+
+        referencia = self.max_date if as_of is None else _to_day(as_of)
+        tem_data = state['ultima_data'] != NO_DATE
+        recencia = np.where(tem_data, referencia - np.where(tem_data, state['ultima_data'], 0), np.nan)
+
+        return {
+            'total_gasto': total,
+            'ticket_medio': np.where(n > 0, total / np.maximum(n, 1), np.nan),
+            'std_gasto': std,
+            'num_compras': n,
+            'total_itens': state['itens'],
+            'media_itens': media_itens,
+            'recencia': recencia,
+            'frequencia': state['compras'],
+            'valor_total': total,
+        }
+
+    def product_features(self, produto_ids) -> Dict[str, np.ndarray]:
+        """
+        Features agregadas de produtos
+
+        Args:
+            produto_ids: IDs dos produtos
+
+        Returns:
+            Dicionário {feature: array}; produtos sem vendas têm popularidade 0
+        """
+        ids = pd.to_numeric(pd.Series(produto_ids), errors='coerce').fillna(-1).to_numpy().astype(np.int64)
+        state = self.produtos.take(ids)
+
+        return {
+            'preco_medio_produto': np.where(
+                state['n_valor'] > 0, state['soma'] / np.maximum(state['n_valor'], 1), np.nan
+            ),
+            'popularidade_produto': state['n_valor'],
+            'total_vendido_produto': state['itens'],
+        }
+
+    def save(self, path: str) -> None:
+        """
+        Salva o store em um diretório (um .npy por campo + metadata.json)
+
+        Args:
+            path: Diretório de destino
+        """
+        directory = Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        for prefix, entity in [('clientes', self.clientes), ('produtos', self.produtos)]:
+            np.save(directory / f"{prefix}_ids.npy", np.ascontiguousarray(entity.ids))
+            for name, array in entity.arrays.items():
+                np.save(directory / f"{prefix}_{name}.npy", np.ascontiguousarray(array))
+
+        # Metadados por último: um store parcial não é carregado
+        meta = {'version': FEATURE_STORE_VERSION, 'max_date': int(self.max_date), 'updates': self.version}
+        with open(directory / 'metadata.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+        logger.info(f"Feature store salvo em: {directory}")
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = 'r') -> 'FeatureStore':
+        """
+        Carrega um store salvo
+
+        Com mmap_mode='r' os arrays são mapeados do disco (leitura imediata,
+        sem carregar tudo em memória); a primeira atualização cria cópias
+        graváveis em memória.
+
+        Args:
+            path: Diretório do store
+            mmap_mode: Modo do memory-map (None = carregar em memória)
+
+        Returns:
+            FeatureStore carregado
+        """
+        directory = Path(path)
+        with open(directory / 'metadata.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        if meta.get('version') != FEATURE_STORE_VERSION:
+            raise ValueError(
+                f"Versão do feature store incompatível: {meta.get('version')} "
+                f"(esperada {FEATURE_STORE_VERSION})"
+            )
+
+        store = cls()
+        for prefix, fields in [('clientes', CLIENT_FIELDS), ('produtos', PRODUCT_FIELDS)]:
+            arrays = {
+                name: np.load(directory / f"{prefix}_{name}.npy", mmap_mode=mmap_mode)
+                for name in fields
+            }
+            ids = np.load(directory / f"{prefix}_ids.npy", mmap_mode=mmap_mode)
+            setattr(store, prefix, _EntityState(fields, ids, arrays))
+
+        store.max_date = meta['max_date']
+        store.version = meta.get('updates', 0)
+
+        return store
+
+    def info(self) -> Dict[str, Any]:
+        """Resumo do conteúdo do store"""
+        return {
+            'clientes': int((self.clientes.arrays['compras'] > 0).sum()),
+            'produtos': int((self.produtos.arrays['n_valor'] > 0).sum()),
+            'ultima_data': str(np.datetime64(self.max_date, 'D')) if self.max_date != NO_DATE else None,
+            'atualizacoes': self.version,
+        }
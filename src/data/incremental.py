@@ -0,0 +1,459 @@
+"""
+Módulo de ingestão incremental de compras com marca d'água (watermark)
+"""
+import pandas as pd
+import numpy as np
+import hashlib
+import io
+import json
+import logging
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Any
+
+from .cache import DataCache
+
+logger = logging.getLogger(__name__)
+
+# Versão do formato da marca d'água (incrementar força recarga completa)
+WATERMARK_VERSION = 1
+
+# Bytes antes do offset usados para detectar arquivos reescritos
+_FINGERPRINT_BYTES = 64 * 1024
+
+# Número de partes acrescentadas antes de consolidar a tabela acumulada
+_MAX_PARTS = 16
+
+
+def sorted_keys(values: pd.Series) -> np.ndarray:
+    """
+    IDs únicos e ordenados de uma coluna (valores não numéricos são ignorados)
+
+    Args:
+        values: Coluna de IDs
+
+    Returns:
+        Array int64 ordenado (pesquisável com searchsorted)
+    """
+    ids = pd.to_numeric(values, errors='coerce').dropna()
+    return np.unique(ids.to_numpy(dtype=np.int64))
+
+
+def contains_sorted(keys: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """Máscara dos ids presentes no array ordenado keys (busca binária)"""
+    if len(keys) == 0 or len(ids) == 0:
+        return np.zeros(len(ids), dtype=bool)
+    pos = np.searchsorted(keys, ids).clip(max=len(keys) - 1)
+    return keys[pos] == ids
+
+
+def tail_fingerprint(path: Path, offset: int) -> str:
+    """
+    Calcula o SHA-256 dos últimos bytes já ingeridos do arquivo
+
+    Args:
+        path: Caminho do arquivo
+        offset: Posição até onde o arquivo foi lido
+
+    Returns:
+        Hash hexadecimal
+    """
+    start = max(0, offset - _FINGERPRINT_BYTES)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+
+@dataclass
+class Watermark:
+    """Posição da última ingestão de um CSV que só recebe novas linhas no final"""
+
+    byte_offset: int
+    fingerprint: str
+    header: str
+    linhas: int
+    ultimo_compra_id: Optional[int] = None
+    ultima_data_compra: Optional[str] = None
+    atualizado_em: Optional[str] = None
+    partes: int = 0
+    version: int = WATERMARK_VERSION
+
+    def save(self, path: Path) -> None:
+        """Grava a marca d'água em JSON"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(asdict(self), f)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['Watermark']:
+        """Carrega a marca d'água (None se ausente, inválida ou de outra versão)"""
+        if not path.exists():
+            return None
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            watermark = cls(**data)
+        except (OSError, ValueError, TypeError):
+            return None
+
+        if watermark.version != WATERMARK_VERSION:
+            return None
+
+        return watermark
+
+
+class IncrementalIngestor:
+    """Mantém uma cópia em cache de um CSV de compras e ingere apenas o que foi acrescentado"""
+
+    def __init__(self, csv_path: Path, cache: DataCache, name: str = 'compras_store',
+                 key: str = 'compra_id', date_column: str = 'data_compra'):
+        """
+        Args:
+            csv_path: Caminho do CSV de compras
+            cache: Cache onde ficam a tabela acumulada e a marca d'água
+            name: Nome da entrada no cache
+            key: Coluna de ID crescente das compras
+            date_column: Coluna de data das compras
+        """
+        self.csv_path = Path(csv_path)
+        self.cache = cache
+        self.name = name
+        self.key = key
+        self.date_column = date_column
+        self.watermark_path = cache.cache_dir / f"{name}.watermark.json"
+        # Compras recebidas por arquivos delta (não estão no CSV): reaplicadas na recarga completa
+        self.delta_log_path = cache.cache_dir / f"{name}.delta.csv"
+
+    def _read_full(self) -> Tuple[pd.DataFrame, int, str]:
+        """Lê o CSV inteiro; retorna dados, offset final e cabeçalho"""
+        with open(self.csv_path, 'rb') as f:
+            content = f.read()
+
+        header = content.split(b'\n', 1)[0].decode('utf-8').rstrip('\r')
+        data = pd.read_csv(io.BytesIO(content), delimiter=';', encoding='utf-8')
+
+        return data, len(content), header
+
+    def _read_tail(self, offset: int, columns: list) -> Tuple[pd.DataFrame, int]:
+        """
+        Lê apenas as linhas completas acrescentadas após o offset
+
+        Returns:
+            Tupla com as novas linhas e o novo offset
+        """
+        with open(self.csv_path, 'rb') as f:
+            f.seek(offset)
+            tail = f.read()
+
+        end = tail.rfind(b'\n') + 1
+
+        # Arquivos sem quebra de linha final: a última linha entra se estiver
+        # com todos os campos (caso contrário é uma escrita em andamento)
+        last_line = tail[end:]
+        if last_line.strip() and last_line.count(b';') == len(columns) - 1:
+            end = len(tail)
+
+        if end == 0 or not tail[:end].strip():
+            return pd.DataFrame(columns=columns), offset + end
+
+        data = pd.read_csv(
+            io.BytesIO(tail[:end]),
+            delimiter=';',
+            encoding='utf-8',
+            header=None,
+            names=columns
+        )
+
+        return data, offset + end
+
+    def _watermark_for(self, source: pd.DataFrame, offset: int, header: str, partes: int,
+                       previous: Optional[Watermark] = None) -> Watermark:
+        """
+        Cria a marca d'água da tabela acumulada
+
+        Com a marca anterior, source contém apenas as compras novas: o total de
+        linhas, o último ID e a última data são atualizados a partir delas.
+        """
+
+        ultimo_id = previous.ultimo_compra_id if previous is not None else None
+        if self.key in source.columns and source[self.key].notna().any():
+            maior = int(source[self.key].max())
+            ultimo_id = maior if ultimo_id is None else max(maior, ultimo_id)
+
+        ultima_data = previous.ultima_data_compra if previous is not None else None
+        if self.date_column in source.columns and len(source):
+            datas = pd.to_datetime(source[self.date_column], errors='coerce')
+            if datas.notna().any():
+                nova = str(datas.max().date())
+                ultima_data = max(nova, ultima_data) if ultima_data else nova
+
+        return Watermark(
+            byte_offset=offset,
+            fingerprint=tail_fingerprint(self.csv_path, offset),
+            header=header,
+            linhas=len(source) + (previous.linhas if previous is not None else 0),
+            ultimo_compra_id=ultimo_id,
+            ultima_data_compra=ultima_data,
+            atualizado_em=datetime.now().isoformat(timespec='seconds'),
+            partes=partes,
+        )
+
+    def _is_append_only(self, watermark: Watermark) -> bool:
+        """Verifica se o arquivo apenas cresceu desde a marca d'água"""
+        if self.csv_path.stat().st_size < watermark.byte_offset:
+            return False
+
+        with open(self.csv_path, 'rb') as f:
+            header = f.readline().decode('utf-8').rstrip('\r\n')
+        if header != watermark.header:
+            return False
+
+        return tail_fingerprint(self.csv_path, watermark.byte_offset) == watermark.fingerprint
+
+    def _drop_known(self, delta: pd.DataFrame, known: List[np.ndarray]) -> pd.DataFrame:
+        """
+        Descarta linhas cujo ID já foi ingerido (reenvios de compras antigas)
+
+        A comparação é feita com os IDs efetivamente ingeridos (índices
+        ordenados das partes, busca binária), e não com o maior ID: compras
+        novas podem chegar com IDs fora de ordem.
+
+        Args:
+            delta: Compras recebidas
+            known: Arrays ordenados de IDs já ingeridos (ver sorted_keys)
+        """
+        if self.key not in delta.columns:
+            return delta
+
+        ids = pd.to_numeric(delta[self.key], errors='coerce')
+        presentes = ids.notna().to_numpy()
+        valores = ids[presentes].to_numpy(dtype=np.int64)
+
+        conhecidas = np.zeros(len(delta), dtype=bool)
+        for keys in known:
+            conhecidas[presentes] |= contains_sorted(keys, valores)
+        # Reenvios dentro do próprio lote (ex.: mesma compra no CSV e no arquivo delta)
+        repetidas = (ids.duplicated() & ids.notna()).to_numpy()
+
+        descartadas = conhecidas | repetidas
+        if descartadas.any():
+            logger.warning(f"Ignoradas {int(descartadas.sum())} compras com {self.key} já ingerido")
+
+        return delta[~descartadas]
+
+    def _log_delta_rows(self, rows: pd.DataFrame) -> None:
+        """Acrescenta ao registro durável as compras vindas de arquivos delta"""
+        if len(rows) == 0:
+            return
+
+        self.delta_log_path.parent.mkdir(parents=True, exist_ok=True)
+        header = not self.delta_log_path.exists()
+        rows.to_csv(self.delta_log_path, mode='a', sep=';', index=False, header=header, encoding='utf-8')
+
+    def _apply_delta_log(self, store: pd.DataFrame) -> pd.DataFrame:
+        """Reaplica sobre o CSV recarregado as compras recebidas por arquivos delta"""
+        if not self.delta_log_path.exists():
+            return store
+
+        logged = pd.read_csv(self.delta_log_path, delimiter=';', encoding='utf-8')
+        if self.key in store.columns:
+            logged = self._drop_known(logged, [sorted_keys(store[self.key])])
+        if len(logged) == 0:
+            return store
+
+        logger.info(f"Reaplicadas {len(logged)} compras recebidas por arquivos delta")
+        return self.append(store, logged.reset_index(drop=True))
+
+    @staticmethod
+    def append(store: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+        """
+        Concatena as compras novas alinhando os tipos aos da tabela acumulada
+
+        Args:
+            store: Tabela acumulada (ex.: já em memória)
+            delta: Compras novas
+
+        Returns:
+            Tabela com as compras novas no final
+        """
+        if len(delta) == 0:
+            return store
+        delta = delta.astype({
+            col: store[col].dtype for col in delta.columns
+            if col in store.columns and not isinstance(store[col].dtype, pd.CategoricalDtype)
+        }, errors='ignore')
+        return pd.concat([store, delta], ignore_index=True)
+
+    def _load_parts(self, watermark: Watermark) -> Optional[pd.DataFrame]:
+        """Lê a tabela acumulada (base + partes acrescentadas); None se alguma parte faltar"""
+        parts = []
+        for i in range(watermark.partes + 1):
+            part = self.cache.load(self._part_name(i), [])
+            if part is None:
+                return None
+            parts.append(part)
+
+        store = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+        return store if len(store) == watermark.linhas else None
+
+    def load_store(self) -> pd.DataFrame:
+        """
+        Tabela acumulada de compras (base + partes acrescentadas)
+
+        Sem marca d'água, com partes ausentes ou com o CSV reescrito, o CSV é
+        recarregado por completo.
+
+        Returns:
+            DataFrame com todas as compras ingeridas
+        """
+        watermark = Watermark.load(self.watermark_path)
+        if watermark is not None and self._is_append_only(watermark):
+            store = self._load_parts(watermark)
+            if store is not None:
+                return store
+
+        store, _ = self._full_reload(watermark)
+        return store
+
+    def _part_name(self, index: int) -> str:
+        """Nome no cache da base (0) ou de uma parte acrescentada"""
+        return self.name if index == 0 else f"{self.name}_parte{index}"
+
+    def _keys_path(self, index: int) -> Path:
+        """Índice ordenado dos IDs de uma parte"""
+        return self.cache.cache_dir / f"{self._part_name(index)}.keys.npy"
+
+    def _save_part(self, index: int, data: pd.DataFrame) -> None:
+        """Grava uma parte da tabela acumulada com o seu índice de IDs"""
+        self.cache.save(self._part_name(index), data, [])
+        keys = sorted_keys(data[self.key]) if self.key in data.columns else np.empty(0, dtype=np.int64)
+        # Arquivo temporário + rename: índices abertos com memory-map não são truncados
+        keys_path = self._keys_path(index)
+        tmp_path = keys_path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, keys)
+        tmp_path.replace(keys_path)
+
+    def _load_keys(self, watermark: Watermark) -> Optional[List[np.ndarray]]:
+        """Índices de IDs das partes (memory-map); None se algum estiver ausente"""
+        known = []
+        for i in range(watermark.partes + 1):
+            path = self._keys_path(i)
+            if not path.exists():
+                return None
+            try:
+                known.append(np.load(path, mmap_mode='r'))
+            except (OSError, ValueError):
+                return None
+        return known
+
+    def _full_reload(self, watermark: Optional[Watermark]) -> Tuple[pd.DataFrame, Watermark]:
+        """Relê o CSV inteiro (com as compras dos arquivos delta) e recria base e marca d'água"""
+        if watermark is not None:
+            logger.info("Marca d'água inválida ou arquivo reescrito: recarga completa das compras")
+
+        store, offset, header = self._read_full()
+        store = self._apply_delta_log(store)
+        new_watermark = self._watermark_for(store, offset, header, partes=0)
+        self._save_part(0, store)
+        new_watermark.save(self.watermark_path)
+        return store, new_watermark
+
+    def refresh(self, delta_path: Optional[Path] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Ingere as compras novas na tabela acumulada
+
+        Sem marca d'água válida (primeira execução ou arquivo reescrito), o CSV
+        é lido inteiro e as compras retornadas são a tabela completa. Caso
+        contrário, apenas os bytes após a marca d'água são lidos; os IDs novos
+        são conferidos com os índices ordenados (memory-map) de cada parte e as
+        compras novas gravadas como uma nova parte, sem carregar nem regravar a
+        tabela acumulada (custo proporcional às compras novas). A cada
+        _MAX_PARTS atualizações as partes são consolidadas em uma nova base.
+
+        Um arquivo delta (CSV com cabeçalho) pode ser informado para ingerir
+        compras entregues separadamente; essas compras também são registradas
+        em <name>.delta.csv (preservado por DataCache.clear) e reaplicadas
+        sobre o CSV em toda recarga completa.
+
+        Args:
+            delta_path: CSV opcional apenas com as compras novas
+
+        Returns:
+            Tupla com (compras novas, informações da atualização); no modo
+            'completo' as compras novas são a tabela inteira
+        """
+        watermark = Watermark.load(self.watermark_path)
+        known = self._load_keys(watermark) if watermark is not None else None
+
+        if known is None or not self._is_append_only(watermark):
+            store, new_watermark = self._full_reload(watermark)
+            info = self._info('completo', store, new_watermark)
+            logger.info(f"✅ Ingestão completa: {info['total_compras']} compras")
+            return store, info
+
+        delta, offset = self._read_tail(watermark.byte_offset, watermark.header.split(';'))
+
+        delta = self._drop_known(delta, known)
+
+        if delta_path is not None:
+            extra = pd.read_csv(delta_path, delimiter=';', encoding='utf-8')
+            if self.key in delta.columns:
+                extra = self._drop_known(extra, known + [sorted_keys(delta[self.key])])
+            else:
+                extra = self._drop_known(extra, known)
+            # Registro durável antes de gravar a parte: a recarga completa não perde estas compras
+            self._log_delta_rows(extra)
+            delta = pd.concat([delta, extra], ignore_index=True) if len(delta) else extra
+
+        delta = delta.reset_index(drop=True)
+
+        if len(delta) == 0:
+            if offset != watermark.byte_offset:
+                # Apenas linhas em branco ou compras já ingeridas: avança a marca
+                watermark.byte_offset = offset
+                watermark.fingerprint = tail_fingerprint(self.csv_path, offset)
+                watermark.save(self.watermark_path)
+
+            logger.info("Nenhuma compra nova desde a última ingestão")
+            return delta, self._info('sem_alteracoes', delta, watermark)
+
+        if watermark.partes + 1 > _MAX_PARTS:
+            # Muitas partes: consolida tudo em uma nova base (custo amortizado)
+            store = self._load_parts(watermark)
+            if store is None:
+                store, new_watermark = self._full_reload(watermark)
+                info = self._info('completo', store, new_watermark)
+                return store, info
+            partes = 0
+            self._save_part(0, self.append(store, delta))
+        else:
+            partes = watermark.partes + 1
+            self._save_part(partes, delta)
+
+        new_watermark = self._watermark_for(delta, offset, watermark.header, partes=partes,
+                                            previous=watermark)
+        new_watermark.save(self.watermark_path)
+
+        info = self._info('incremental', delta, new_watermark)
+        logger.info(
+            f"✅ Ingestão incremental: {info['novas_compras']} compras novas "
+            f"({info['total_compras']} no total)"
+        )
+
+        return delta, info
+
+    def _info(self, modo: str, delta: pd.DataFrame, watermark: Watermark) -> Dict[str, Any]:
+        """Resumo do que mudou na atualização"""
+        return {
+            'modo': modo,
+            'novas_compras': len(delta),
+            'total_compras': watermark.linhas,
+            'clientes_afetados': sorted(delta['cliente_id'].dropna().unique().tolist()) if 'cliente_id' in delta else [],
+            'produtos_afetados': sorted(delta['produto_id'].dropna().unique().tolist()) if 'produto_id' in delta else [],
+            'watermark': asdict(watermark),
+        }
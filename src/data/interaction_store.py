@@ -0,0 +1,504 @@
+"""
+Módulo com a matriz esparsa de interações cliente × produto
+"""
+import pandas as pd
+import numpy as np
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Any
+from scipy import sparse
+
+from .cache import file_signature
+
+logger = logging.getLogger(__name__)
+
+# Versão do formato em disco (incrementar invalida matrizes existentes)
+INTERACTION_STORE_VERSION = 1
+
+# Sem compra com data registrada (dias desde 1970-01-01)
+NO_DATE = np.iinfo(np.int64).min
+
+# Pesos de cada célula (cliente, produto)
+CELL_FIELDS = {
+    'compras': np.int64,        # número de compras
+    'n_valor': np.int64,        # compras com valor informado
+    'valor': np.float64,        # soma de valor
+    'n_quantidade': np.int64,   # compras com quantidade informada
+    'quantidade': np.float64,   # soma de quantidade
+}
+
+# Estado por linha (cliente)
+ROW_FIELDS = {
+    'primeira_data': np.int64,  # dia da primeira compra
+    'ultima_data': np.int64,    # dia da última compra
+    'n_datas': np.int64,        # compras com data válida
+}
+
+
+def _cells_from_frame(purchases: pd.DataFrame) -> pd.DataFrame:
+    """Pesos de cada par (cliente, produto) de um bloco de compras"""
+    data = pd.DataFrame({
+        'cliente_id': pd.to_numeric(purchases['cliente_id'], errors='coerce'),
+        'produto_id': pd.to_numeric(purchases['produto_id'], errors='coerce'),
+        'valor': pd.to_numeric(purchases['valor'], errors='coerce'),
+        'quantidade': pd.to_numeric(purchases['quantidade'], errors='coerce'),
+    }).dropna(subset=['cliente_id', 'produto_id'])
+
+    if ((data['cliente_id'] < 0) | (data['produto_id'] < 0)).any():
+        raise ValueError("cliente_id e produto_id devem conter apenas inteiros não negativos")
+
+    cells = data.astype({'cliente_id': np.int64, 'produto_id': np.int64}).groupby(
+        ['cliente_id', 'produto_id'], sort=False
+    ).agg(
+        compras=('produto_id', 'size'),
+        n_valor=('valor', 'count'),
+        valor=('valor', 'sum'),
+        n_quantidade=('quantidade', 'count'),
+        quantidade=('quantidade', 'sum'),
+    )
+    return cells.reset_index()
+
+
+def _dates_from_frame(purchases: pd.DataFrame) -> pd.DataFrame:
+    """Primeira e última data e compras datadas por cliente"""
+    datas = pd.to_datetime(purchases['data_compra'], errors='coerce')
+    data = pd.DataFrame({
+        'cliente_id': pd.to_numeric(purchases['cliente_id'], errors='coerce'),
+        'dia': datas.dt.normalize().to_numpy(dtype='datetime64[D]').astype(np.int64),
+    })
+    data = data[datas.notna().to_numpy() & data['cliente_id'].notna().to_numpy()]
+
+    dates = data.astype({'cliente_id': np.int64}).groupby('cliente_id', sort=False)['dia'].agg(
+        primeira_data='min', ultima_data='max', n_datas='size'
+    )
+    return dates.reset_index()
+
+
+class InteractionStore:
+    """
+    Matriz esparsa (CSR) de interações cliente × produto
+
+    Linhas são indexadas pelo cliente_id e colunas pelo produto_id (inteiros
+    não negativos, como no FeatureStore), e todas as matrizes de pesos
+    (compras, valor, quantidade e contagens de valores válidos) compartilham
+    a mesma estrutura indptr/indices. O histórico de um cliente é uma fatia
+    de linha, a popularidade dos produtos é a soma das colunas e a
+    similaridade entre clientes é um produto esparso. A matriz é salva como
+    arquivos .npy e carregada com memory-map.
+    """
+
+    def __init__(self, indptr: Optional[np.ndarray] = None, indices: Optional[np.ndarray] = None,
+                 cells: Optional[Dict[str, np.ndarray]] = None, rows: Optional[Dict[str, np.ndarray]] = None,
+                 n_cols: int = 0):
+        self.indptr = indptr if indptr is not None else np.zeros(1, dtype=np.int64)
+        self.indices = indices if indices is not None else np.zeros(0, dtype=np.int64)
+        self.cells = cells if cells is not None else {
+            name: np.zeros(0, dtype=dtype) for name, dtype in CELL_FIELDS.items()
+        }
+        self.rows = rows if rows is not None else {
+            name: np.zeros(0, dtype=dtype) for name, dtype in ROW_FIELDS.items()
+        }
+        self.n_cols = n_cols
+        self.version = 0
+        self._totals = None
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def nnz(self) -> int:
+        return len(self.indices)
+
+    def matrix(self, field: str = 'compras') -> sparse.csr_matrix:
+        """
+        Matriz CSR de um dos pesos (sem copiar os arrays)
+
+        Args:
+            field: Peso das células (compras, n_valor, valor, n_quantidade ou quantidade)
+
+        Returns:
+            csr_matrix clientes × produtos
+        """
+        return sparse.csr_matrix(
+            (self.cells[field], self.indices, self.indptr), shape=(self.n_rows, self.n_cols), copy=False
+        )
+
+    def _merge_dates(self, dates: pd.DataFrame, n_rows: int) -> None:
+        """Estende o estado por linha até n_rows e combina as datas informadas"""
+        rows = {}
+        for name, dtype in ROW_FIELDS.items():
+            fill = NO_DATE if name.endswith('_data') else 0
+            array = np.full(n_rows, fill, dtype=dtype)
+            array[:len(self.rows[name])] = self.rows[name]
+            rows[name] = array
+
+        if len(dates):
+            ids = dates['cliente_id'].to_numpy(dtype=np.int64)
+            primeira = dates['primeira_data'].to_numpy(dtype=np.int64)
+            atual = rows['primeira_data'][ids]
+            rows['primeira_data'][ids] = np.where(atual == NO_DATE, primeira, np.minimum(atual, primeira))
+            rows['ultima_data'][ids] = np.maximum(rows['ultima_data'][ids], dates['ultima_data'].to_numpy())
+            rows['n_datas'][ids] += dates['n_datas'].to_numpy(dtype=np.int64)
+
+        self.rows = rows
+
+    def _build(self, cells: pd.DataFrame, dates: pd.DataFrame) -> None:
+        """Monta a estrutura CSR a partir de células em formato longo (pares repetidos são somados)"""
+        cells = cells.groupby(['cliente_id', 'produto_id'], sort=True)[list(CELL_FIELDS)].sum().reset_index()
+
+        row_ids = cells['cliente_id'].to_numpy(dtype=np.int64)
+        n_rows = max(int(row_ids.max()) + 1 if len(row_ids) else 0,
+                     int(dates['cliente_id'].max()) + 1 if len(dates) else 0)
+
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(row_ids, minlength=n_rows))]).astype(np.int64)
+        self.indices = cells['produto_id'].to_numpy(dtype=np.int64)
+        self.cells = {name: cells[name].to_numpy(dtype=dtype) for name, dtype in CELL_FIELDS.items()}
+        self.n_cols = int(self.indices.max()) + 1 if len(self.indices) else 0
+        self._merge_dates(dates, n_rows)
+        self._totals = None
+
+    @staticmethod
+    def _reduce_dates(frames: List[pd.DataFrame]) -> pd.DataFrame:
+        dates = pd.concat(frames, ignore_index=True)
+        return dates.groupby('cliente_id', sort=False).agg(
+            primeira_data=('primeira_data', 'min'), ultima_data=('ultima_data', 'max'),
+            n_datas=('n_datas', 'sum'),
+        ).reset_index()
+
+    def update_batch(self, purchases: pd.DataFrame) -> None:
+        """
+        Registra um lote de compras
+
+        Pares (cliente, produto) já existentes são somados no lugar; apenas
+        os pares novos são inseridos na estrutura CSR, nas posições dadas por
+        busca binária. O histórico não é relido.
+
+        Args:
+            purchases: DataFrame com cliente_id, produto_id, valor, quantidade e data_compra
+        """
+        if len(purchases) == 0:
+            return
+
+        delta = _cells_from_frame(purchases)
+        dates = _dates_from_frame(purchases)
+        row_ids = delta['cliente_id'].to_numpy(dtype=np.int64)
+        col_ids = delta['produto_id'].to_numpy(dtype=np.int64)
+
+        n_rows = max(self.n_rows, int(row_ids.max()) + 1 if len(row_ids) else 0,
+                     int(dates['cliente_id'].max()) + 1 if len(dates) else 0)
+        n_cols = max(self.n_cols, int(col_ids.max()) + 1 if len(col_ids) else 0)
+
+        # Chaves linha-maior: a ordem CSR (linha, coluna crescente) é a ordem das chaves
+        existing = np.repeat(np.arange(self.n_rows, dtype=np.int64), np.diff(self.indptr)) * n_cols + self.indices
+        keys = row_ids * n_cols + col_ids
+        order = np.argsort(keys, kind='stable')
+        keys, row_ids, col_ids = keys[order], row_ids[order], col_ids[order]
+
+        positions = np.searchsorted(existing, keys)
+        found = positions < len(existing)
+        found[found] = existing[positions[found]] == keys[found]
+
+        cells = {}
+        for name, dtype in CELL_FIELDS.items():
+            values = delta[name].to_numpy(dtype=dtype)[order]
+            array = np.array(self.cells[name], dtype=dtype)
+            array[positions[found]] += values[found]
+            cells[name] = np.insert(array, positions[~found], values[~found])
+
+        new_rows = np.bincount(row_ids[~found], minlength=n_rows)
+        indptr = np.concatenate([self.indptr, np.full(n_rows - self.n_rows, self.indptr[-1], dtype=np.int64)])
+        indptr[1:] += np.cumsum(new_rows)
+
+        self.indices = np.insert(np.asarray(self.indices), positions[~found], col_ids[~found])
+        self.indptr = indptr
+        self.cells = cells
+        self.n_cols = n_cols
+        self._merge_dates(dates, n_rows)
+        self._totals = None
+        self.version += 1
+
+    def update(self, purchase: Dict[str, Any]) -> None:
+        """
+        Registra uma única compra
+
+        Args:
+            purchase: Dicionário com cliente_id, produto_id, valor, quantidade e data_compra
+        """
+        self.update_batch(pd.DataFrame([purchase]))
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[pd.DataFrame]) -> 'InteractionStore':
+        """
+        Constrói a matriz a partir do histórico lido em blocos
+
+        Cada bloco é reduzido às suas células (uma linha por par cliente ×
+        produto) antes de ser combinado, então a memória fica limitada ao
+        bloco mais as células distintas.
+
+        Args:
+            chunks: Blocos de compras (ex.: DataLoader.iter_compras)
+
+        Returns:
+            InteractionStore preenchido
+        """
+        cell_frames, date_frames = [], []
+        n_chunks = 0
+
+        for chunk in chunks:
+            cell_frames.append(_cells_from_frame(chunk))
+            date_frames.append(_dates_from_frame(chunk))
+            n_chunks += 1
+
+        store = cls()
+        if n_chunks:
+            store._build(pd.concat(cell_frames, ignore_index=True), cls._reduce_dates(date_frames))
+
+        logger.info(
+            f"Matriz de interações construída: {int((np.diff(store.indptr) > 0).sum())} clientes, "
+            f"{store.n_cols} colunas de produto, {store.nnz} pares em {n_chunks} blocos"
+        )
+
+        return store
+
+    @classmethod
+    def from_purchases(cls, purchases: pd.DataFrame) -> 'InteractionStore':
+        """
+        Constrói a matriz a partir do histórico de compras em memória
+
+        Args:
+            purchases: DataFrame de compras (cliente_id, produto_id, valor, quantidade, data_compra)
+
+        Returns:
+            InteractionStore preenchido
+        """
+        return cls.from_chunks([purchases])
+
+    def _row_slice(self, cliente_id: int) -> slice:
+        if cliente_id is None or pd.isna(cliente_id) or not 0 <= cliente_id < self.n_rows:
+            return slice(0, 0)
+        cliente_id = int(cliente_id)
+        return slice(int(self.indptr[cliente_id]), int(self.indptr[cliente_id + 1]))
+
+    def client_products(self, cliente_id: int) -> pd.DataFrame:
+        """
+        Produtos comprados por um cliente (fatia da linha, sem varrer o histórico)
+
+        Args:
+            cliente_id: ID do cliente
+
+        Returns:
+            DataFrame com produto_id e os pesos de cada produto (vazio se não houver compras)
+        """
+        row = self._row_slice(cliente_id)
+        return pd.DataFrame({'produto_id': np.asarray(self.indices[row]), **{
+            name: np.asarray(values[row]) for name, values in self.cells.items()
+        }})
+
+    def client_summary(self, cliente_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Resumo do histórico de um cliente
+
+        Args:
+            cliente_id: ID do cliente
+
+        Returns:
+            Dicionário com compras, valor_total, valor_medio, quantidade_media,
+            primeira_data, ultima_data e n_datas, ou None sem compras
+        """
+        row = self._row_slice(cliente_id)
+        compras = int(self.cells['compras'][row].sum())
+        if compras == 0:
+            return None
+
+        cliente_id = int(cliente_id)
+        n_valor = int(self.cells['n_valor'][row].sum())
+        n_quantidade = int(self.cells['n_quantidade'][row].sum())
+        valor_total = float(self.cells['valor'][row].sum())
+
+        def as_date(day: int) -> Optional[pd.Timestamp]:
+            return None if day == NO_DATE else pd.Timestamp(np.datetime64(int(day), 'D'))
+
+        return {
+            'compras': compras,
+            'valor_total': valor_total,
+            'valor_medio': valor_total / n_valor if n_valor else np.nan,
+            'quantidade_media': float(self.cells['quantidade'][row].sum()) / n_quantidade if n_quantidade else np.nan,
+            'primeira_data': as_date(self.rows['primeira_data'][cliente_id]),
+            'ultima_data': as_date(self.rows['ultima_data'][cliente_id]),
+            'n_datas': int(self.rows['n_datas'][cliente_id]),
+        }
+
+    def product_totals(self) -> pd.DataFrame:
+        """
+        Totais por produto (soma das colunas, calculada uma vez por versão)
+
+        Returns:
+            DataFrame indexado por produto_id com os pesos somados, apenas produtos com compras
+        """
+        if self._totals is None:
+            indices = np.asarray(self.indices)
+            totals = {
+                name: np.bincount(indices, weights=values, minlength=self.n_cols)
+                for name, values in self.cells.items()
+            }
+            compras = totals['compras']
+            self._totals = pd.DataFrame(totals, index=pd.Index(np.arange(self.n_cols), name='produto_id'))[compras > 0]
+        return self._totals
+
+    def popular_products_for(self, cliente_id: int) -> pd.DataFrame:
+        """
+        Popularidade dos produtos entre os demais clientes, excluindo os já comprados
+
+        Como os produtos do cliente são excluídos, as demais colunas não têm
+        compras dele e a popularidade é o total da coluna.
+
+        Args:
+            cliente_id: ID do cliente
+
+        Returns:
+            DataFrame com produto_id, avg_price e purchase_count (mais populares
+            primeiro, empates pelo produto_id)
+        """
+        totals = self.product_totals()
+        purchased = np.asarray(self.indices[self._row_slice(cliente_id)])
+        totals = totals[~totals.index.isin(purchased)]
+
+        popularity = pd.DataFrame({
+            'produto_id': totals.index.to_numpy(),
+            'avg_price': (totals['valor'] / totals['n_valor']).where(totals['n_valor'] > 0).to_numpy(),
+            'purchase_count': totals['compras'].to_numpy(dtype=np.int64),
+        })
+        return popularity.sort_values(['purchase_count', 'produto_id'], ascending=[False, True],
+                                      kind='mergesort').reset_index(drop=True)
+
+    def similar_clients(self, cliente_id: int, top_n: int = 10, field: str = 'compras') -> pd.DataFrame:
+        """
+        Clientes mais parecidos pela similaridade de cosseno das linhas
+
+        Args:
+            cliente_id: ID do cliente
+            top_n: Número de clientes retornados
+            field: Peso usado na similaridade
+
+        Returns:
+            DataFrame com cliente_id e similaridade (maior primeiro), sem o próprio cliente
+        """
+        row = self._row_slice(cliente_id)
+        if row.start == row.stop:
+            return pd.DataFrame({'cliente_id': np.zeros(0, dtype=np.int64), 'similaridade': np.zeros(0)})
+
+        matrix = self.matrix(field).astype(np.float64)
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        scores = np.asarray((matrix @ matrix[int(cliente_id)].T).todense()).ravel()
+        scores = np.divide(scores, norms * norms[int(cliente_id)], out=np.zeros_like(scores), where=norms > 0)
+        scores[int(cliente_id)] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        order = candidates[np.lexsort((candidates, -scores[candidates]))][:top_n]
+
+        return pd.DataFrame({'cliente_id': order, 'similaridade': scores[order]})
+
+    def save(self, path: str, sources: Optional[List[Path]] = None) -> None:
+        """
+        Salva a matriz em um diretório (um .npy por array + metadata.json)
+
+        Args:
+            path: Diretório de destino
+            sources: Arquivos de origem cujas assinaturas ficam nos metadados
+        """
+        directory = Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        np.save(directory / 'indptr.npy', np.ascontiguousarray(self.indptr))
+        np.save(directory / 'indices.npy', np.ascontiguousarray(self.indices))
+        for prefix, arrays in [('celula', self.cells), ('cliente', self.rows)]:
+            for name, array in arrays.items():
+                np.save(directory / f"{prefix}_{name}.npy", np.ascontiguousarray(array))
+
+        # Metadados por último: uma matriz parcial não é carregada
+        meta = {
+            'version': INTERACTION_STORE_VERSION,
+            'n_cols': self.n_cols,
+            'updates': self.version,
+            'sources': {str(p): file_signature(p, with_hash=False) for p in (sources or [])},
+        }
+        with open(directory / 'metadata.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+        logger.info(f"Matriz de interações salva em: {directory}")
+
+    @staticmethod
+    def is_current(path: str, sources: List[Path]) -> bool:
+        """
+        Verifica se a matriz salva foi construída a partir dos arquivos atuais
+
+        Args:
+            path: Diretório da matriz
+            sources: Arquivos CSV de origem
+
+        Returns:
+            True se versão e assinaturas (tamanho/data de modificação) conferem
+        """
+        meta_path = Path(path) / 'metadata.json'
+        if not meta_path.exists():
+            return False
+
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        if meta.get('version') != INTERACTION_STORE_VERSION:
+            return False
+
+        expected = meta.get('sources', {})
+        return all(
+            source.exists() and file_signature(source, with_hash=False) == expected.get(str(source))
+            for source in sources
+        )
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = 'r') -> 'InteractionStore':
+        """
+        Carrega uma matriz salva
+
+        Com mmap_mode='r' os arrays são mapeados do disco; consultas leem só
+        as fatias usadas e atualizações criam novos arrays em memória.
+
+        Args:
+            path: Diretório da matriz
+            mmap_mode: Modo do memory-map (None = carregar em memória)
+
+        Returns:
+            InteractionStore carregado
+        """
+        directory = Path(path)
+        with open(directory / 'metadata.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        if meta.get('version') != INTERACTION_STORE_VERSION:
+            raise ValueError(
+                f"Versão da matriz de interações incompatível: {meta.get('version')} "
+                f"(esperada {INTERACTION_STORE_VERSION})"
+            )
+
+        store = cls(
+            indptr=np.load(directory / 'indptr.npy', mmap_mode=mmap_mode),
+            indices=np.load(directory / 'indices.npy', mmap_mode=mmap_mode),
+            cells={name: np.load(directory / f"celula_{name}.npy", mmap_mode=mmap_mode) for name in CELL_FIELDS},
+            rows={name: np.load(directory / f"cliente_{name}.npy", mmap_mode=mmap_mode) for name in ROW_FIELDS},
+            n_cols=meta['n_cols'],
+        )
+        store.version = meta.get('updates', 0)
+
+        return store
+
+    def info(self) -> Dict[str, Any]:
+        """Resumo do conteúdo da matriz"""
+        return {
+            'clientes': int((np.diff(self.indptr) > 0).sum()),
+            'produtos': int(len(self.product_totals())),
+            'pares': self.nnz,
+            'compras': int(np.asarray(self.cells['compras']).sum()),
+            'atualizacoes': self.version,
+        }
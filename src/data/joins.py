@@ -0,0 +1,162 @@
+"""
+Módulo de joins por índice posicional entre compras e tabelas de dimensão
+"""
+import pandas as pd
+import numpy as np
+import logging
+from typing import Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Chaves acima deste múltiplo do tamanho da tabela usam índice hash em vez de array denso
+_MAX_DENSITY_FACTOR = 4
+
+
+class DimensionIndex:
+    """Índice posicional de uma tabela de dimensão (chave -> linha)"""
+
+    def __init__(self, table: pd.DataFrame, key: str):
+        self.table = table
+        self.key = key
+
+        keys = table[key]
+        if keys.isnull().any():
+            raise ValueError(f"Chave '{key}' possui valores nulos")
+        if keys.duplicated().any():
+            raise ValueError(f"Chave '{key}' possui valores duplicados")
+
+        self._positions = None
+        self._hash_index = None
+
+        key_values = keys.to_numpy()
+        is_integer = pd.api.types.is_integer_dtype(keys)
+        dense = (
+            is_integer and len(key_values) > 0 and key_values.min() >= 0
+            and key_values.max() <= _MAX_DENSITY_FACTOR * len(key_values) + 1024
+        )
+
+        if dense:
+            # Array denso: posição da linha para cada valor de chave (-1 = inexistente)
+            self._positions = np.full(int(key_values.max()) + 1, -1, dtype=np.int64)
+            self._positions[key_values] = np.arange(len(key_values))
+        else:
+            self._hash_index = pd.Index(key_values)
+
+    def lookup(self, foreign_keys) -> np.ndarray:
+        """
+        Retorna a posição na tabela de dimensão para cada chave estrangeira
+
+        Args:
+            foreign_keys: Chaves estrangeiras (Series ou array)
+
+        Returns:
+            Array de posições (-1 para chaves inexistentes)
+        """
+        if self._hash_index is not None:
+            return self._hash_index.get_indexer(np.asarray(foreign_keys))
+
+        values = np.asarray(foreign_keys)
+        if values.dtype.kind not in 'iu':
+            # Chaves com lacunas (float/object): valores não inteiros nunca casam
+            values = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+            integral = ~np.isnan(values) & (values == np.floor(values))
+            values = np.where(integral, values, -1).astype(np.int64)
+
+        in_range = (values >= 0) & (values < len(self._positions))
+
+        positions = np.full(len(values), -1, dtype=np.int64)
+        positions[in_range] = self._positions[values[in_range]]
+
+        return positions
+
+    def gather(self, column: str, positions: np.ndarray):
+        """
+        Busca os valores de uma coluna da dimensão nas posições informadas
+
+        Args:
+            column: Nome da coluna
+            positions: Posições (-1 produz valor ausente)
+
+        Returns:
+            Array com os valores
+        """
+        values = self.table[column].array
+        return values.take(positions, allow_fill=True)
+
+
+class DimensionJoiner:
+    """Join de compras com clientes e produtos reutilizável entre lotes"""
+
+    def __init__(self, clientes: pd.DataFrame, produtos: pd.DataFrame):
+        self.clientes_index = DimensionIndex(clientes, 'cliente_id')
+        self.produtos_index = DimensionIndex(produtos, 'produto_id')
+
+    def uses(self, clientes: pd.DataFrame, produtos: pd.DataFrame) -> bool:
+        """Verifica se o índice foi construído para as tabelas informadas"""
+        return self.clientes_index.table is clientes and self.produtos_index.table is produtos
+
+    def lookup(self, compras: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calcula as posições de cliente e produto de cada compra
+
+        Args:
+            compras: DataFrame de compras
+
+        Returns:
+            Tupla com posições de clientes e de produtos (-1 = órfão)
+        """
+        return (
+            self.clientes_index.lookup(compras['cliente_id']),
+            self.produtos_index.lookup(compras['produto_id']),
+        )
+
+    def count_orphans(self, compras: pd.DataFrame) -> Dict[str, int]:
+        """
+        Conta compras com chaves estrangeiras inexistentes
+
+        Args:
+            compras: DataFrame de compras
+
+        Returns:
+            Dicionário com contagem de clientes e produtos órfãos
+        """
+        cliente_pos, produto_pos = self.lookup(compras)
+        return {
+            'clientes_invalidos': int((cliente_pos < 0).sum()),
+            'produtos_invalidos': int((produto_pos < 0).sum()),
+        }
+
+    def join(self, compras: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, int]]:
+        """
+        Combina compras com clientes e produtos (equivalente a dois left joins)
+
+        Colunas da dimensão com nome já existente recebem os sufixos
+        '_cliente' e '_produto', como em merge_data.
+
+        Args:
+            compras: DataFrame de compras
+
+        Returns:
+            Tupla com DataFrame combinado e contagem de chaves órfãs
+        """
+        cliente_pos, produto_pos = self.lookup(compras)
+
+        columns = {col: compras[col].array.copy() for col in compras.columns}
+
+        for index, positions, suffix in [(self.clientes_index, cliente_pos, '_cliente'),
+                                         (self.produtos_index, produto_pos, '_produto')]:
+            for col in index.table.columns:
+                if col == index.key:
+                    continue
+                name = f"{col}{suffix}" if col in columns else col
+                columns[name] = index.gather(col, positions)
+
+        # Arrays recém-criados pelo gather: não há por que copiá-los de novo
+        merged = pd.DataFrame(columns, copy=False)
+
+        report = {
+            'clientes_invalidos': int((cliente_pos < 0).sum()),
+            'produtos_invalidos': int((produto_pos < 0).sum()),
+        }
+
+        return merged, report
@@ -0,0 +1,306 @@
+"""
+Módulo com estados parciais de agregação por cliente e por produto
+
+Cada bloco de compras gera um estado parcial (somas, contagens, momentos e
+datas extremas); estados parciais são combinados de forma associativa, o
+que permite calcular as features agregadas de um histórico maior que a
+memória lendo o arquivo em blocos.
+"""
+import pandas as pd
+import numpy as np
+import logging
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Combinações pendentes antes de reduzir os estados parciais acumulados
+_MAX_PENDING = 8
+
+
+def group_moments(codes: np.ndarray, n_groups: int, values: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Contagem, soma, média e M2 (soma dos quadrados dos desvios) por grupo
+
+    Args:
+        codes: Código do grupo de cada valor (0..n_groups-1)
+        n_groups: Número de grupos
+        values: Valores (NaN são ignorados)
+
+    Returns:
+        Dicionário com n, total, media e m2 por grupo
+    """
+    valid = ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+
+    n = np.bincount(codes, minlength=n_groups)
+    total = np.bincount(codes, weights=values, minlength=n_groups)
+    mean = np.divide(total, n, out=np.zeros(n_groups), where=n > 0)
+    m2 = np.bincount(codes, weights=(values - mean[codes]) ** 2, minlength=n_groups)
+
+    return {'n': n, 'total': total, 'media': mean, 'm2': m2}
+
+
+def merge_moments(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+    """Combina média e M2 de dois conjuntos (Chan et al.)"""
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    safe_n = np.where(n > 0, n, 1)
+    mean = mean_a + delta * n_b / safe_n
+    m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / safe_n
+    return n, mean, m2
+
+
+def _as_float(values: pd.Series) -> np.ndarray:
+    return pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64)
+
+
+def _as_nanoseconds(values: pd.Series) -> np.ndarray:
+    """Datas em nanossegundos desde 1970 (NaT = menor int64)"""
+    dates = pd.to_datetime(values, errors='coerce')
+    return dates.to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+
+def _group_extreme(codes: np.ndarray, n_groups: int, nanoseconds: np.ndarray, how: str) -> np.ndarray:
+    """Menor ou maior data de cada grupo, ignorando NaT"""
+    nat = np.iinfo(np.int64).min
+    if how == 'min':
+        # NaT vira o maior int64 para não vencer o mínimo (válido também sem grupos)
+        sentinel = np.iinfo(np.int64).max
+        values = np.full(n_groups, sentinel)
+        np.minimum.at(values, codes, np.where(nanoseconds == nat, sentinel, nanoseconds))
+        values[values == sentinel] = nat
+    else:
+        values = np.full(n_groups, nat)
+        np.maximum.at(values, codes, nanoseconds)
+    return values.view('datetime64[ns]')
+
+
+def _reduce(frames: List[pd.DataFrame], sums: List[str], mins: List[str],
+            maxs: List[str]) -> pd.DataFrame:
+    """
+    Combina estados parciais de várias partes (uma linha por chave em cada parte)
+
+    Somas e contagens são somadas, datas usam mínimo/máximo e a média/M2
+    são combinadas pela fórmula de Chan generalizada para k partes:
+    M2 = Σ M2_i + Σ n_i (média_i - média)².
+    """
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        return pd.DataFrame(columns=sums + mins + maxs + ['media', 'm2'])
+    if len(frames) == 1:
+        return frames[0]
+
+    stacked = pd.concat(frames)
+    codes, uniques = pd.factorize(stacked.index)
+    n_groups = len(uniques)
+
+    result = {
+        col: np.bincount(codes, weights=stacked[col].to_numpy(dtype=np.float64), minlength=n_groups)
+        for col in sums
+    }
+
+    for cols, how in [(mins, 'min'), (maxs, 'max')]:
+        for col in cols:
+            result[col] = _group_extreme(codes, n_groups, _as_nanoseconds(stacked[col]), how)
+
+    n_i = stacked['n_valor'].to_numpy(dtype=np.float64)
+    mean_i = stacked['media'].to_numpy(dtype=np.float64)
+    n = result['n_valor']
+    mean = np.divide(
+        np.bincount(codes, weights=n_i * mean_i, minlength=n_groups), n,
+        out=np.zeros(n_groups), where=n > 0
+    )
+    m2 = np.bincount(
+        codes, weights=stacked['m2'].to_numpy() + n_i * (mean_i - mean[codes]) ** 2, minlength=n_groups
+    )
+    result['media'] = mean
+    result['m2'] = m2
+
+    return pd.DataFrame(result, index=pd.Index(uniques, name=stacked.index.name))
+
+
+class AggregateState:
+    """
+    Estado parcial de agregação de um conjunto de compras
+
+    Por cliente: compras, contagem/soma/média/M2 de valor, total e contagem
+    de quantidades, primeira e última data de compra. Por produto: contagem
+    e soma de valor e total de itens. Estados são combinados com merge
+    (associativo), e as features finais saem de client_features e
+    product_features.
+    """
+
+    CLIENT_SUMS = ['compras', 'n_valor', 'soma', 'itens', 'n_itens']
+    CLIENT_MINS = ['primeira_data']
+    CLIENT_MAXS = ['ultima_data']
+    PRODUCT_SUMS = ['n_valor', 'soma', 'itens', 'n_itens']
+
+    def __init__(self, clientes: Optional[pd.DataFrame] = None, produtos: Optional[pd.DataFrame] = None):
+        self.clientes = clientes if clientes is not None else _reduce(
+            [], self.CLIENT_SUMS, self.CLIENT_MINS, self.CLIENT_MAXS)
+        self.produtos = produtos if produtos is not None else _reduce([], self.PRODUCT_SUMS, [], [])
+
+    @staticmethod
+    def _entity_state(data: pd.DataFrame, key: str, with_dates: bool) -> pd.DataFrame:
+        """Estado parcial de uma entidade (uma linha por valor da chave)"""
+        codes, uniques = pd.factorize(data[key])
+        valid = codes >= 0
+        codes = codes[valid]
+        n_groups = len(uniques)
+
+        valor = _as_float(data['valor'])[valid]
+        moments = group_moments(codes, n_groups, valor)
+
+        state = {
+            'n_valor': moments['n'].astype(np.float64),
+            'soma': moments['total'],
+            'media': moments['media'],
+            'm2': moments['m2'],
+        }
+
+        quantidade = _as_float(data['quantidade'])[valid]
+        tem_quantidade = ~np.isnan(quantidade)
+        state['itens'] = np.bincount(
+            codes[tem_quantidade], weights=quantidade[tem_quantidade], minlength=n_groups
+        )
+        state['n_itens'] = np.bincount(codes[tem_quantidade], minlength=n_groups).astype(np.float64)
+
+        if with_dates:
+            if 'compra_id' in data.columns:
+                contadas = data['compra_id'].notna().to_numpy()[valid]
+                state['compras'] = np.bincount(codes[contadas], minlength=n_groups).astype(np.float64)
+            else:
+                state['compras'] = np.bincount(codes, minlength=n_groups).astype(np.float64)
+
+            if 'data_compra' in data.columns:
+                datas = _as_nanoseconds(data['data_compra'])[valid]
+            else:
+                datas = np.full(len(codes), np.iinfo(np.int64).min)
+            state['primeira_data'] = _group_extreme(codes, n_groups, datas, 'min')
+            state['ultima_data'] = _group_extreme(codes, n_groups, datas, 'max')
+
+        return pd.DataFrame(state, index=pd.Index(uniques, name=key))
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame, include_clients: bool = True) -> 'AggregateState':
+        """
+        Calcula o estado parcial de um bloco de compras
+
+        Args:
+            data: Bloco com cliente_id, produto_id, valor, quantidade, data_compra e compra_id
+            include_clients: Se deve calcular o estado por cliente
+
+        Returns:
+            AggregateState do bloco
+        """
+        clientes = produtos = None
+        if include_clients and 'cliente_id' in data.columns:
+            clientes = cls._entity_state(data, 'cliente_id', with_dates=True)
+        if 'produto_id' in data.columns:
+            produtos = cls._entity_state(data, 'produto_id', with_dates=False)
+        return cls(clientes, produtos)
+
+    @classmethod
+    def combine(cls, states: Iterable['AggregateState']) -> 'AggregateState':
+        """
+        Combina vários estados parciais em um só
+
+        Args:
+            states: Estados parciais (a ordem não altera o resultado)
+
+        Returns:
+            AggregateState combinado
+        """
+        states = list(states)
+        return cls(
+            _reduce([s.clientes for s in states], cls.CLIENT_SUMS, cls.CLIENT_MINS, cls.CLIENT_MAXS),
+            _reduce([s.produtos for s in states], cls.PRODUCT_SUMS, [], []),
+        )
+
+    def merge(self, other: 'AggregateState') -> 'AggregateState':
+        """Combina este estado com outro"""
+        return self.combine([self, other])
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[pd.DataFrame]) -> 'AggregateState':
+        """
+        Calcula o estado de um histórico lido em blocos
+
+        Apenas os estados parciais (uma linha por cliente/produto) ficam em
+        memória; os blocos são descartados após a agregação.
+
+        Args:
+            chunks: Blocos de compras (ex.: DataLoader.iter_compras)
+
+        Returns:
+            AggregateState de todo o histórico
+        """
+        state = cls()
+        pending = []
+        n_chunks = 0
+
+        for chunk in chunks:
+            pending.append(cls.from_frame(chunk))
+            n_chunks += 1
+            if len(pending) >= _MAX_PENDING:
+                state = cls.combine([state] + pending)
+                pending = []
+
+        state = cls.combine([state] + pending)
+
+        logger.info(
+            f"Agregação em blocos concluída: {n_chunks} blocos, "
+            f"{len(state.clientes)} clientes, {len(state.produtos)} produtos"
+        )
+
+        return state
+
+    @property
+    def ultima_data(self) -> Optional[pd.Timestamp]:
+        """Data da compra mais recente registrada"""
+        ultima = self.clientes['ultima_data'].max() if len(self.clientes) else pd.NaT
+        return None if pd.isna(ultima) else pd.Timestamp(ultima)
+
+    def client_features(self, reference_date: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """
+        Features agregadas e RFM por cliente (mesmas de create_aggregated_features)
+
+        Args:
+            reference_date: Data de referência da recência (None = última data registrada)
+
+        Returns:
+            DataFrame indexado por cliente_id
+        """
+        state = self.clientes
+        n = state['n_valor']
+        data_ref = self.ultima_data if reference_date is None else pd.Timestamp(reference_date)
+        ultima = pd.to_datetime(state['ultima_data'])
+
+        features = pd.DataFrame({
+            'total_gasto': state['soma'],
+            'ticket_medio': (state['soma'] / n).where(n > 0),
+            'std_gasto': np.sqrt(state['m2'] / (n - 1)).where(n > 1),
+            'num_compras': n.astype(np.int64),
+            'total_itens': state['itens'],
+            'media_itens': (state['itens'] / state['n_itens']).where(state['n_itens'] > 0),
+            'recencia': (data_ref - ultima).dt.days if data_ref is not None else np.nan,
+            'frequencia': state['compras'].astype(np.int64),
+            'valor_total': state['soma'],
+        }, index=state.index)
+
+        return features
+
+    def product_features(self) -> pd.DataFrame:
+        """
+        Features agregadas por produto
+
+        Returns:
+            DataFrame indexado por produto_id
+        """
+        state = self.produtos
+        n = state['n_valor']
+        return pd.DataFrame({
+            'preco_medio_produto': (state['soma'] / n).where(n > 0),
+            'popularidade_produto': n.astype(np.int64),
+            'total_vendido_produto': state['itens'],
+        }, index=state.index)
@@ -0,0 +1,162 @@
+"""
+Módulo com o schema de tipos compactos dos dados da adega
+"""
+import pandas as pd
+import numpy as np
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tipo lógico de cada coluna conhecida
+#   id       -> inteiro reduzido (mínimo int32)
+#   int      -> inteiro reduzido (mínimo int16, evita overflow em operações aritméticas)
+#   float    -> float32
+#   category -> pandas.Categorical
+#   flag     -> booleano (Sim/Não)
+#   datetime -> datetime64
+ADEGA_SCHEMA = {
+    'compra_id': 'id',
+    'cliente_id': 'id',
+    'produto_id': 'id',
+    'valor': 'float',
+    'quantidade': 'int',
+    'idade': 'int',
+    'safra': 'int',
+    'pontuacao_engajamento': 'float',
+    'nome': 'category',
+    'nome_produto': 'category',
+    'cidade': 'category',
+    'pais': 'category',
+    'tipo_uva': 'category',
+    'assinante_clube': 'flag',
+    'cancelou_assinatura': 'flag',
+    'data_compra': 'datetime',
+}
+
+# Rótulos das colunas Sim/Não
+FLAG_VALUES = {'Sim': True, 'Não': False}
+FLAG_LABELS = {True: 'Sim', False: 'Não'}
+
+# Aceita rótulos e booleanos já convertidos (ex: colunas object após um merge)
+_FLAG_MAPPING = {**FLAG_VALUES, True: True, False: False}
+
+_INT_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def _smallest_int(values: pd.Series, minimum: type) -> pd.Series:
+    """Converte para o menor inteiro (a partir de `minimum`) que comporta os valores"""
+    if len(values) == 0:
+        return values.astype(minimum)
+
+    low, high = values.min(), values.max()
+    for int_type in _INT_TYPES[_INT_TYPES.index(minimum):]:
+        info = np.iinfo(int_type)
+        if info.min <= low and high <= info.max:
+            return values.astype(int_type)
+
+    return values.astype(np.int64)
+
+
+def _convert_column(values: pd.Series, kind: str, name: str = '') -> pd.Series:
+    """Converte uma coluna para o tipo compacto correspondente ao tipo lógico"""
+    if kind in ('id', 'int'):
+        numeric = pd.to_numeric(values, errors='coerce')
+        if numeric.isna().any():
+            # Inteiros com lacunas (ex: chaves órfãs após merge) ficam em float32
+            return numeric.astype(np.float32)
+        return _smallest_int(numeric, np.int32 if kind == 'id' else np.int16)
+
+    if kind == 'float':
+        return pd.to_numeric(values, errors='coerce').astype(np.float32)
+
+    if kind == 'category':
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return values
+        return values.astype('category')
+
+    if kind == 'flag':
+        if pd.api.types.is_bool_dtype(values):
+            return values
+        flags = values.map(_FLAG_MAPPING)
+        if flags.isna().any():
+            unmapped = values[values.notna() & flags.isna()]
+            if len(unmapped):
+                distinct = sorted(map(str, unmapped.unique()))
+                logger.warning(
+                    f"Coluna '{name}': {len(unmapped)} valores fora de {list(FLAG_VALUES)} "
+                    f"convertidos para NA: {distinct[:10]}"
+                )
+            return flags.astype('boolean')
+        return flags.astype(bool)
+
+    if kind == 'datetime':
+        return pd.to_datetime(values, errors='coerce')
+
+    raise ValueError(f"Tipo lógico desconhecido no schema: {kind}")
+
+
+def apply_schema(data: pd.DataFrame, schema: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Aplica o schema de tipos compactos às colunas presentes no DataFrame
+
+    As colunas são substituídas no próprio DataFrame recebido.
+
+    Args:
+        data: DataFrame com os dados
+        schema: Dicionário {coluna: tipo lógico} (None = ADEGA_SCHEMA)
+
+    Returns:
+        O mesmo DataFrame com os tipos convertidos
+    """
+    schema = schema or ADEGA_SCHEMA
+
+    for col, kind in schema.items():
+        if col in data.columns:
+            data[col] = _convert_column(data[col], kind, col)
+
+    return data
+
+
+def flags_to_labels(data: pd.DataFrame, schema: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Converte colunas booleanas Sim/Não de volta para rótulos (categóricos)
+
+    Útil para exibição, mantendo um byte por valor.
+
+    Args:
+        data: DataFrame com os dados
+        schema: Dicionário {coluna: tipo lógico} (None = ADEGA_SCHEMA)
+
+    Returns:
+        O mesmo DataFrame com as flags rotuladas
+    """
+    schema = schema or ADEGA_SCHEMA
+
+    for col, kind in schema.items():
+        if kind == 'flag' and col in data.columns and pd.api.types.is_bool_dtype(data[col]):
+            data[col] = pd.Categorical(
+                data[col].map(FLAG_LABELS),
+                categories=list(FLAG_VALUES)
+            )
+
+    return data
+
+
+def memory_report(data: pd.DataFrame) -> Dict[str, object]:
+    """
+    Calcula o uso de memória de um DataFrame
+
+    Args:
+        data: DataFrame com os dados
+
+    Returns:
+        Dicionário com total em MB e bytes por coluna
+    """
+    usage = data.memory_usage(deep=True)
+
+    return {
+        'total_mb': float(usage.sum() / 1024 ** 2),
+        'indice_bytes': int(usage.get('Index', 0)),
+        'por_coluna_bytes': {col: int(usage[col]) for col in data.columns},
+    }
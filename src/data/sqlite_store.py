@@ -0,0 +1,319 @@
+"""
+Módulo de armazenamento dos dados da adega em SQLite com índices
+"""
+import pandas as pd
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+from .cache import file_signature
+
+logger = logging.getLogger(__name__)
+
+# Versão do layout do banco (incrementar força reconstrução)
+STORE_VERSION = 1
+
+# Índices criados após a carga das tabelas
+INDEXES = {
+    'idx_clientes_cliente_id': ('clientes', 'cliente_id', True),
+    'idx_produtos_produto_id': ('produtos', 'produto_id', True),
+    'idx_compras_cliente_id': ('compras', 'cliente_id', False),
+    'idx_compras_produto_id': ('compras', 'produto_id', False),
+    'idx_compras_data_compra': ('compras', 'data_compra', False),
+}
+
+
+class SQLiteStore:
+    """
+    Clientes, produtos e compras em um banco SQLite local com consultas indexadas
+
+    Cada thread usa a sua própria conexão (aberta no primeiro acesso), de modo
+    que a mesma instância pode ser compartilhada entre as sessões do dashboard
+    sem que duas threads usem uma conexão ao mesmo tempo.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: Caminho do arquivo do banco
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Conexão da thread atual"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # check_same_thread=False apenas para que close() possa fechar as
+            # conexões das demais threads; cada conexão é usada só pela sua thread
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self) -> None:
+        """Fecha as conexões com o banco (de todas as threads)"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    def _query(self, sql: str, params: tuple = ()) -> pd.DataFrame:
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def _table_exists(self, name: str) -> bool:
+        cursor = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        )
+        return cursor.fetchone() is not None
+
+    def is_current(self, sources: List[Path]) -> bool:
+        """
+        Verifica se o banco foi construído a partir dos arquivos atuais
+
+        Args:
+            sources: Arquivos CSV de origem
+
+        Returns:
+            True se versão e assinaturas (tamanho/data de modificação) conferem
+        """
+        if not self._table_exists('_meta'):
+            return False
+
+        row = self.conn.execute("SELECT value FROM _meta WHERE key = 'meta'").fetchone()
+        if row is None:
+            return False
+
+        meta = json.loads(row[0])
+        if meta.get('version') != STORE_VERSION:
+            return False
+
+        expected = meta.get('sources', {})
+        if sorted(expected) != sorted(str(path) for path in sources):
+            return False
+
+        for path in sources:
+            if not path.exists() or file_signature(path, with_hash=False) != expected[str(path)]:
+                return False
+
+        return True
+
+    @staticmethod
+    def _to_sql_frame(data: pd.DataFrame) -> pd.DataFrame:
+        """Converte datas para texto ISO e categóricos para valores simples"""
+        converted = {}
+        for col in data.columns:
+            values = data[col]
+            if pd.api.types.is_datetime64_any_dtype(values):
+                converted[col] = values.dt.strftime('%Y-%m-%d')
+            elif isinstance(values.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(values):
+                converted[col] = values.astype(object)
+        return data.assign(**converted) if converted else data
+
+    def write_table(self, name: str, data: pd.DataFrame, append: bool = False) -> None:
+        """
+        Grava (ou acrescenta) um DataFrame em uma tabela
+
+        Args:
+            name: Nome da tabela
+            data: DataFrame a gravar
+            append: Se deve acrescentar em vez de substituir
+        """
+        self._to_sql_frame(data).to_sql(
+            name, self.conn,
+            if_exists='append' if append else 'replace',
+            index=False,
+            chunksize=50_000
+        )
+
+    def create_indexes(self) -> None:
+        """Cria os índices de cliente_id, produto_id e data_compra"""
+        for index_name, (table, column, unique) in INDEXES.items():
+            if not self._table_exists(table):
+                continue
+            self.conn.execute(f"DROP INDEX IF EXISTS {index_name}")
+            self.conn.execute(
+                f"CREATE {'UNIQUE ' if unique else ''}INDEX {index_name} ON {table} ({column})"
+            )
+        self.conn.execute("ANALYZE")
+        self.conn.commit()
+
+    def mark_built(self, sources: List[Path]) -> None:
+        """Registra versão e assinaturas dos arquivos de origem"""
+        meta = {
+            'version': STORE_VERSION,
+            'sources': {str(path): file_signature(path, with_hash=False) for path in sources},
+        }
+        self.conn.execute("CREATE TABLE IF NOT EXISTS _meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute("INSERT OR REPLACE INTO _meta VALUES ('meta', ?)", (json.dumps(meta),))
+        self.conn.commit()
+
+    def get_cliente(self, cliente_id: int) -> Optional[pd.Series]:
+        """
+        Busca o cadastro de um cliente
+
+        Args:
+            cliente_id: ID do cliente
+
+        Returns:
+            Series com os dados do cliente ou None se não existir
+        """
+        rows = self._query("SELECT * FROM clientes WHERE cliente_id = ?", (int(cliente_id),))
+        return rows.iloc[0] if len(rows) else None
+
+    def get_produto(self, produto_id: int) -> Optional[pd.Series]:
+        """
+        Busca o cadastro de um produto
+
+        Args:
+            produto_id: ID do produto
+
+        Returns:
+            Series com os dados do produto ou None se não existir
+        """
+        rows = self._query("SELECT * FROM produtos WHERE produto_id = ?", (int(produto_id),))
+        return rows.iloc[0] if len(rows) else None
+
+    def has_cliente(self, cliente_id: int) -> bool:
+        """Verifica se o cliente existe no cadastro"""
+        cursor = self.conn.execute("SELECT 1 FROM clientes WHERE cliente_id = ?", (int(cliente_id),))
+        return cursor.fetchone() is not None
+
+    def _compras_detalhadas(self) -> str:
+        """SELECT de compras com clientes e produtos (mesmas colunas de merge_data)"""
+        compras_cols = [row[1] for row in self.conn.execute("PRAGMA table_info(compras)")]
+        selected = [f"c.{col}" for col in compras_cols]
+        names = set(compras_cols)
+
+        # Sufixos como nos merges sucessivos de merge_data: colisões com as colunas
+        # já selecionadas (inclusive as de clientes) recebem o sufixo da tabela
+        for alias, table, key, suffix in [('cl', 'clientes', 'cliente_id', '_cliente'),
+                                          ('p', 'produtos', 'produto_id', '_produto')]:
+            for row in self.conn.execute(f"PRAGMA table_info({table})"):
+                col = row[1]
+                if col == key:
+                    continue
+                name = f"{col}{suffix}" if col in names else col
+                selected.append(f'{alias}.{col} AS "{name}"')
+                names.add(name)
+
+        return (
+            f"SELECT {', '.join(selected)} FROM compras c "
+            f"LEFT JOIN clientes cl ON cl.cliente_id = c.cliente_id "
+            f"LEFT JOIN produtos p ON p.produto_id = c.produto_id"
+        )
+
+    def client_history(self, cliente_id: int, with_details: bool = True) -> pd.DataFrame:
+        """
+        Retorna as compras de um cliente (busca pelo índice de cliente_id)
+
+        Args:
+            cliente_id: ID do cliente
+            with_details: Se deve incluir as colunas de clientes e produtos
+
+        Returns:
+            DataFrame com as compras em ordem cronológica
+        """
+        base = self._compras_detalhadas() if with_details else "SELECT c.* FROM compras c"
+        history = self._query(
+            f"{base} WHERE c.cliente_id = ? ORDER BY c.data_compra, c.compra_id",
+            (int(cliente_id),)
+        )
+        if 'data_compra' in history.columns:
+            history['data_compra'] = pd.to_datetime(history['data_compra'], errors='coerce')
+        return history
+
+    def purchases_between(self, start: str, end: str, with_details: bool = False) -> pd.DataFrame:
+        """
+        Retorna as compras em um intervalo de datas (busca pelo índice de data_compra)
+
+        Args:
+            start: Data inicial (inclusive, 'AAAA-MM-DD')
+            end: Data final (inclusive, 'AAAA-MM-DD')
+            with_details: Se deve incluir as colunas de clientes e produtos
+
+        Returns:
+            DataFrame com as compras do período
+        """
+        base = self._compras_detalhadas() if with_details else "SELECT c.* FROM compras c"
+        purchases = self._query(
+            f"{base} WHERE c.data_compra BETWEEN ? AND ? ORDER BY c.data_compra, c.compra_id",
+            (str(pd.Timestamp(start).date()), str(pd.Timestamp(end).date()))
+        )
+        if 'data_compra' in purchases.columns:
+            purchases['data_compra'] = pd.to_datetime(purchases['data_compra'], errors='coerce')
+        return purchases
+
+    def product_stats(self, produto_id: Optional[int] = None) -> pd.DataFrame:
+        """
+        Estatísticas de vendas por produto
+
+        Args:
+            produto_id: ID de um produto (None = todos)
+
+        Returns:
+            DataFrame com produto_id, num_compras, total_itens, receita e preco_medio
+        """
+        where = "WHERE produto_id = ?" if produto_id is not None else ""
+        params = (int(produto_id),) if produto_id is not None else ()
+        return self._query(
+            f"SELECT produto_id, COUNT(compra_id) AS num_compras, SUM(quantidade) AS total_itens, "
+            f"SUM(valor) AS receita, AVG(valor) AS preco_medio "
+            f"FROM compras {where} GROUP BY produto_id ORDER BY produto_id",
+            params
+        )
+
+    def popular_products_for(self, cliente_id: int) -> pd.DataFrame:
+        """
+        Popularidade dos produtos entre os demais clientes, excluindo os já comprados
+
+        Args:
+            cliente_id: ID do cliente
+
+        Returns:
+            DataFrame com produto_id, avg_price e purchase_count (mais populares primeiro)
+        """
+        return self._query(
+            "SELECT produto_id, AVG(valor) AS avg_price, COUNT(compra_id) AS purchase_count "
+            "FROM compras WHERE cliente_id != ? AND produto_id NOT IN "
+            "(SELECT produto_id FROM compras WHERE cliente_id = ?) "
+            "GROUP BY produto_id ORDER BY purchase_count DESC, produto_id",
+            (int(cliente_id), int(cliente_id))
+        )
+
+    def clientes_com_compras(self) -> pd.DataFrame:
+        """
+        Retorna o cadastro dos clientes que possuem pelo menos uma compra
+
+        Returns:
+            DataFrame de clientes (na ordem do cadastro)
+        """
+        return self._query(
+            "SELECT * FROM clientes WHERE cliente_id IN (SELECT cliente_id FROM compras) ORDER BY rowid"
+        )
+
+    def revenue_summary(self) -> Dict[str, Any]:
+        """
+        Receita total e receita mensal das compras
+
+        Returns:
+            Dicionário com receita total e Series de receita por mês ('AAAA-MM')
+        """
+        total = self.conn.execute("SELECT COALESCE(SUM(valor), 0) FROM compras").fetchone()[0]
+        monthly = self._query(
+            "SELECT substr(data_compra, 1, 7) AS mes, SUM(valor) AS valor FROM compras "
+            "WHERE data_compra IS NOT NULL GROUP BY mes ORDER BY mes"
+        )
+        return {
+            'receita_total': float(total),
+            'receita_mensal': monthly.set_index('mes')['valor'],
+        }
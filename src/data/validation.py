@@ -0,0 +1,319 @@
+"""
+Módulo de validação de qualidade dos dados
+"""
+import pandas as pd
+import numpy as np
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Any
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TableReport:
+    """Resultado da validação de uma tabela (ou de blocos acumulados)"""
+
+    tabela: str
+    linhas: int = 0
+    nulos: Dict[str, int] = field(default_factory=dict)
+    chaves_nulas: int = 0
+    chaves_duplicadas: int = 0
+    amostra_duplicadas: List[Any] = field(default_factory=list)
+    fora_do_intervalo: Dict[str, int] = field(default_factory=dict)
+    amostra_fora_do_intervalo: Dict[str, List[Any]] = field(default_factory=dict)
+    datas_invalidas: int = 0
+    amostra_datas_invalidas: List[Any] = field(default_factory=list)
+    clientes_invalidos: int = 0
+    amostra_clientes_invalidos: List[Any] = field(default_factory=list)
+    produtos_invalidos: int = 0
+    amostra_produtos_invalidos: List[Any] = field(default_factory=list)
+
+    @property
+    def taxa_nulos(self) -> Dict[str, float]:
+        """Proporção de valores nulos por coluna"""
+        if self.linhas == 0:
+            return {col: 0.0 for col in self.nulos}
+        return {col: count / self.linhas for col, count in self.nulos.items()}
+
+    def merge(self, other: 'TableReport', sample_size: int) -> None:
+        """Acumula o resultado de outro bloco da mesma tabela"""
+        self.linhas += other.linhas
+        for col, count in other.nulos.items():
+            self.nulos[col] = self.nulos.get(col, 0) + count
+        self.chaves_nulas += other.chaves_nulas
+        self.chaves_duplicadas += other.chaves_duplicadas
+        self.amostra_duplicadas = (self.amostra_duplicadas + other.amostra_duplicadas)[:sample_size]
+        for col, count in other.fora_do_intervalo.items():
+            self.fora_do_intervalo[col] = self.fora_do_intervalo.get(col, 0) + count
+            amostra = self.amostra_fora_do_intervalo.get(col, []) + other.amostra_fora_do_intervalo.get(col, [])
+            self.amostra_fora_do_intervalo[col] = amostra[:sample_size]
+        self.datas_invalidas += other.datas_invalidas
+        self.amostra_datas_invalidas = (self.amostra_datas_invalidas + other.amostra_datas_invalidas)[:sample_size]
+        self.clientes_invalidos += other.clientes_invalidos
+        self.amostra_clientes_invalidos = (self.amostra_clientes_invalidos + other.amostra_clientes_invalidos)[:sample_size]
+        self.produtos_invalidos += other.produtos_invalidos
+        self.amostra_produtos_invalidos = (self.amostra_produtos_invalidos + other.amostra_produtos_invalidos)[:sample_size]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Retorna o resultado como dicionário"""
+        result = {name: getattr(self, name) for name in self.__dataclass_fields__}
+        result['taxa_nulos'] = self.taxa_nulos
+        return result
+
+
+@dataclass
+class ValidationReport:
+    """Relatório consolidado de validação dos dados"""
+
+    tabelas: Dict[str, TableReport] = field(default_factory=dict)
+    erros: List[str] = field(default_factory=list)
+    avisos: List[str] = field(default_factory=list)
+
+    @property
+    def is_valid(self) -> bool:
+        """Dados válidos quando não há erros críticos"""
+        return len(self.erros) == 0
+
+    def __bool__(self) -> bool:
+        return self.is_valid
+
+    def log(self) -> None:
+        """Registra erros e avisos no log"""
+        for erro in self.erros:
+            logger.error(erro)
+        for aviso in self.avisos:
+            logger.warning(aviso)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Retorna o relatório como dicionário"""
+        return {
+            'valido': self.is_valid,
+            'erros': list(self.erros),
+            'avisos': list(self.avisos),
+            'tabelas': {name: report.to_dict() for name, report in self.tabelas.items()},
+        }
+
+
+class DataValidator:
+    """Valida clientes, produtos e compras com uma passada por tabela"""
+
+    # Chave primária de cada tabela
+    KEY_COLUMNS = {
+        'clientes': 'cliente_id',
+        'produtos': 'produto_id',
+        'compras': 'compra_id',
+    }
+
+    # Intervalos válidos (mínimo, máximo) - None = sem limite
+    RANGE_RULES = {
+        'valor': (0, None),
+        'quantidade': (1, None),
+        'idade': (0, 120),
+    }
+
+    DATE_COLUMNS = ['data_compra']
+
+    def __init__(self, sample_size: int = 5):
+        self.sample_size = sample_size
+        self.stream_report = None
+        self._seen_keys = None
+        self._seen_keys_set = None
+
+    def _sample(self, values: pd.Series, mask) -> List[Any]:
+        """Retorna até sample_size valores onde a máscara é verdadeira"""
+        selected = values[np.asarray(mask)]
+        return selected.head(self.sample_size).tolist()
+
+    def validate_table(self, name: str, data: pd.DataFrame, joiner=None,
+                       duplicated: Optional[np.ndarray] = None,
+                       positions: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> TableReport:
+        """
+        Calcula todas as verificações de uma tabela
+
+        Args:
+            name: Nome da tabela ('clientes', 'produtos' ou 'compras')
+            data: DataFrame da tabela
+            joiner: DimensionJoiner para verificar chaves estrangeiras (compras)
+            duplicated: Máscara de chaves duplicadas já calculada (modo streaming)
+            positions: Posições de cliente e produto já calculadas pelo joiner
+
+        Returns:
+            TableReport com os resultados
+        """
+        report = TableReport(tabela=name, linhas=len(data))
+
+        null_mask = data.isna()
+        report.nulos = {col: int(count) for col, count in null_mask.sum().items()}
+
+        key = self.KEY_COLUMNS.get(name)
+        ids = data[key] if key in data.columns else pd.Series(data.index, index=data.index)
+
+        if key in data.columns:
+            report.chaves_nulas = report.nulos.get(key, 0)
+            if duplicated is None:
+                duplicated = ids.duplicated(keep='first').to_numpy()
+            report.chaves_duplicadas = int(duplicated.sum())
+            report.amostra_duplicadas = self._sample(ids, duplicated)
+
+        for col, (low, high) in self.RANGE_RULES.items():
+            if col not in data.columns:
+                continue
+
+            values = pd.to_numeric(data[col], errors='coerce')
+            invalid = np.zeros(len(values), dtype=bool)
+            if low is not None:
+                invalid |= (values < low).to_numpy()
+            if high is not None:
+                invalid |= (values > high).to_numpy()
+
+            report.fora_do_intervalo[col] = int(invalid.sum())
+            report.amostra_fora_do_intervalo[col] = self._sample(ids, invalid)
+
+        for col in self.DATE_COLUMNS:
+            if col not in data.columns or pd.api.types.is_datetime64_any_dtype(data[col]):
+                continue
+
+            parsed = pd.to_datetime(data[col], errors='coerce')
+            invalid = (~null_mask[col] & parsed.isna()).to_numpy()
+            report.datas_invalidas += int(invalid.sum())
+            report.amostra_datas_invalidas += self._sample(ids, invalid)
+
+        if positions is None and joiner is not None and {'cliente_id', 'produto_id'} <= set(data.columns):
+            positions = joiner.lookup(data)
+
+        if positions is not None:
+            cliente_pos, produto_pos = positions
+            report.clientes_invalidos = int((cliente_pos < 0).sum())
+            report.amostra_clientes_invalidos = self._sample(data['cliente_id'], cliente_pos < 0)
+            report.produtos_invalidos = int((produto_pos < 0).sum())
+            report.amostra_produtos_invalidos = self._sample(data['produto_id'], produto_pos < 0)
+
+        return report
+
+    def validate(self, clientes: pd.DataFrame, produtos: pd.DataFrame, compras: pd.DataFrame,
+                 joiner=None) -> ValidationReport:
+        """
+        Valida as três tabelas e consolida erros e avisos
+
+        Args:
+            clientes: DataFrame de clientes
+            produtos: DataFrame de produtos
+            compras: DataFrame de compras
+            joiner: DimensionJoiner para as verificações referenciais
+
+        Returns:
+            ValidationReport consolidado
+        """
+        report = ValidationReport()
+        report.tabelas['clientes'] = self.validate_table('clientes', clientes)
+        report.tabelas['produtos'] = self.validate_table('produtos', produtos)
+        report.tabelas['compras'] = self.validate_table('compras', compras, joiner=joiner)
+
+        for table_report in report.tabelas.values():
+            self._collect_messages(report, table_report)
+
+        return report
+
+    def _collect_messages(self, report: ValidationReport, table_report: TableReport) -> None:
+        """Converte os resultados de uma tabela em erros (críticos) e avisos"""
+        name = table_report.tabela
+        key = self.KEY_COLUMNS.get(name, 'id')
+
+        if table_report.chaves_nulas:
+            report.erros.append(f"{table_report.chaves_nulas} IDs nulos em {name} ({key})")
+        if table_report.chaves_duplicadas:
+            report.erros.append(
+                f"{table_report.chaves_duplicadas} IDs duplicados em {name} ({key}), "
+                f"ex: {table_report.amostra_duplicadas}"
+            )
+        if table_report.clientes_invalidos:
+            report.avisos.append(
+                f"Encontradas {table_report.clientes_invalidos} compras com cliente_id inválido, "
+                f"ex: {table_report.amostra_clientes_invalidos}"
+            )
+        if table_report.produtos_invalidos:
+            report.avisos.append(
+                f"Encontradas {table_report.produtos_invalidos} compras com produto_id inválido, "
+                f"ex: {table_report.amostra_produtos_invalidos}"
+            )
+        for col, count in table_report.fora_do_intervalo.items():
+            if count:
+                report.avisos.append(
+                    f"{count} valores fora do intervalo em {name}.{col}, "
+                    f"ex: {table_report.amostra_fora_do_intervalo[col]}"
+                )
+        if table_report.datas_invalidas:
+            report.avisos.append(
+                f"{table_report.datas_invalidas} datas inválidas em {name}, "
+                f"ex: {table_report.amostra_datas_invalidas}"
+            )
+
+    def start_stream(self) -> None:
+        """Reinicia o estado acumulado da validação em blocos"""
+        self.stream_report = TableReport(tabela='compras')
+        self._seen_keys = np.zeros(0, dtype=bool)
+        self._seen_keys_set = set()
+
+    def _duplicated_across_chunks(self, keys: pd.Series) -> np.ndarray:
+        """
+        Marca chaves já vistas neste bloco ou em blocos anteriores
+
+        Chaves inteiras não negativas usam um bitmap; as demais, um conjunto.
+        """
+        duplicated = keys.duplicated(keep='first').to_numpy()
+        values = keys.to_numpy()
+        valid = keys.notna().to_numpy()
+
+        if pd.api.types.is_integer_dtype(keys) and (len(values) == 0 or values.min() >= 0):
+            if len(values) and values.max() >= len(self._seen_keys):
+                grown = np.zeros(max(int(values.max()) + 1, 2 * len(self._seen_keys)), dtype=bool)
+                grown[:len(self._seen_keys)] = self._seen_keys
+                self._seen_keys = grown
+            duplicated = duplicated | self._seen_keys[values]
+            self._seen_keys[values] = True
+        else:
+            seen = np.array([value in self._seen_keys_set for value in values], dtype=bool)
+            duplicated = duplicated | (seen & valid)
+            self._seen_keys_set.update(values[valid].tolist())
+
+        return duplicated
+
+    def validate_chunk(self, chunk: pd.DataFrame, joiner=None,
+                       positions: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> TableReport:
+        """
+        Valida um bloco de compras e acumula o resultado em stream_report
+
+        Args:
+            chunk: Bloco de compras
+            joiner: DimensionJoiner para as verificações referenciais
+            positions: Posições de cliente e produto já calculadas pelo joiner
+
+        Returns:
+            TableReport apenas do bloco
+        """
+        if self.stream_report is None:
+            self.start_stream()
+
+        duplicated = None
+        if 'compra_id' in chunk.columns:
+            duplicated = self._duplicated_across_chunks(chunk['compra_id'])
+
+        report = self.validate_table('compras', chunk, joiner=joiner, duplicated=duplicated,
+                                     positions=positions)
+        self.stream_report.merge(report, self.sample_size)
+
+        return report
+
+    def finish_stream(self) -> ValidationReport:
+        """
+        Consolida a validação em blocos
+
+        Returns:
+            ValidationReport com o resultado acumulado das compras
+        """
+        report = ValidationReport()
+        if self.stream_report is not None:
+            report.tabelas['compras'] = self.stream_report
+            self._collect_messages(report, self.stream_report)
+        return report
@@ -0,0 +1,86 @@
+"""
+Módulo com as features de janela temporal por cliente (point-in-time)
+"""
+import pandas as pd
+import numpy as np
+import logging
+from typing import Dict, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Janelas padrão (em dias) das features de gasto recente
+WINDOW_DAYS = (30, 90, 180, 365)
+
+
+def trailing_window_features(clientes: pd.Series, datas: pd.Series, valores: pd.Series,
+                             windows: Sequence[int] = WINDOW_DAYS) -> Dict[str, np.ndarray]:
+    """
+    Gasto, número de compras e ticket médio de cada cliente nas janelas
+    anteriores à data de cada linha
+
+    As compras são ordenadas uma vez por (cliente, dia) e combinadas em uma
+    chave inteira crescente; somas acumuladas e searchsorted dão os limites
+    de cada janela, com custo O(n log n) no total (sem filtrar por linha).
+    A janela de d dias de uma linha cobre os dias (data - d, data], incluindo
+    as compras do mesmo dia e excluindo as posteriores.
+
+    Args:
+        clientes: ID do cliente de cada compra
+        datas: Data de cada compra
+        valores: Valor de cada compra
+        windows: Tamanhos das janelas em dias
+
+    Returns:
+        Dicionário {feature: valores por linha, na ordem de entrada}; linhas
+        sem cliente ou sem data recebem valor ausente
+    """
+    n_rows = len(clientes)
+    codes, _ = pd.factorize(clientes)
+    dias = pd.to_datetime(datas, errors='coerce')
+    valid_date = dias.notna().to_numpy()
+    dias = dias.dt.normalize().to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+    valid = (codes >= 0) & valid_date
+    rows = np.flatnonzero(valid)
+
+    result = {}
+    for days in windows:
+        result[f'gasto_{days}d'] = np.full(n_rows, np.nan)
+        result[f'compras_{days}d'] = np.full(n_rows, np.nan)
+        result[f'ticket_medio_{days}d'] = np.full(n_rows, np.nan)
+
+    if len(rows) == 0:
+        return result
+
+    # Chave (cliente, dia) em um único inteiro: o espaço entre clientes é
+    # maior que qualquer janela, então uma janela nunca cruza clientes
+    dias_validos = dias[rows] - dias[rows].min()
+    span = int(dias_validos.max()) + max(windows) + 1
+    key = codes[rows].astype(np.int64) * span + dias_validos
+
+    order = np.argsort(key, kind='stable')
+    key = key[order]
+    positions = rows[order]
+
+    valor = pd.to_numeric(valores, errors='coerce').to_numpy(dtype=np.float64)[positions]
+    tem_valor = ~np.isnan(valor)
+
+    # Somas acumuladas com zero inicial: soma(i..j) = cs[j + 1] - cs[i]
+    soma_acumulada = np.concatenate(([0.0], np.cumsum(np.where(tem_valor, valor, 0.0))))
+    valores_acumulados = np.concatenate(([0], np.cumsum(tem_valor)))
+
+    # Fim da janela: após a última compra do mesmo cliente e dia
+    fim = np.searchsorted(key, key, side='right')
+
+    for days in windows:
+        inicio = np.searchsorted(key, key - days, side='right')
+
+        gasto = soma_acumulada[fim] - soma_acumulada[inicio]
+        n_valores = valores_acumulados[fim] - valores_acumulados[inicio]
+
+        result[f'gasto_{days}d'][positions] = gasto
+        result[f'compras_{days}d'][positions] = fim - inicio
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result[f'ticket_medio_{days}d'][positions] = np.where(n_valores > 0, gasto / n_valores, np.nan)
+
+    return result
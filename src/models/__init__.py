@@ -3,5 +3,6 @@ Módulo de modelos de Machine Learning
 """
 from .model_trainer import ModelTrainer
 from .model_evaluation import ModelEvaluator
+from .preprocessing import PreprocessingBundle
 
-__all__ = ['ModelTrainer', 'ModelEvaluator']
+__all__ = ['ModelTrainer', 'ModelEvaluator', 'PreprocessingBundle']
@@ -0,0 +1,213 @@
+"""
+Módulo com o artefato do modelo em disco (metadados + arrays em memory-map)
+"""
+import pandas as pd
+import numpy as np
+import json
+import joblib
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from data.cache import file_signature
+from models.tree_engine import CompiledTreeEnsemble, compile_model
+
+logger = logging.getLogger(__name__)
+
+# Versão do formato do artefato (incrementar invalida artefatos existentes)
+ARTIFACT_VERSION = 1
+
+
+def training_fingerprint(X: pd.DataFrame, y: pd.Series) -> str:
+    """
+    Impressão digital dos dados de treinamento
+
+    Args:
+        X: Features de treino
+        y: Target de treino
+
+    Returns:
+        Hash SHA-256 hexadecimal (igual para dados iguais)
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((list(map(str, X.columns)), [str(dtype) for dtype in X.dtypes])).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    digest.update(pd.util.hash_pandas_object(pd.Series(np.asarray(y)), index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _json_value(value: Any) -> Any:
+    """Converte escalares numpy para tipos JSON"""
+    if isinstance(value, dict):
+        return {str(key): _json_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_value(item) for item in value]
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    return value
+
+
+class ModelArtifact:
+    """
+    Diretório com metadados e arrays do modelo, ao lado do pickle
+
+    O artefato guarda um metadata.json pequeno (tipo do modelo, features,
+    impressão digital dos dados de treino, métricas, importâncias e
+    assinatura do pickle) e, para ensembles de árvores, os arrays do motor
+    compilado em .npy sem compressão. Na carga os arrays são mapeados do
+    disco (memory-map): a carga é imediata e as páginas são compartilhadas
+    entre processos pelo cache do sistema operacional. O modelo sklearn
+    (pickle) só é desserializado quando realmente usado.
+    """
+
+    def __init__(self, model_path: Path, metadata: Dict[str, Any],
+                 engine: Optional[CompiledTreeEnsemble] = None):
+        self.model_path = Path(model_path)
+        self.metadata = metadata
+        self.engine = engine
+        self._model = None
+
+    @staticmethod
+    def path_for_model(model_path: Any) -> Path:
+        """
+        Retorna o diretório do artefato de um modelo
+
+        Args:
+            model_path: Caminho do modelo (ex: best_model_Gradient_Boosting.pkl)
+
+        Returns:
+            Diretório do artefato (ex: best_model_Gradient_Boosting_artifact/)
+        """
+        model_path = Path(model_path)
+        return model_path.with_name(f"{model_path.stem}_artifact")
+
+    @classmethod
+    def save(cls, model: Any, model_path: Any, feature_columns: Optional[List[str]] = None,
+             metrics: Optional[Dict[str, Any]] = None, fingerprint: Optional[str] = None) -> 'ModelArtifact':
+        """
+        Salva o modelo (pickle) e o artefato com metadados e arrays
+
+        Args:
+            model: Modelo treinado
+            model_path: Caminho do pickle do modelo
+            feature_columns: Features usadas no treinamento (padrão: feature_names_in_)
+            metrics: Métricas de avaliação
+            fingerprint: Impressão digital dos dados de treino (training_fingerprint)
+
+        Returns:
+            ModelArtifact salvo
+        """
+        model_path = Path(model_path)
+        model_path.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(model, model_path)
+
+        directory = cls.path_for_model(model_path)
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / 'metadata.json').unlink(missing_ok=True)
+        for stale in directory.glob('engine_*.npy'):
+            stale.unlink()
+
+        if feature_columns is None and hasattr(model, 'feature_names_in_'):
+            feature_columns = list(model.feature_names_in_)
+
+        engine = compile_model(model)
+        engine_params = None
+        if engine is not None:
+            arrays, engine_params = engine.to_state()
+            for name, array in arrays.items():
+                np.save(directory / f"engine_{name}.npy", np.ascontiguousarray(array))
+
+        importances = getattr(model, 'feature_importances_', None)
+
+        # Metadados por último: um artefato parcial não é carregado
+        metadata = {
+            'version': ARTIFACT_VERSION,
+            'model_type': type(model).__name__,
+            'model_file': model_path.name,
+            'model_signature': file_signature(model_path, with_hash=False),
+            'feature_columns': list(feature_columns) if feature_columns is not None else None,
+            'classes': np.asarray(model.classes_).tolist() if hasattr(model, 'classes_') else None,
+            'feature_importances': np.asarray(importances).tolist() if importances is not None else None,
+            'training_fingerprint': fingerprint,
+            'metrics': _json_value(metrics or {}),
+            'engine': engine_params,
+            'created_at': pd.Timestamp.now().isoformat(timespec='seconds'),
+        }
+        with open(directory / 'metadata.json', 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, indent=2)
+
+        logger.info(f"Artefato do modelo salvo em: {directory}")
+
+        artifact = cls(model_path, metadata, engine)
+        artifact._model = model
+        return artifact
+
+    @classmethod
+    def is_current(cls, model_path: Any) -> bool:
+        """
+        Verifica se existe artefato gerado junto com o pickle atual do modelo
+
+        Args:
+            model_path: Caminho do pickle do modelo
+
+        Returns:
+            True se versão e assinatura do pickle conferem
+        """
+        model_path = Path(model_path)
+        meta_path = cls.path_for_model(model_path) / 'metadata.json'
+        if not meta_path.exists() or not model_path.exists():
+            return False
+
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+
+        return (metadata.get('version') == ARTIFACT_VERSION
+                and metadata.get('model_signature') == file_signature(model_path, with_hash=False))
+
+    @classmethod
+    def load(cls, model_path: Any, mmap_mode: Optional[str] = 'r') -> 'ModelArtifact':
+        """
+        Carrega metadados e arrays do motor compilado (sem desserializar o modelo sklearn)
+
+        Args:
+            model_path: Caminho do pickle do modelo
+            mmap_mode: Modo do memory-map dos arrays (None = carregar em memória)
+
+        Returns:
+            ModelArtifact carregado
+        """
+        model_path = Path(model_path)
+        directory = cls.path_for_model(model_path)
+
+        with open(directory / 'metadata.json', 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+
+        if metadata.get('version') != ARTIFACT_VERSION:
+            raise ValueError(
+                f"Versão do artefato incompatível: {metadata.get('version')} (esperada {ARTIFACT_VERSION})"
+            )
+
+        engine = None
+        if metadata.get('engine') is not None:
+            arrays = {
+                path.stem[len('engine_'):]: np.load(path, mmap_mode=mmap_mode)
+                for path in directory.glob('engine_*.npy')
+            }
+            engine = CompiledTreeEnsemble.from_state(arrays, metadata['engine'])
+
+        logger.info(f"Artefato do modelo carregado de: {directory} ({metadata['model_type']})")
+
+        return cls(model_path, metadata, engine)
+
+    @property
+    def model(self) -> Any:
+        """Modelo sklearn (desserializado do pickle no primeiro acesso)"""
+        if self._model is None:
+            self._model = joblib.load(self.model_path)
+            logger.info(f"Modelo sklearn carregado sob demanda de: {self.model_path}")
+        return self._model
+
+    @property
+    def model_loaded(self) -> bool:
+        return self._model is not None
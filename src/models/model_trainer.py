@@ -15,6 +15,8 @@ import logging
 import joblib
 from pathlib import Path
 
+from models.artifact import ModelArtifact
+
 logger = logging.getLogger(__name__)
 
 
@@ -245,20 +247,26 @@ class ModelTrainer:
 
         return grid_search.best_estimator_, grid_search.best_params_
 
-    def save_model(self, model: Any, filename: str, output_dir: str = "output/models") -> None:
+    def save_model(self, model: Any, filename: str, output_dir: str = "output/models",
+                   feature_columns: Optional[list] = None, metrics: Optional[Dict[str, Any]] = None,
+                   fingerprint: Optional[str] = None) -> None:
         """
         Salva modelo treinado em disco
 
+        Além do pickle, grava o artefato com metadados e os arrays do motor
+        compilado (carregados com memory-map pelo preditor).
+
         Args:
             model: Modelo a ser salvo
             filename: Nome do arquivo
             output_dir: Diretório de saída
+            feature_columns: Features usadas no treinamento
+            metrics: Métricas de avaliação do modelo
+            fingerprint: Impressão digital dos dados de treino
         """
-        output_path = Path(output_dir)
-        output_path.mkdir(parents=True, exist_ok=True)
-
-        filepath = output_path / filename
-        joblib.dump(model, filepath)
+        filepath = Path(output_dir) / filename
+        ModelArtifact.save(model, filepath, feature_columns=feature_columns,
+                           metrics=metrics, fingerprint=fingerprint)
 
         logger.info(f"Modelo salvo em: {filepath}")
 
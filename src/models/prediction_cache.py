@@ -0,0 +1,135 @@
+"""
+Módulo com o cache de predições (LRU + TTL) indexado pelas features preparadas
+"""
+import pandas as pd
+import numpy as np
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+
+DEFAULT_CACHE_SIZE = 4096
+DEFAULT_CACHE_TTL_S = 300.0
+
+
+class PredictionCache:
+    """
+    Resultados de predição reutilizados para entradas repetidas
+
+    A chave de uma linha é o hash dos bytes do vetor de features já
+    preparado (após encoders, preenchimento e feature store), combinado com a
+    versão do modelo e do feature store. Assim a mesma entrada só reaproveita
+    o resultado se tudo que influencia a predição for igual — inclusive as
+    features de calendário, que mudam com a data.
+
+    As entradas expiram após ttl_seconds e, acima de max_size, as menos
+    usadas recentemente são descartadas. Quando a versão muda (modelo ou
+    feature store atualizados) o cache é esvaziado por sync().
+    """
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE, ttl_seconds: Optional[float] = DEFAULT_CACHE_TTL_S):
+        """
+        Args:
+            max_size: Número máximo de entradas
+            ttl_seconds: Validade de cada entrada em segundos (None = sem expiração)
+        """
+        if max_size < 1:
+            raise ValueError("max_size deve ser >= 1")
+
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+        self._version: Optional[Hashable] = None
+        self._lock = threading.Lock()
+        self._stats = {'acertos': 0, 'falhas': 0, 'expirados': 0, 'descartes': 0, 'invalidacoes': 0}
+
+    @staticmethod
+    def row_keys(X: pd.DataFrame, version: Hashable) -> List[bytes]:
+        """
+        Chaves das linhas de um lote de features preparadas
+
+        Args:
+            X: Features preparadas (colunas numéricas, na ordem do modelo)
+            version: Versão do modelo/feature store
+
+        Returns:
+            Lista com uma chave (digest) por linha
+        """
+        salt = hashlib.blake2b(repr((version, list(X.columns))).encode('utf-8'), digest_size=32).digest()
+        values = np.ascontiguousarray(X.to_numpy(dtype=np.float64))
+        return [hashlib.blake2b(row.tobytes(), digest_size=16, key=salt).digest() for row in values]
+
+    def sync(self, version: Hashable) -> None:
+        """
+        Esvazia o cache se a versão do modelo/feature store mudou
+
+        Args:
+            version: Versão atual
+        """
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self._stats['invalidacoes'] += 1
+                self._entries.clear()
+                self._version = version
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Retorna o valor em cache (None se ausente ou expirado)
+
+        Args:
+            key: Chave da entrada
+
+        Returns:
+            Valor armazenado ou None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['falhas'] += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._stats['expirados'] += 1
+                self._stats['falhas'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats['acertos'] += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Armazena um valor (descartando as entradas menos usadas se cheio)
+
+        Args:
+            key: Chave da entrada
+            value: Valor a armazenar
+        """
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats['descartes'] += 1
+
+    def clear(self) -> None:
+        """Remove todas as entradas"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Acertos, falhas, expirações, descartes, invalidações e ocupação"""
+        with self._lock:
+            lookups = self._stats['acertos'] + self._stats['falhas']
+            return dict(
+                self._stats,
+                taxa_acerto=self._stats['acertos'] / lookups if lookups else None,
+                tamanho=len(self._entries),
+                tamanho_max=self.max_size,
+                ttl_s=self.ttl_seconds,
+            )
@@ -6,33 +6,241 @@ import numpy as np
 import joblib
 from pathlib import Path
 import logging
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Tuple, Optional
 import sys
+import threading
 
 # Adicionar src ao path
 sys.path.append(str(Path(__file__).parent.parent))
 
+from data.categorical_encoding import CategoricalEncoder
 from data.feature_engineering import FeatureEngineer
+from data.feature_registry import FeaturePlan
+from data.feature_store import FeatureStore
+from models.artifact import ModelArtifact
+from models.prediction_cache import PredictionCache, DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL_S
+from models.preprocessing import PreprocessingBundle
+from models.tree_engine import SMALL_BATCH_ROWS, compile_model
 
 logger = logging.getLogger(__name__)
 
 
+# Ordem das colunas esperada pelo modelo treinado
+EXPECTED_COLUMNS = [
+    'compra_id', 'cliente_id', 'produto_id', 'valor', 'quantidade',
+    'nome', 'idade', 'cidade', 'pontuacao_engajamento', 'assinante_clube',
+    'cancelou_assinatura', 'nome_produto', 'pais', 'safra', 'tipo_uva',
+    'ano', 'mes', 'dia', 'dia_semana', 'trimestre', 'semana_ano',
+    'mes_sin', 'mes_cos', 'dia_semana_sin', 'dia_semana_cos',
+    'total_gasto', 'ticket_medio', 'num_compras', 'total_itens', 'media_itens',
+    'preco_medio_produto', 'popularidade_produto', 'total_vendido_produto',
+    'recencia', 'frequencia', 'valor_total',
+    'valor_por_unidade', 'engajamento_por_idade', 'engajamento_x_idade', 'valor_por_idade'
+]
+
+# Valores conhecidos para codificação das variáveis categóricas (exemplos básicos)
+KNOWN_CATEGORICAL_VALUES = {
+    'nome': [f'Cliente {i}' for i in range(1, 101)] + ['Cliente Teste', 'Maria Santos'],
+    'cidade': ['São Paulo', 'Rio de Janeiro', 'Belo Horizonte', 'Brasília',
+               'Salvador', 'Fortaleza', 'Curitiba', 'Goiânia'],
+    'assinante_clube': ['Sim', 'Não'],
+    'nome_produto': [f'Vinho {i}' for i in range(1, 51)] + ['Vinho Padrão'],
+    'pais': ['Brasil', 'França', 'Chile', 'Argentina', 'Itália',
+             'Espanha', 'Portugal', 'África do Sul'],
+    'tipo_uva': ['Merlot', 'Cabernet Sauvignon', 'Chardonnay',
+                 'Sauvignon Blanc', 'Pinot Noir', 'Malbec', 'Syrah', 'Tempranillo']
+}
+
+# Encoders ajustados nos valores conhecidos (classes ordenadas; na codificação
+# legada valores desconhecidos são codificados como 0)
+_KNOWN_CATEGORICAL_ENCODERS = {
+    col: CategoricalEncoder(sorted(set(values)))
+    for col, values in KNOWN_CATEGORICAL_VALUES.items()
+}
+
+# Colunas numéricas de entrada: valores presentes que não puderem ser convertidos
+# marcam a linha como inválida na predição em lote
+NUMERIC_INPUT_COLUMNS = ['valor', 'quantidade', 'idade', 'pontuacao_engajamento']
+
+# Faixas de risco: (probabilidade mínima, nível, cor), da mais alta para a mais baixa
+RISK_LEVELS = [
+    (0.7, "Alto", "red"),
+    (0.4, "Médio", "orange"),
+    (0.0, "Baixo", "green"),
+]
+
+
 class ChurnPredictor:
-    """Classe para fazer predições de churn em tempo real"""
+    """
+    Classe para fazer predições de churn em tempo real
+
+    A mesma instância pode ser compartilhada entre threads (ex.: sessões do
+    dashboard): carregamento, preparação das features (tabela de calendário,
+    feature store) e predição são feitos sob um lock da instância.
+    """
 
-    def __init__(self, model_path: str = "output/models/best_model_Gradient_Boosting.pkl"):
+    def __init__(self, model_path: str = "output/models/best_model_Gradient_Boosting.pkl",
+                 feature_store_path: Optional[str] = "output/feature_store", compiled: bool = True,
+                 cache_size: int = DEFAULT_CACHE_SIZE, cache_ttl: Optional[float] = DEFAULT_CACHE_TTL_S):
+        """
+        Args:
+            model_path: Caminho do modelo treinado
+            feature_store_path: Diretório do feature store (None = não usar)
+            compiled: Se deve usar o motor compilado de árvores em lotes pequenos
+            cache_size: Entradas do cache de predições (0 = desativado)
+            cache_ttl: Validade das entradas do cache em segundos (None = sem expiração)
+        """
         self.model_path = Path(model_path)
-        self.model = None
+        self.compiled = compiled
+        self.engine = None
+        self.feature_store_path = Path(feature_store_path) if feature_store_path else None
+        self.artifact = None
+        self._model = None
+        self._loaded = False
         self.feature_engineer = FeatureEngineer()
         self.feature_names = None
+        self.preprocessing = None
+        self._preprocessing_loaded = False
+        self.feature_store = None
+        self.feature_plan = None
+        self.prediction_cache = PredictionCache(cache_size, cache_ttl) if cache_size else None
+        # Incrementada a cada modelo carregado/atribuído (invalida o cache de predições)
+        self._model_version = 0
+        self._lock = threading.RLock()
+
+    @property
+    def model(self) -> Any:
+        """Modelo sklearn (com artefato, desserializado apenas no primeiro uso)"""
+        with self._lock:
+            if self._model is None and self.artifact is not None:
+                self._model = self.artifact.model
+            return self._model
+
+    @model.setter
+    def model(self, model: Any) -> None:
+        self._model = model
+        self._model_version += 1
+
+    @property
+    def classes_(self) -> np.ndarray:
+        """Classes do modelo (lidas do motor compilado, sem carregar o sklearn)"""
+        if self.engine is not None:
+            return self.engine.classes_
+        return self.model.classes_
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            if not self._loaded:
+                self.load_model()
 
     def load_model(self):
-        """Carrega o modelo treinado"""
-        if not self.model_path.exists():
-            raise FileNotFoundError(f"Modelo não encontrado em: {self.model_path}")
+        """
+        Carrega o modelo treinado
 
-        self.model = joblib.load(self.model_path)
-        logger.info(f"Modelo carregado de: {self.model_path}")
+        Com um artefato atual ao lado do pickle, apenas os metadados e os
+        arrays do motor compilado são lidos (memory-map); o modelo sklearn
+        fica para o primeiro uso que precisar dele (ex.: lotes grandes).
+        """
+        with self._lock:
+            if not self.model_path.exists():
+                raise FileNotFoundError(f"Modelo não encontrado em: {self.model_path}")
+
+            self.artifact = None
+            self._model = None
+            self.engine = None
+            self._model_version += 1
+
+            if ModelArtifact.is_current(self.model_path):
+                self.artifact = ModelArtifact.load(self.model_path)
+                if self.compiled:
+                    self.engine = self.artifact.engine
+            else:
+                self._model = joblib.load(self.model_path)
+                logger.info(f"Modelo carregado de: {self.model_path}")
+                self.engine = compile_model(self._model) if self.compiled else None
+
+            if self.engine is None:
+                # Sem motor compilado toda predição usa o sklearn
+                self._model = self.model
+
+            self._loaded = True
+
+            self.load_preprocessing()
+            self.load_feature_store()
+
+    def load_feature_store(self) -> Optional[FeatureStore]:
+        """
+        Carrega (com memory-map) o feature store salvo pelo pipeline
+
+        Sem o store, as features agregadas usam os valores da própria compra.
+
+        Returns:
+            FeatureStore carregado ou None
+        """
+        with self._lock:
+            if self.feature_store_path is None or not (self.feature_store_path / 'metadata.json').exists():
+                logger.warning(
+                    f"Feature store não encontrado em: {self.feature_store_path}. "
+                    f"Usando agregados da própria compra."
+                )
+                self.feature_store = None
+                return None
+
+            try:
+                self.feature_store = FeatureStore.load(self.feature_store_path)
+            except ValueError as e:
+                logger.warning(f"Feature store ignorado: {e}")
+                self.feature_store = None
+                return None
+
+            logger.info(f"Feature store carregado de: {self.feature_store_path} ({self.feature_store.info()})")
+            return self.feature_store
+
+    def record_purchase(self, purchase: Dict[str, Any]) -> None:
+        """
+        Registra uma nova compra no feature store (atualização em O(1))
+
+        Args:
+            purchase: Dicionário com cliente_id, produto_id, valor, quantidade e data_compra
+        """
+        with self._lock:
+            if self.feature_store is None:
+                self.feature_store = FeatureStore()
+
+            self.feature_store.update(
+                purchase['cliente_id'], purchase['produto_id'],
+                purchase.get('valor'), purchase.get('quantidade'),
+                purchase.get('data_compra', pd.Timestamp.now())
+            )
+
+    def load_preprocessing(self) -> Optional[PreprocessingBundle]:
+        """
+        Carrega o artefato de pré-processamento salvo junto ao modelo
+
+        Se o artefato não existir (modelos antigos), a codificação legada
+        baseada em valores conhecidos é usada.
+
+        Returns:
+            PreprocessingBundle carregado ou None
+        """
+        with self._lock:
+            bundle_path = PreprocessingBundle.path_for_model(self.model_path)
+
+            if bundle_path.exists():
+                self.preprocessing = PreprocessingBundle.load(bundle_path)
+                self.feature_names = self.preprocessing.feature_columns
+                # Apenas as features usadas pelo modelo são calculadas na predição
+                self.feature_plan = FeaturePlan.resolve(self.feature_names)
+            else:
+                logger.warning(
+                    f"Pré-processamento não encontrado em: {bundle_path}. "
+                    f"Usando codificação padrão (execute o pipeline para gerá-lo)."
+                )
+                self.preprocessing = None
+                self.feature_plan = None
+
+            self._preprocessing_loaded = True
+            return self.preprocessing
 
     def prepare_single_prediction(self, customer_data: Dict[str, Any]) -> pd.DataFrame:
         """
@@ -44,146 +252,300 @@ class ChurnPredictor:
         Returns:
             DataFrame preparado para predição
         """
+        df = self.prepare_batch_prediction(pd.DataFrame([customer_data]))
+        return df.reset_index(drop=True)
+
+    def prepare_batch_prediction(self, customers_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Prepara dados de múltiplos clientes para predição de forma vetorizada
+
+        Todas as features são montadas coluna a coluna sobre o lote inteiro,
+        sem iterar pelas linhas.
+
+        Args:
+            customers_df: DataFrame com dados dos clientes (uma linha por cliente)
+
+        Returns:
+            DataFrame preparado para predição, com o mesmo índice da entrada
+        """
+        with self._lock:
+            if not self._preprocessing_loaded:
+                self.load_preprocessing()
+
+            features = self._build_raw_features(customers_df)
+
+            if self.preprocessing is not None:
+                # Encoders, preenchimento e ordem de colunas ajustados no treinamento
+                df = self.preprocessing.transform(pd.DataFrame(features, index=customers_df.index))
+            else:
+                df = self._legacy_encode(customers_df, features)
+
+            logger.debug(f"Lote preparado para predição: {len(customers_df)} clientes")
+
+            return df
+
+    def _build_raw_features(self, customers_df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Calcula as features numéricas e mantém as categóricas ainda não codificadas
+
+        Args:
+            customers_df: DataFrame com dados dos clientes
+
+        Returns:
+            Dicionário {coluna: valores} com as features do lote
+        """
         from datetime import datetime
-        from sklearn.preprocessing import LabelEncoder
-
-        # Converter para DataFrame
-        df = pd.DataFrame([customer_data])
-
-        # Adicionar IDs padrão se não existirem
-        if 'compra_id' not in df.columns:
-            df['compra_id'] = 1
-        if 'produto_id' not in df.columns:
-            df['produto_id'] = 1
-        if 'cliente_id' not in df.columns:
-            df['cliente_id'] = customer_data.get('cliente_id', 1)
-
-        # Criar features temporais usando data atual
-        now = datetime.now()
-        df['ano'] = now.year
-        df['mes'] = now.month
-        df['dia'] = now.day
-        df['dia_semana'] = now.weekday()
-        df['trimestre'] = (now.month - 1) // 3 + 1
-        df['semana_ano'] = now.isocalendar()[1]
-
-        # Features cíclicas
-        df['mes_sin'] = np.sin(2 * np.pi * df['mes'] / 12)
-        df['mes_cos'] = np.cos(2 * np.pi * df['mes'] / 12)
-        df['dia_semana_sin'] = np.sin(2 * np.pi * df['dia_semana'] / 7)
-        df['dia_semana_cos'] = np.cos(2 * np.pi * df['dia_semana'] / 7)
-
-        # Adicionar campos de produto se não existirem
-        if 'nome_produto' not in df.columns:
-            df['nome_produto'] = 'Vinho Padrão'
-        if 'safra' not in df.columns:
-            df['safra'] = 2020  # Ano padrão
+
+        index = customers_df.index
+        plan = self.feature_plan
+        features = {}
+        # Data de referência da predição (calendário e recência do feature store)
+        agora = datetime.now()
+
+        def wanted(name: str) -> bool:
+            return plan is None or plan.wants(name)
+
+        def numeric(col: str, default: Optional[float] = None) -> Optional[pd.Series]:
+            if col not in customers_df.columns:
+                return None if default is None else pd.Series(default, index=index)
+            return pd.to_numeric(customers_df[col], errors='coerce')
+
+        # IDs (valores padrão se não existirem)
+        features['compra_id'] = numeric('compra_id', 1)
+        features['cliente_id'] = numeric('cliente_id', 1)
+        features['produto_id'] = numeric('produto_id', 1)
+
+        valor = numeric('valor')
+        quantidade = numeric('quantidade')
+        idade = numeric('idade')
+        engajamento = numeric('pontuacao_engajamento')
+
+        for col, values in [('valor', valor), ('quantidade', quantidade), ('idade', idade),
+                            ('pontuacao_engajamento', engajamento)]:
+            if values is not None:
+                features[col] = values
+
+        # Safra (ano padrão se ausente ou inválida)
+        safra = numeric('safra', 2020)
+        features['safra'] = safra.fillna(2020).astype(int)
+
+        # Adicionar coluna cancelou_assinatura (target) como "Não" por padrão
+        features['cancelou_assinatura'] = 'Não'
+
+        # Variáveis categóricas (codificadas depois)
+        for col in KNOWN_CATEGORICAL_VALUES:
+            if col in customers_df.columns:
+                features[col] = customers_df[col]
+
+        if 'nome_produto' not in features:
+            features['nome_produto'] = 'Vinho Padrão'
+
+        # Features temporais da data atual (mesma tabela de calendário do treinamento)
+        if plan is None or plan.wants_step('temporal'):
+            calendar_row = self.feature_engineer.calendar.row(agora)
+            features.update({col: value for col, value in calendar_row.items() if wanted(col)})
 
         # Features agregadas (valores padrão baseados em médias típicas)
-        df['total_gasto'] = df['valor'] if 'valor' in df.columns else 0
-        df['ticket_medio'] = df['valor'] if 'valor' in df.columns else 0
-        df['num_compras'] = 1
-        df['total_itens'] = df['quantidade'] if 'quantidade' in df.columns else 1
-        df['media_itens'] = df['quantidade'] if 'quantidade' in df.columns else 1
+        valor_ou_zero = valor if valor is not None else 0
+        quantidade_ou_um = quantidade if quantidade is not None else 1
+        features['total_gasto'] = valor_ou_zero
+        features['ticket_medio'] = valor_ou_zero
+        features['num_compras'] = 1
+        features['total_itens'] = quantidade_ou_um
+        features['media_itens'] = quantidade_ou_um
 
         # Features de produto
-        df['preco_medio_produto'] = df['valor'] if 'valor' in df.columns else 0
-        df['popularidade_produto'] = 1
-        df['total_vendido_produto'] = df['quantidade'] if 'quantidade' in df.columns else 1
+        features['preco_medio_produto'] = valor_ou_zero
+        features['popularidade_produto'] = 1
+        features['total_vendido_produto'] = quantidade_ou_um
 
         # Features RFM
-        df['recencia'] = 0  # Cliente atual
-        df['frequencia'] = 1
-        df['valor_total'] = df['valor'] if 'valor' in df.columns else 0
+        features['recencia'] = 0  # Cliente atual
+        features['frequencia'] = 1
+        features['valor_total'] = valor_ou_zero
+
+        if self.feature_store is not None:
+            self._apply_store_features(features, index, as_of=agora)
 
         # Feature engineering de interação
-        if 'valor' in df.columns and 'quantidade' in df.columns:
-            df['valor_por_unidade'] = df['valor'] / (df['quantidade'] + 1)
-
-        if 'pontuacao_engajamento' in df.columns and 'idade' in df.columns:
-            df['engajamento_por_idade'] = df['pontuacao_engajamento'] / (df['idade'] + 1)
-            df['engajamento_x_idade'] = df['pontuacao_engajamento'] * df['idade']
-
-        if 'valor' in df.columns and 'idade' in df.columns:
-            df['valor_por_idade'] = df['valor'] / (df['idade'] + 1)
-
-        # Adicionar coluna cancelou_assinatura (target) como 0 por padrão
-        df['cancelou_assinatura'] = 0
-
-        # Codificar variáveis categóricas
-        categorical_cols = ['nome', 'cidade', 'assinante_clube', 'nome_produto', 'pais', 'tipo_uva']
-        for col in categorical_cols:
-            if col in df.columns:
-                # Usar LabelEncoder simples com tratamento de valores desconhecidos
-                le = LabelEncoder()
-                # Criar um conjunto de valores conhecidos (exemplos básicos)
-                known_values = {
-                    'nome': [f'Cliente {i}' for i in range(1, 101)] + ['Cliente Teste', 'Maria Santos'],
-                    'cidade': ['São Paulo', 'Rio de Janeiro', 'Belo Horizonte', 'Brasília',
-                              'Salvador', 'Fortaleza', 'Curitiba', 'Goiânia'],
-                    'assinante_clube': ['Sim', 'Não'],
-                    'nome_produto': [f'Vinho {i}' for i in range(1, 51)] + ['Vinho Padrão'],
-                    'pais': ['Brasil', 'França', 'Chile', 'Argentina', 'Itália',
-                            'Espanha', 'Portugal', 'África do Sul'],
-                    'tipo_uva': ['Merlot', 'Cabernet Sauvignon', 'Chardonnay',
-                                'Sauvignon Blanc', 'Pinot Noir', 'Malbec', 'Syrah', 'Tempranillo']
-                }
-
-                if col in known_values:
-                    le.fit(known_values[col])
-                    try:
-                        df[col] = le.transform(df[col].astype(str))
-                    except ValueError:
-                        # Valor desconhecido, usar 0
-                        df[col] = 0
-                else:
-                    df[col] = 0
-
-        # Remover apenas colunas de data que não precisamos
-        cols_to_drop = ['data_compra']
-        for col in cols_to_drop:
-            if col in df.columns:
-                df = df.drop(col, axis=1)
-
-        # Garantir que safra é numérica
-        if 'safra' in df.columns:
-            df['safra'] = pd.to_numeric(df['safra'], errors='coerce').fillna(2020).astype(int)
-
-        # Garantir que todas as colunas restantes são numéricas
-        # (nome, cidade, assinante_clube, nome_produto, pais, tipo_uva já foram codificadas acima)
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                try:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-                except:
-                    # Se não conseguir converter, deixar como está (já deve estar codificada)
-                    pass
+        if valor is not None and quantidade is not None and wanted('valor_por_unidade'):
+            features['valor_por_unidade'] = valor / (quantidade + 1)
+
+        if engajamento is not None and idade is not None:
+            if wanted('engajamento_por_idade'):
+                features['engajamento_por_idade'] = engajamento / (idade + 1)
+            if wanted('engajamento_x_idade'):
+                features['engajamento_x_idade'] = engajamento * idade
+
+        if valor is not None and idade is not None and wanted('valor_por_idade'):
+            features['valor_por_idade'] = valor / (idade + 1)
+
+        return features
+
+    def _apply_store_features(self, features: Dict[str, Any], index: pd.Index, as_of=None) -> None:
+        """
+        Substitui os agregados padrão pelos do feature store
+
+        Apenas clientes com histórico e produtos com vendas são substituídos;
+        os demais mantêm os valores derivados da própria compra. A recência é
+        medida até as_of (data da predição), e não até a última compra do store.
+        """
+        plan = self.feature_plan
+
+        def replace(values: Dict[str, np.ndarray], known: np.ndarray) -> None:
+            if not known.any():
+                return
+            for col, stored in values.items():
+                if col not in EXPECTED_COLUMNS or (plan is not None and not plan.wants(col)):
+                    continue
+                default = features[col]
+                if not isinstance(default, pd.Series):
+                    default = pd.Series(default, index=index)
+                features[col] = default.where(~known, stored)
+
+        client_columns = ['total_gasto', 'ticket_medio', 'num_compras', 'total_itens', 'media_itens',
+                          'recencia', 'frequencia', 'valor_total']
+        if plan is None or plan.select(client_columns):
+            clientes = self.feature_store.client_features(features['cliente_id'], as_of=as_of)
+            replace(clientes, clientes['frequencia'] > 0)
+
+        product_columns = ['preco_medio_produto', 'popularidade_produto', 'total_vendido_produto']
+        if plan is None or plan.select(product_columns):
+            produtos = self.feature_store.product_features(features['produto_id'])
+            replace(produtos, produtos['popularidade_produto'] > 0)
+
+    def _legacy_encode(self, customers_df: pd.DataFrame, features: Dict[str, Any]) -> pd.DataFrame:
+        """
+        Codificação usada quando o modelo não possui artefato de pré-processamento
+
+        Args:
+            customers_df: DataFrame com dados dos clientes
+            features: Features brutas do lote
+
+        Returns:
+            DataFrame preparado para predição
+        """
+        features = dict(features)
+        features['cancelou_assinatura'] = 0
+
+        # Codificar variáveis categóricas pelos valores conhecidos (desconhecidos = 0)
+        for col, encoder in _KNOWN_CATEGORICAL_ENCODERS.items():
+            if col in features:
+                values = features[col]
+                if not isinstance(values, pd.Series):
+                    values = pd.Series(values, index=customers_df.index)
+                features[col] = encoder.transform(values, unknown_code=0)
+
+        # Montar o frame final na ordem esperada pelo modelo (colunas ausentes = 0)
+        df = pd.DataFrame(
+            {col: features.get(col, 0) for col in EXPECTED_COLUMNS},
+            index=customers_df.index
+        )
 
         # Preencher NaN com 0
-        df = df.fillna(0)
-
-        # Reordenar colunas para corresponder à ordem esperada pelo modelo
-        expected_columns = [
-            'compra_id', 'cliente_id', 'produto_id', 'valor', 'quantidade',
-            'nome', 'idade', 'cidade', 'pontuacao_engajamento', 'assinante_clube',
-            'cancelou_assinatura', 'nome_produto', 'pais', 'safra', 'tipo_uva',
-            'ano', 'mes', 'dia', 'dia_semana', 'trimestre', 'semana_ano',
-            'mes_sin', 'mes_cos', 'dia_semana_sin', 'dia_semana_cos',
-            'total_gasto', 'ticket_medio', 'num_compras', 'total_itens', 'media_itens',
-            'preco_medio_produto', 'popularidade_produto', 'total_vendido_produto',
-            'recencia', 'frequencia', 'valor_total',
-            'valor_por_unidade', 'engajamento_por_idade', 'engajamento_x_idade', 'valor_por_idade'
-        ]
+        return df.fillna(0)
+
+    def _find_invalid_rows(self, customers_df: pd.DataFrame) -> pd.Series:
+        """
+        Identifica linhas com valores numéricos inválidos
+
+        Args:
+            customers_df: DataFrame com dados dos clientes
+
+        Returns:
+            Série com a mensagem de erro por linha (None para linhas válidas)
+        """
+        errors = pd.Series(None, index=customers_df.index, dtype=object)
+
+        for col in NUMERIC_INPUT_COLUMNS:
+            if col not in customers_df.columns:
+                continue
+
+            raw = customers_df[col]
+            invalid = raw.notna() & pd.to_numeric(raw, errors='coerce').isna()
+            invalid &= errors.isna()
+            if invalid.any():
+                errors[invalid] = f"Valor inválido para '{col}'"
+
+        return errors
+
+    def _predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        """
+        Probabilidades do modelo (motor compilado em lotes pequenos, sklearn nos demais)
+
+        Args:
+            X: Features preparadas
+
+        Returns:
+            Array (n_amostras × n_classes)
+        """
+        if self.engine is not None and len(X) <= SMALL_BATCH_ROWS:
+            return self.engine.predict_proba(X)
+        return self.model.predict_proba(X)
+
+    def _cache_version(self) -> tuple:
+        """Versão do modelo e do feature store que compõe as chaves do cache de predições"""
+        store = self.feature_store
+        return (str(self.model_path), self._model_version,
+                (id(store), store.version) if store is not None else None)
+
+    def _cached_predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        """
+        Probabilidades do modelo reaproveitando linhas já preditas (cache de predições)
+
+        Lotes maiores que SMALL_BATCH_ROWS (processamento em massa) não usam o
+        cache, para não descartar as entradas das consultas interativas.
+
+        Args:
+            X: Features preparadas
+
+        Returns:
+            Array (n_amostras × n_classes)
+        """
+        cache = self.prediction_cache
+        if cache is None or len(X) == 0 or len(X) > SMALL_BATCH_ROWS:
+            return self._predict_proba(X)
+
+        version = self._cache_version()
+        cache.sync(version)
+        keys = cache.row_keys(X, version)
+        cached = [cache.get(key) for key in keys]
+
+        missing = [i for i, value in enumerate(cached) if value is None]
+        if missing:
+            computed = self._predict_proba(X.iloc[missing])
+            for i, probabilities in zip(missing, computed):
+                cache.put(keys[i], probabilities)
+                cached[i] = probabilities
+
+        return np.vstack(cached)
 
-        # Garantir que todas as colunas esperadas existem
-        for col in expected_columns:
-            if col not in df.columns:
-                df[col] = 0
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Estatísticas do cache de predições
+
+        Returns:
+            Acertos, falhas, taxa de acerto, expirações, descartes e ocupação
+            (dicionário vazio se o cache estiver desativado)
+        """
+        return self.prediction_cache.stats() if self.prediction_cache is not None else {}
+
+    @staticmethod
+    def _classify_risk(churn_probability: float) -> Tuple[str, str]:
+        """
+        Classifica o nível de risco a partir da probabilidade de churn
+
+        Args:
+            churn_probability: Probabilidade de churn
 
-        # Reordenar para corresponder exatamente
-        df = df[expected_columns]
+        Returns:
+            Tupla com nível de risco e cor
+        """
+        for threshold, level, color in RISK_LEVELS:
+            if churn_probability >= threshold:
+                return level, color
 
-        return df
+        return RISK_LEVELS[-1][1], RISK_LEVELS[-1][2]
 
     def predict_churn(self, customer_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -195,15 +557,28 @@ class ChurnPredictor:
         Returns:
             Dicionário com resultado da predição
         """
-        if self.model is None:
-            self.load_model()
+        with self._lock:
+            self._ensure_loaded()
+
+            # Preparar dados
+            df = self.prepare_single_prediction(customer_data)
+
+            return self._predict_prepared(customer_data, df)
+
+    def _predict_prepared(self, customer_data: Dict[str, Any], df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Predição de churn de um cliente com as features já preparadas
 
-        # Preparar dados
-        df = self.prepare_single_prediction(customer_data)
+        Args:
+            customer_data: Dicionário com dados do cliente
+            df: Features preparadas (prepare_single_prediction)
 
-        # Fazer predição
-        prediction = self.model.predict(df)[0]
-        probability = self.model.predict_proba(df)[0]
+        Returns:
+            Dicionário com resultado da predição
+        """
+        # Fazer predição (rótulo derivado das probabilidades, uma única chamada ao modelo)
+        probability = self._cached_predict_proba(df)[0]
+        prediction = self.classes_[np.argmax(probability)]
 
         # Interpretar resultado
         will_churn = bool(prediction == 1)
@@ -211,15 +586,7 @@ class ChurnPredictor:
         retain_probability = float(probability[0])
 
         # Classificar risco
-        if churn_probability >= 0.7:
-            risk_level = "Alto"
-            risk_color = "red"
-        elif churn_probability >= 0.4:
-            risk_level = "Médio"
-            risk_color = "orange"
-        else:
-            risk_level = "Baixo"
-            risk_color = "green"
+        risk_level, risk_color = self._classify_risk(churn_probability)
 
         # Gerar recomendações
         recommendations = self._generate_recommendations(customer_data, churn_probability)
@@ -234,35 +601,78 @@ class ChurnPredictor:
             'customer_data': customer_data
         }
 
-    def predict_batch(self, customers_df: pd.DataFrame) -> pd.DataFrame:
+    def predict_batch(self, customers_df: pd.DataFrame, chunk_size: Optional[int] = None) -> pd.DataFrame:
         """
         Faz predições em lote para múltiplos clientes
 
+        As features são preparadas para o lote inteiro e o modelo é chamado
+        uma única vez (por bloco) com predict_proba. Linhas com dados inválidos
+        não são enviadas ao modelo e recebem a mensagem na coluna 'error'.
+
         Args:
             customers_df: DataFrame com dados de múltiplos clientes
+            chunk_size: Número máximo de linhas por chamada ao modelo (None = lote inteiro)
 
         Returns:
             DataFrame com predições
         """
-        if self.model is None:
-            self.load_model()
+        self._ensure_loaded()
 
-        results = []
+        if chunk_size is not None and len(customers_df) > chunk_size:
+            parts = [
+                self.predict_batch(customers_df.iloc[start:start + chunk_size])
+                for start in range(0, len(customers_df), chunk_size)
+            ]
+            return pd.concat(parts, ignore_index=True)
 
-        for idx, row in customers_df.iterrows():
-            customer_data = row.to_dict()
+        errors = self._find_invalid_rows(customers_df)
+        valid = errors.isna().to_numpy()
+
+        n = len(customers_df)
+        churn_probability = np.full(n, np.nan)
+        retain_probability = np.full(n, np.nan)
+        will_churn = pd.array([pd.NA] * n, dtype='boolean')
+
+        if valid.any():
             try:
-                prediction = self.predict_churn(customer_data)
-                prediction['cliente_id'] = customer_data.get('cliente_id', idx)
-                results.append(prediction)
+                with self._lock:
+                    X = self.prepare_batch_prediction(customers_df[valid])
+                    probabilities = self._cached_predict_proba(X)
+                    labels = self.classes_[np.argmax(probabilities, axis=1)]
+
+                churn_probability[valid] = probabilities[:, 1]
+                retain_probability[valid] = probabilities[:, 0]
+                will_churn[valid] = labels == 1
             except Exception as e:
-                logger.error(f"Erro ao processar cliente {idx}: {e}")
-                results.append({
-                    'cliente_id': customer_data.get('cliente_id', idx),
-                    'error': str(e)
-                })
+                logger.error(f"Erro ao processar lote de {int(valid.sum())} clientes: {e}")
+                errors[valid] = str(e)
+                valid = np.zeros(n, dtype=bool)
+
+        for idx, error in errors.dropna().items():
+            logger.error(f"Erro ao processar cliente {idx}: {error}")
+
+        # Classificar risco de forma vetorizada
+        conditions = [valid & (churn_probability >= threshold) for threshold, _, _ in RISK_LEVELS]
+        risk_level = np.select(conditions, [level for _, level, _ in RISK_LEVELS], default=None)
+        risk_color = np.select(conditions, [color for _, _, color in RISK_LEVELS], default=None)
+
+        if 'cliente_id' in customers_df.columns:
+            cliente_id = customers_df['cliente_id'].to_numpy()
+        else:
+            cliente_id = customers_df.index.to_numpy()
+
+        results = pd.DataFrame({
+            'cliente_id': cliente_id,
+            'will_churn': will_churn,
+            'churn_probability': churn_probability,
+            'retain_probability': retain_probability,
+            'risk_level': risk_level,
+            'risk_color': risk_color,
+            'recommendations': self._generate_recommendations_batch(customers_df, churn_probability, valid),
+            'error': errors.to_numpy(),
+        })
 
-        return pd.DataFrame(results)
+        return results
 
     def _generate_recommendations(self, customer_data: Dict[str, Any], churn_prob: float) -> list:
         """
@@ -313,6 +723,56 @@ class ChurnPredictor:
 
         return recommendations
 
+    def _generate_recommendations_batch(self, customers_df: pd.DataFrame, churn_prob: np.ndarray,
+                                        valid: np.ndarray) -> list:
+        """
+        Gera recomendações para um lote de clientes
+
+        As regras de _generate_recommendations são avaliadas como máscaras
+        vetorizadas; cada combinação de regras gera sua lista base uma única vez.
+
+        Args:
+            customers_df: DataFrame com dados dos clientes
+            churn_prob: Probabilidades de churn (NaN para linhas inválidas)
+            valid: Máscara das linhas válidas
+
+        Returns:
+            Lista de recomendações por linha (None para linhas inválidas)
+        """
+        n = len(customers_df)
+        index = customers_df.index
+
+        def column(col: str, default: Any) -> pd.Series:
+            if col in customers_df.columns:
+                return customers_df[col]
+            return pd.Series(default, index=index)
+
+        tier = np.where(churn_prob >= 0.7, 0, np.where(churn_prob >= 0.4, 1, 2))
+        nao_assinante = (column('assinante_clube', None) == 'Não').to_numpy()
+        engajamento_baixo = (pd.to_numeric(column('pontuacao_engajamento', 0), errors='coerce') < 5).to_numpy()
+        alto_valor = (pd.to_numeric(column('valor', 0), errors='coerce') > 300).to_numpy()
+
+        cidades = column('cidade', '')
+        cidades = cidades.where(cidades.notna(), '').astype(str).to_numpy()
+
+        keys = tier * 8 + nao_assinante * 4 + engajamento_baixo * 2 + alto_valor
+
+        base_by_key = {}
+        for key in np.unique(keys[valid]):
+            churn_ref = (0.7, 0.4, 0.0)[key // 8]
+            profile = {
+                'assinante_clube': 'Não' if key & 4 else None,
+                'pontuacao_engajamento': 0 if key & 2 else 5,
+                'valor': 301 if key & 1 else 0,
+            }
+            base_by_key[key] = self._generate_recommendations(profile, churn_ref)
+
+        return [
+            (base_by_key[key] + [f"🌍 Evento exclusivo em {cidade}"] if cidade else list(base_by_key[key]))
+            if ok else None
+            for key, cidade, ok in zip(keys, cidades, valid)
+        ]
+
     def get_feature_importance(self, customer_data: Dict[str, Any]) -> Dict[str, float]:
         """
         Retorna a importância das features para a predição
@@ -323,23 +783,53 @@ class ChurnPredictor:
         Returns:
             Dicionário com importância das features
         """
-        if self.model is None:
-            self.load_model()
+        with self._lock:
+            self._ensure_loaded()
 
-        # Verificar se o modelo tem feature_importances_
-        if not hasattr(self.model, 'feature_importances_'):
-            return {}
+            if not self._preprocessing_loaded:
+                self.load_preprocessing()
+
+            # As colunas preparadas dependem apenas do pré-processamento, não dos valores do cliente
+            columns = self.feature_names if self.preprocessing is not None else EXPECTED_COLUMNS
+            return self._feature_importance(columns)
+
+    def _feature_importance(self, columns: List[str]) -> Dict[str, float]:
+        """
+        Importâncias do modelo por coluna, ordenadas (guardadas no cache de predições)
 
-        df = self.prepare_single_prediction(customer_data)
+        Args:
+            columns: Colunas das features preparadas
+
+        Returns:
+            Dicionário com importância das features
+        """
+        cache = self.prediction_cache
+        if cache is not None:
+            cache.sync(self._cache_version())
+            key = ('importancias', tuple(columns))
+            cached = cache.get(key)
+            if cached is not None:
+                return dict(cached)
+
+        # Importâncias gravadas no artefato evitam carregar o modelo sklearn
+        if self.artifact is not None and self.artifact.metadata.get('feature_importances') is not None:
+            importances = self.artifact.metadata['feature_importances']
+        elif hasattr(self.model, 'feature_importances_'):
+            importances = self.model.feature_importances_
+        else:
+            return {}
 
         importance_dict = {}
-        for col, importance in zip(df.columns, self.model.feature_importances_):
+        for col, importance in zip(columns, importances):
             importance_dict[col] = float(importance)
 
         # Ordenar por importância
         importance_dict = dict(sorted(importance_dict.items(), key=lambda x: x[1], reverse=True))
 
-        return importance_dict
+        if cache is not None:
+            cache.put(key, importance_dict)
+
+        return dict(importance_dict)
 
     def explain_prediction(self, customer_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -351,27 +841,32 @@ class ChurnPredictor:
         Returns:
             Explicação detalhada da predição
         """
-        prediction = self.predict_churn(customer_data)
-        feature_importance = self.get_feature_importance(customer_data)
+        with self._lock:
+            self._ensure_loaded()
 
-        # Top 5 features mais importantes
-        top_features = list(feature_importance.items())[:5]
+            # Features preparadas uma única vez para a predição e as importâncias
+            df = self.prepare_single_prediction(customer_data)
+            prediction = self._predict_prepared(customer_data, df)
+            feature_importance = self._feature_importance(list(df.columns))
 
-        explanation = {
-            'prediction': prediction,
-            'top_features': top_features,
-            'reasoning': []
-        }
+            # Top 5 features mais importantes
+            top_features = list(feature_importance.items())[:5]
 
-        # Gerar explicações baseadas nas features
-        for feature, importance in top_features:
-            if importance > 0.1:  # Apenas features relevantes
-                value = customer_data.get(feature, 'N/A')
-                explanation['reasoning'].append(
-                    f"'{feature}' (valor: {value}) tem importância de {importance:.2%}"
-                )
+            explanation = {
+                'prediction': prediction,
+                'top_features': top_features,
+                'reasoning': []
+            }
+
+            # Gerar explicações baseadas nas features
+            for feature, importance in top_features:
+                if importance > 0.1:  # Apenas features relevantes
+                    value = customer_data.get(feature, 'N/A')
+                    explanation['reasoning'].append(
+                        f"'{feature}' (valor: {value}) tem importância de {importance:.2%}"
+                    )
 
-        return explanation
+            return explanation
 
 
 class SalesPredictor:
@@ -379,16 +874,48 @@ class SalesPredictor:
 
     def __init__(self):
         self.historical_data = None
+        self.store = None
+        self.interactions = None
+        self.produtos = None
 
-    def load_historical_data(self, data_path: str = "data"):
-        """Carrega dados históricos para análise de tendências"""
+    def load_historical_data(self, data_path: str = "data", backend: str = "memory"):
+        """
+        Carrega dados históricos para análise de tendências
+
+        Args:
+            data_path: Diretório com os arquivos CSV
+            backend: 'memory' (histórico combinado em memória), 'sqlite'
+                (consultas indexadas por cliente, sem carregar o histórico) ou
+                'interactions' (resumo do cliente pela linha da matriz esparsa
+                cliente × produto; a receita usa o SQLite)
+        """
         from data.data_loader import DataLoader
 
-        loader = DataLoader(data_dir=data_path)
+        loader = DataLoader(data_dir=data_path, use_cache=True)
+
+        if backend == 'interactions':
+            self.interactions = loader.get_interactions()
+            self.produtos = loader.produtos.drop_duplicates('produto_id').set_index('produto_id')
+            self.store = loader.get_store()
+            return
+
+        if backend == 'sqlite':
+            self.store = loader.get_store()
+            return
+
         loader.load_data()
         loader.validate_data()
         self.historical_data = loader.merge_data()
 
+    def _customer_purchases(self, customer_id: int) -> pd.DataFrame:
+        """Compras de um cliente (busca indexada no backend SQLite)"""
+        if self.store is not None:
+            return self.store.client_history(customer_id)
+
+        return self.historical_data[
+            self.historical_data['cliente_id'] == customer_id
+        ]
+
     def predict_next_purchase(self, customer_id: int) -> Dict[str, Any]:
         """
         Prediz quando e quanto será a próxima compra do cliente
@@ -399,32 +926,20 @@ class SalesPredictor:
         Returns:
             Predição da próxima compra
         """
-        if self.historical_data is None:
+        if self.historical_data is None and self.store is None:
             raise ValueError("Carregue os dados históricos primeiro")
 
+        if self.interactions is not None:
+            summary = self.interactions.client_summary(customer_id)
+            if summary is None:
+                return self._missing_history(customer_id)
+            return self._predict_from_summary(customer_id, summary)
+
         # Filtrar compras do cliente
-        customer_purchases = self.historical_data[
-            self.historical_data['cliente_id'] == customer_id
-        ]
+        customer_purchases = self._customer_purchases(customer_id)
 
         if len(customer_purchases) == 0:
-            # Verificar se o cliente existe no cadastro
-            from data.data_loader import DataLoader
-            loader = DataLoader(data_dir="data")
-            clientes, _, _ = loader.load_data()
-
-            if customer_id in clientes['cliente_id'].values:
-                return {
-                    'error': f'Cliente #{customer_id} existe no cadastro, mas não possui histórico de compras. Para fazer previsões, o cliente precisa ter feito pelo menos uma compra.',
-                    'customer_id': customer_id,
-                    'suggestion': 'Tente com um cliente que já tenha realizado compras (exemplo: ID 5, 7, 8, 10, etc.)'
-                }
-            else:
-                return {
-                    'error': f'Cliente #{customer_id} não encontrado no sistema.',
-                    'customer_id': customer_id,
-                    'suggestion': 'Verifique se o ID está correto.'
-                }
+            return self._missing_history(customer_id)
 
 
         # Calcular estatísticas
@@ -464,6 +979,71 @@ class SalesPredictor:
             'lifetime_value': float(customer_purchases['valor'].sum())
         }
 
+    def _missing_history(self, customer_id: int) -> Dict[str, Any]:
+        """Resposta para clientes sem compras (cadastrado ou inexistente)"""
+        # Verificar se o cliente existe no cadastro
+        if self.store is not None:
+            cliente_existe = self.store.has_cliente(customer_id)
+        else:
+            from data.data_loader import DataLoader
+            loader = DataLoader(data_dir="data", use_cache=True)
+            clientes, _, _ = loader.load_data()
+            cliente_existe = customer_id in clientes['cliente_id'].values
+
+        if cliente_existe:
+            return {
+                'error': f'Cliente #{customer_id} existe no cadastro, mas não possui histórico de compras. Para fazer previsões, o cliente precisa ter feito pelo menos uma compra.',
+                'customer_id': customer_id,
+                'suggestion': 'Tente com um cliente que já tenha realizado compras (exemplo: ID 5, 7, 8, 10, etc.)'
+            }
+        else:
+            return {
+                'error': f'Cliente #{customer_id} não encontrado no sistema.',
+                'customer_id': customer_id,
+                'suggestion': 'Verifique se o ID está correto.'
+            }
+
+    def _predict_from_summary(self, customer_id: int, summary: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Predição da próxima compra a partir da linha do cliente na matriz de interações
+
+        O intervalo médio entre compras ordenadas por data é
+        (última - primeira) / (compras datadas - 1), igual à média das
+        diferenças, sem ordenar o histórico do cliente.
+        """
+        total_purchases = summary['compras']
+
+        if total_purchases > 1 and summary['ultima_data'] is not None:
+            if summary['n_datas'] > 1:
+                avg_interval = (summary['ultima_data'] - summary['primeira_data']).days / (summary['n_datas'] - 1)
+            else:
+                avg_interval = 30
+            next_purchase_date = summary['ultima_data'] + pd.Timedelta(days=avg_interval)
+        else:
+            avg_interval = 30
+            next_purchase_date = pd.Timestamp.now() + pd.Timedelta(days=30)
+
+        # Tipo de uva mais comprado (empates pelo menor rótulo, como em mode())
+        favorite_wine = 'N/A'
+        if self.produtos is not None and 'tipo_uva' in self.produtos.columns:
+            products = self.interactions.client_products(customer_id)
+            tipos = products['produto_id'].map(self.produtos['tipo_uva'])
+            counts = products['compras'].groupby(tipos.to_numpy()).sum()
+            if len(counts) > 0:
+                favorite_wine = sorted(counts.index[counts == counts.max()])[0]
+
+        return {
+            'customer_id': customer_id,
+            'predicted_next_purchase_date': next_purchase_date.strftime('%Y-%m-%d'),
+            'days_until_next_purchase': int((next_purchase_date - pd.Timestamp.now()).days),
+            'predicted_value': float(summary['valor_medio']),
+            'predicted_quantity': int(round(summary['quantidade_media'])),
+            'avg_interval_days': int(round(avg_interval)),
+            'total_historical_purchases': total_purchases,
+            'favorite_wine_type': favorite_wine,
+            'lifetime_value': summary['valor_total']
+        }
+
     def predict_revenue(self, months_ahead: int = 3) -> Dict[str, Any]:
         """
         Prediz receita futura baseada em tendências históricas
@@ -474,22 +1054,29 @@ class SalesPredictor:
         Returns:
             Predição de receita
         """
-        if self.historical_data is None:
+        if self.historical_data is None and self.store is None:
             raise ValueError("Carregue os dados históricos primeiro")
 
         # Calcular receita histórica
-        total_revenue = self.historical_data['valor'].sum()
+        if self.store is not None:
+            revenue = self.store.revenue_summary()
+            total_revenue = revenue['receita_total']
+        else:
+            total_revenue = self.historical_data['valor'].sum()
         avg_monthly_revenue = total_revenue / 12  # Assumindo dados de 1 ano
 
         # Predição simples baseada em média
         predicted_revenue = avg_monthly_revenue * months_ahead
 
         # Calcular tendência
-        if 'data_compra' in self.historical_data.columns:
-            self.historical_data['data_compra'] = pd.to_datetime(self.historical_data['data_compra'])
-            monthly_revenue = self.historical_data.groupby(
-                self.historical_data['data_compra'].dt.to_period('M')
-            )['valor'].sum()
+        if self.store is not None or 'data_compra' in self.historical_data.columns:
+            if self.store is not None:
+                monthly_revenue = revenue['receita_mensal']
+            else:
+                self.historical_data['data_compra'] = pd.to_datetime(self.historical_data['data_compra'])
+                monthly_revenue = self.historical_data.groupby(
+                    self.historical_data['data_compra'].dt.to_period('M')
+                )['valor'].sum()
 
             if len(monthly_revenue) > 1:
                 # Calcular taxa de crescimento
@@ -516,16 +1103,89 @@ class ProductRecommender:
 
     def __init__(self):
         self.historical_data = None
+        self.store = None
+        self.interactions = None
+        self.produtos = None
+
+    def load_historical_data(self, data_path: str = "data", backend: str = "memory"):
+        """
+        Carrega dados históricos
 
-    def load_historical_data(self, data_path: str = "data"):
-        """Carrega dados históricos"""
+        Args:
+            data_path: Diretório com os arquivos CSV
+            backend: 'memory' (histórico combinado em memória), 'sqlite'
+                (consultas indexadas, sem carregar o histórico) ou
+                'interactions' (matriz esparsa cliente × produto em memory-map)
+        """
         from data.data_loader import DataLoader
 
-        loader = DataLoader(data_dir=data_path)
+        loader = DataLoader(data_dir=data_path, use_cache=True)
+
+        if backend == 'interactions':
+            self.interactions = loader.get_interactions()
+            self.produtos = loader.produtos.drop_duplicates('produto_id').set_index('produto_id')
+            return
+
+        if backend == 'sqlite':
+            self.store = loader.get_store()
+            return
+
         loader.load_data()
         loader.validate_data()
         self.historical_data = loader.merge_data()
 
+    def _recommend_from_store(self, customer_id: int, top_n: int) -> list:
+        """Recomendações calculadas por consultas indexadas no SQLite"""
+        if len(self.store.client_history(customer_id, with_details=False)) == 0:
+            return []
+
+        product_popularity = self.store.popular_products_for(customer_id)
+
+        recommendations = []
+        for _, row in product_popularity.head(top_n).iterrows():
+            product_info = self.store.get_produto(row['produto_id'])
+            if product_info is None:
+                product_info = pd.Series(dtype=object)
+
+            recommendations.append({
+                'produto_id': int(row['produto_id']),
+                'nome': product_info.get('nome', 'N/A'),
+                'tipo_uva': product_info.get('tipo_uva', 'N/A'),
+                'pais': product_info.get('pais', 'N/A'),
+                'avg_price': float(row['avg_price']),
+                'popularity_score': int(row['purchase_count']),
+                'reason': 'Popular entre clientes similares'
+            })
+
+        return recommendations
+
+    def _recommend_from_interactions(self, customer_id: int, top_n: int) -> list:
+        """Recomendações pela linha do cliente e pelos totais das colunas da matriz"""
+        if len(self.interactions.client_products(customer_id)) == 0:
+            return []
+
+        product_popularity = self.interactions.popular_products_for(customer_id)
+
+        recommendations = []
+        for _, row in product_popularity.head(top_n).iterrows():
+            produto_id = int(row['produto_id'])
+            if produto_id in self.produtos.index:
+                product_info = self.produtos.loc[produto_id]
+            else:
+                product_info = pd.Series(dtype=object)
+
+            recommendations.append({
+                'produto_id': produto_id,
+                'nome': product_info.get('nome', 'N/A'),
+                'tipo_uva': product_info.get('tipo_uva', 'N/A'),
+                'pais': product_info.get('pais', 'N/A'),
+                'avg_price': float(row['avg_price']),
+                'popularity_score': int(row['purchase_count']),
+                'reason': 'Popular entre clientes similares'
+            })
+
+        return recommendations
+
     def recommend_products(self, customer_id: int, top_n: int = 5) -> list:
         """
         Recomenda produtos para um cliente
@@ -537,9 +1197,15 @@ class ProductRecommender:
         Returns:
             Lista de produtos recomendados
         """
-        if self.historical_data is None:
+        if self.historical_data is None and self.store is None and self.interactions is None:
             raise ValueError("Carregue os dados históricos primeiro")
 
+        if self.interactions is not None:
+            return self._recommend_from_interactions(customer_id, top_n)
+
+        if self.store is not None:
+            return self._recommend_from_store(customer_id, top_n)
+
         # Filtrar compras do cliente
         customer_purchases = self.historical_data[
             self.historical_data['cliente_id'] == customer_id
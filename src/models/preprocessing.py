@@ -0,0 +1,171 @@
+"""
+Módulo com o artefato de pré-processamento usado em produção
+"""
+import pandas as pd
+import numpy as np
+import joblib
+from pathlib import Path
+import logging
+from typing import Dict, List, Optional, Any
+
+from data.categorical_encoding import CategoricalEncoder, UNKNOWN_CODE
+
+logger = logging.getLogger(__name__)
+
+# Versão do formato do artefato (incrementar quando a estrutura mudar)
+PREPROCESSING_VERSION = 2
+
+# Versões anteriores ainda aceitas na carga (1 = tabelas {rótulo: código})
+COMPATIBLE_VERSIONS = (1, PREPROCESSING_VERSION)
+
+
+class PreprocessingBundle:
+    """Pré-processamento ajustado no treinamento e reaplicado na predição"""
+
+    def __init__(self, encoders: Dict[str, CategoricalEncoder], feature_columns: List[str],
+                 fill_values: Optional[Dict[str, float]] = None,
+                 selected_features: Optional[List[str]] = None,
+                 version: int = PREPROCESSING_VERSION):
+        self.encoders = encoders
+        self.feature_columns = list(feature_columns)
+        self.fill_values = fill_values or {}
+        self.selected_features = selected_features
+        self.version = version
+
+    @classmethod
+    def from_feature_engineer(cls, feature_engineer, X: pd.DataFrame,
+                              fill_values: Optional[Dict[str, float]] = None) -> 'PreprocessingBundle':
+        """
+        Cria o artefato a partir dos encoders ajustados no pipeline
+
+        Args:
+            feature_engineer: FeatureEngineer usado no treinamento
+            X: Features finais usadas no treinamento (define a ordem das colunas)
+            fill_values: Valores usados para preencher NaN por coluna
+
+        Returns:
+            PreprocessingBundle com os vocabulários das categorias
+        """
+        encoders = {
+            col: CategoricalEncoder(encoder.classes_)
+            for col, encoder in feature_engineer.label_encoders.items()
+            if col in X.columns
+        }
+
+        fill_values = {col: float(value) for col, value in (fill_values or {}).items()
+                       if col in X.columns and pd.notna(value)}
+
+        return cls(
+            encoders=encoders,
+            feature_columns=X.columns.tolist(),
+            fill_values=fill_values,
+            selected_features=feature_engineer.selected_features,
+        )
+
+    @staticmethod
+    def path_for_model(model_path: Any) -> Path:
+        """
+        Retorna o caminho do artefato de pré-processamento de um modelo
+
+        Args:
+            model_path: Caminho do modelo (ex: best_model_Gradient_Boosting.pkl)
+
+        Returns:
+            Caminho do artefato (ex: best_model_Gradient_Boosting_preprocessing.pkl)
+        """
+        model_path = Path(model_path)
+        return model_path.with_name(f"{model_path.stem}_preprocessing.pkl")
+
+    def transform(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Aplica o pré-processamento a um DataFrame de features brutas
+
+        Categorias são codificadas pelos vocabulários congelados (valores não
+        vistos recebem UNKNOWN_CODE), colunas ausentes e NaN recebem os valores de
+        preenchimento do treinamento e a ordem das colunas é a do modelo.
+
+        Args:
+            data: DataFrame com features ainda não codificadas
+
+        Returns:
+            DataFrame pronto para o modelo
+        """
+        columns = {}
+
+        for col in self.feature_columns:
+            fill_value = self.fill_values.get(col, 0)
+
+            if col in self.encoders:
+                if col in data.columns:
+                    columns[col] = self.encoders[col].transform(data[col])
+                else:
+                    columns[col] = UNKNOWN_CODE
+            elif col in data.columns:
+                columns[col] = pd.to_numeric(data[col], errors='coerce').fillna(fill_value)
+            else:
+                columns[col] = fill_value
+
+        return pd.DataFrame(columns, index=data.index)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Retorna o conteúdo do artefato como dicionário serializável"""
+        return {
+            'version': self.version,
+            'encoders': {col: encoder.to_dict() for col, encoder in self.encoders.items()},
+            'feature_columns': self.feature_columns,
+            'fill_values': self.fill_values,
+            'selected_features': self.selected_features,
+        }
+
+    def save(self, filepath: Any) -> None:
+        """
+        Salva o artefato em disco
+
+        Args:
+            filepath: Caminho do arquivo
+        """
+        filepath = Path(filepath)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(self.to_dict(), filepath)
+
+        logger.info(f"Pré-processamento salvo em: {filepath}")
+
+    @classmethod
+    def load(cls, filepath: Any) -> 'PreprocessingBundle':
+        """
+        Carrega o artefato do disco
+
+        Args:
+            filepath: Caminho do arquivo
+
+        Returns:
+            PreprocessingBundle carregado
+        """
+        filepath = Path(filepath)
+
+        if not filepath.exists():
+            raise FileNotFoundError(f"Pré-processamento não encontrado: {filepath}")
+
+        content = joblib.load(filepath)
+        version = content.get('version')
+        if version not in COMPATIBLE_VERSIONS:
+            raise ValueError(
+                f"Versão do pré-processamento incompatível: {version} "
+                f"(esperada: {PREPROCESSING_VERSION}). Execute o pipeline novamente."
+            )
+
+        logger.info(f"Pré-processamento carregado de: {filepath}")
+
+        if version == 1:
+            encoders = {col: CategoricalEncoder.from_lookup(lookup)
+                        for col, lookup in content['categorical_lookups'].items()}
+        else:
+            encoders = {col: CategoricalEncoder.from_dict(encoder)
+                        for col, encoder in content['encoders'].items()}
+
+        return cls(
+            encoders=encoders,
+            feature_columns=content['feature_columns'],
+            fill_values=content['fill_values'],
+            selected_features=content.get('selected_features'),
+        )
@@ -0,0 +1,399 @@
+"""
+Módulo com o servidor HTTP local de predição de churn (micro-batching)
+"""
+import pandas as pd
+import numpy as np
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.predictor import ChurnPredictor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+
+# Tamanho máximo do corpo de uma requisição (bytes)
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+# Quantidade de latências recentes usadas nos percentis
+LATENCY_WINDOW = 10_000
+
+HTTP_STATUS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+}
+
+
+class _RequestError(Exception):
+    """Requisição HTTP malformada: respondida com o status e a conexão é encerrada"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Converte uma linha do resultado de predict_batch para tipos JSON (NaN/NA viram None)"""
+    converted = {}
+    for key, value in row.items():
+        if isinstance(value, (list, tuple, np.ndarray)):
+            converted[key] = list(value)
+        elif value is None or pd.isna(value):
+            converted[key] = None
+        elif isinstance(value, np.generic):
+            converted[key] = value.item()
+        else:
+            converted[key] = value
+    return converted
+
+
+class LatencyStats:
+    """Contadores de requisições/lotes e latências recentes (p50/p99)"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.latencies_ms = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.rows = 0
+        self.started_at = time.perf_counter()
+
+    def record_batch(self, size: int, latencies_ms: List[float], errors: int) -> None:
+        """
+        Registra um lote processado
+
+        Args:
+            size: Número de clientes no lote
+            latencies_ms: Latência de cada requisição do lote (fila + modelo)
+            errors: Requisições do lote com erro
+        """
+        self.batches += 1
+        self.rows += size
+        self.requests += len(latencies_ms)
+        self.errors += errors
+        self.batch_sizes.append(size)
+        self.latencies_ms.extend(latencies_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Métricas atuais: contadores, vazão e percentis de latência"""
+        uptime = time.perf_counter() - self.started_at
+        latencies = np.fromiter(self.latencies_ms, dtype=float)
+        p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (None, None)
+
+        return {
+            'requisicoes': self.requests,
+            'erros': self.errors,
+            'lotes': self.batches,
+            'clientes': self.rows,
+            'media_lote': self.rows / self.batches if self.batches else None,
+            'maior_lote': max(self.batch_sizes) if self.batch_sizes else None,
+            'latencia_p50_ms': float(p50) if p50 is not None else None,
+            'latencia_p99_ms': float(p99) if p99 is not None else None,
+            'vazao_req_s': self.requests / uptime if uptime > 0 else None,
+            'uptime_s': uptime,
+        }
+
+
+class MicroBatcher:
+    """
+    Agrupa predições concorrentes em lotes para uma única chamada ao modelo
+
+    Cada requisição entra numa fila; um laço de fundo retira o primeiro item,
+    aguarda até max_wait_ms por mais itens (ou até max_batch_size) e envia o
+    lote inteiro para ChurnPredictor.predict_batch, que prepara as features e
+    chama predict_proba uma única vez. O modelo roda numa thread dedicada para
+    não bloquear o laço de eventos enquanto as próximas requisições chegam.
+    """
+
+    def __init__(self, predictor: ChurnPredictor, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size deve ser >= 1")
+
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.stats = LatencyStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='churn-batch')
+
+    def start(self) -> None:
+        """Inicia o laço de agrupamento (no laço de eventos atual)"""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Interrompe o laço e libera a thread do modelo"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future, _ = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("Servidor encerrado"))
+
+        self._executor.shutdown(wait=True)
+
+    async def submit(self, customer_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Enfileira um cliente e aguarda o resultado do lote
+
+        Args:
+            customer_data: Dicionário com dados do cliente
+
+        Returns:
+            Linha do resultado de predict_batch (tipos JSON)
+        """
+        if self._queue is None:
+            raise RuntimeError("MicroBatcher não iniciado")
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((customer_data, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> List[Tuple[Dict[str, Any], asyncio.Future, float]]:
+        """Retira o próximo lote da fila (limitado por tamanho e tempo de espera)"""
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Itens já enfileirados entram sem esperar
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    def _score(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Executa predict_batch para o lote (roda na thread do modelo)"""
+        results = self.predictor.predict_batch(pd.DataFrame.from_records(records))
+        return [_json_row(row) for row in results.to_dict(orient='records')]
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self._collect()
+            records = [record for record, _, _ in batch]
+
+            try:
+                rows = await loop.run_in_executor(self._executor, self._score, records)
+            except Exception as e:
+                logger.error(f"Erro ao processar lote de {len(batch)} clientes: {e}")
+                rows = None
+                error = e
+
+            done = time.perf_counter()
+            latencies = [(done - t0) * 1000 for _, _, t0 in batch]
+
+            if rows is None:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                self.stats.record_batch(len(batch), latencies, errors=len(batch))
+                continue
+
+            for (_, future, _), row in zip(batch, rows):
+                if not future.done():
+                    future.set_result(row)
+            self.stats.record_batch(len(batch), latencies,
+                                    errors=sum(row.get('error') is not None for row in rows))
+
+
+class ChurnScoringServer:
+    """
+    Servidor HTTP/1.1 mínimo (asyncio, sem dependências externas) para predição de churn
+
+    Rotas:
+        POST /predict  corpo JSON com um cliente (objeto) ou vários (lista);
+                       cada cliente entra individualmente no micro-batching
+        GET  /metrics  contadores, vazão, latências p50/p99 e cache de predições
+        GET  /health   estado do servidor
+
+    Conexões keep-alive são mantidas, de modo que o cliente pode reutilizar
+    a mesma conexão para várias requisições.
+    """
+
+    def __init__(self, predictor: ChurnPredictor, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        self.predictor = predictor
+        self.host = host
+        self.port = port
+        self.batcher = MicroBatcher(predictor, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def stats(self) -> LatencyStats:
+        return self.batcher.stats
+
+    async def start(self) -> None:
+        """Carrega o modelo e começa a aceitar conexões"""
+        self.predictor._ensure_loaded()
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+
+        # Porta 0 = porta livre escolhida pelo sistema
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(
+            f"Servidor de churn em http://{self.host}:{self.port} "
+            f"(lote máx. {self.batcher.max_batch_size}, espera máx. {self.batcher.max_wait * 1000:.1f}ms)"
+        )
+
+    async def stop(self) -> None:
+        """Para de aceitar conexões, encerra o micro-batching e registra as métricas finais"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+        await self.batcher.stop()
+        logger.info(f"Servidor encerrado. Métricas: {self.stats.snapshot()}")
+
+    async def serve_forever(self) -> None:
+        """Inicia o servidor e atende até ser cancelado (ex.: Ctrl+C)"""
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except _RequestError as e:
+                    # O restante da requisição não foi lido: a conexão não pode ser reutilizada
+                    await self._write_response(writer, e.status, {'error': str(e)}, keep_alive=False)
+                    break
+
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                status, payload = await self._dispatch(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+
+                await self._write_response(writer, status, payload, keep_alive)
+
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write_response(writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool) -> None:
+        """Envia a resposta JSON"""
+        content = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_STATUS[status]}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(content)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1')
+            + content
+        )
+        await writer.drain()
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        """
+        Lê uma requisição HTTP
+
+        Returns:
+            (método, caminho, cabeçalhos, corpo) ou None quando o cliente fecha a conexão
+
+        Raises:
+            _RequestError: Linha de requisição ou Content-Length inválidos, corpo grande demais
+        """
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+
+        parts = request_line.decode('latin-1').split()
+        if len(parts) < 2:
+            raise _RequestError(400, "Linha de requisição inválida")
+        method, path = parts[0].upper(), parts[1].split('?', 1)[0]
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length', 0) or 0)
+        except ValueError:
+            raise _RequestError(400, f"Content-Length inválido: {headers['content-length']!r}")
+        if length < 0:
+            raise _RequestError(400, f"Content-Length inválido: {length}")
+        if length > MAX_BODY_BYTES:
+            raise _RequestError(413, f"Corpo maior que {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length else b''
+
+        return method, path, headers, body
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        """Roteia a requisição e retorna (status, corpo JSON)"""
+        if path == '/health':
+            return 200, {'status': 'ok', 'modelo': str(self.predictor.model_path)}
+
+        if path == '/metrics':
+            return 200, dict(self.stats.snapshot(), cache_predicao=self.predictor.cache_stats())
+
+        if path != '/predict':
+            return 404, {'error': f"Rota não encontrada: {path}"}
+
+        if method != 'POST':
+            return 405, {'error': "Use POST em /predict"}
+
+        try:
+            data = json.loads(body or b'null')
+        except json.JSONDecodeError as e:
+            return 400, {'error': f"JSON inválido: {e}"}
+
+        if isinstance(data, dict):
+            customers = [data]
+        elif isinstance(data, list) and data and all(isinstance(item, dict) for item in data):
+            customers = data
+        else:
+            return 400, {'error': "Envie um objeto com os dados do cliente ou uma lista de objetos"}
+
+        try:
+            rows = await asyncio.gather(*(self.batcher.submit(customer) for customer in customers))
+        except Exception as e:
+            return 500, {'error': str(e)}
+
+        return 200, rows[0] if isinstance(data, dict) else rows
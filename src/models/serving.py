@@ -0,0 +1,237 @@
+"""
+Módulo com o cache de modelos e preditores compartilhado pelo processo
+"""
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from data.cache import file_signature
+from data.data_loader import DataLoader
+from data.sqlite_store import SQLiteStore
+from models.artifact import ModelArtifact
+from models.predictor import ChurnPredictor, SalesPredictor, ProductRecommender
+from models.preprocessing import PreprocessingBundle
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = "output/models/best_model_Gradient_Boosting.pkl"
+DEFAULT_FEATURE_STORE_PATH = "output/feature_store"
+DEFAULT_DATA_PATH = "data"
+
+
+def _signature(paths: List[Path]) -> tuple:
+    """Assinatura (tamanho/data de modificação) dos artefatos; arquivos ausentes entram como None"""
+    return tuple(
+        (str(path), tuple(sorted(file_signature(path, with_hash=False).items())) if path.exists() else None)
+        for path in paths
+    )
+
+
+class ServingCache:
+    """
+    Objetos carregados uma vez por processo e reutilizados entre requisições
+
+    Cada entrada guarda o objeto carregado e a assinatura dos arquivos de
+    que ele depende (modelo, pré-processamento, feature store, CSVs). A
+    leitura verifica apenas tamanho e data de modificação dos arquivos; o
+    objeto é recarregado somente quando algum deles muda. Carregamentos,
+    acertos e tempos de carga ficam em metrics().
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+
+    def get(self, key: str, loader: Callable[[], Any], paths: List[Path]) -> Any:
+        """
+        Retorna o objeto em cache, carregando-o se ausente ou desatualizado
+
+        Args:
+            key: Identificador da entrada
+            loader: Função que carrega o objeto
+            paths: Arquivos cujas mudanças invalidam a entrada
+
+        Returns:
+            Objeto carregado
+        """
+        with self._lock:
+            signature = _signature(paths)
+            entry = self._entries.get(key)
+            metrics = self._metrics.setdefault(key, {
+                'acertos': 0, 'carregamentos': 0, 'recargas': 0,
+                'ultima_carga_s': None, 'tempo_total_carga_s': 0.0, 'carregado_em': None,
+            })
+
+            if entry is not None and entry['signature'] == signature:
+                metrics['acertos'] += 1
+                return entry['value']
+
+            if entry is not None:
+                metrics['recargas'] += 1
+                logger.info(f"Artefatos de '{key}' alterados: recarregando")
+
+            start = time.perf_counter()
+            value = loader()
+            elapsed = time.perf_counter() - start
+
+            self._entries[key] = {'value': value, 'signature': signature}
+            metrics['carregamentos'] += 1
+            metrics['ultima_carga_s'] = elapsed
+            metrics['tempo_total_carga_s'] += elapsed
+            metrics['carregado_em'] = time.strftime('%Y-%m-%d %H:%M:%S')
+
+            logger.info(f"'{key}' carregado em {elapsed:.3f}s")
+            return value
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """
+        Descarta uma entrada (ou todas)
+
+        Args:
+            key: Identificador da entrada (None = todas)
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Métricas por entrada: acertos, carregamentos, recargas e tempos de carga"""
+        with self._lock:
+            return {key: dict(values, em_cache=key in self._entries)
+                    for key, values in self._metrics.items()}
+
+
+_cache = ServingCache()
+
+
+def get_serving_cache() -> ServingCache:
+    """Retorna o cache compartilhado pelo processo"""
+    return _cache
+
+
+def _data_sources(data_path: str) -> List[Path]:
+    return [Path(data_path) / arquivo for arquivo in DataLoader.SOURCE_FILES.values()]
+
+
+def get_churn_predictor(model_path: str = DEFAULT_MODEL_PATH,
+                        feature_store_path: Optional[str] = DEFAULT_FEATURE_STORE_PATH) -> ChurnPredictor:
+    """
+    ChurnPredictor com modelo (artefato), pré-processamento e feature store já carregados
+
+    A instância é compartilhada entre threads; o ChurnPredictor serializa
+    carregamento e predição com o seu próprio lock.
+
+    Args:
+        model_path: Caminho do modelo
+        feature_store_path: Diretório do feature store
+
+    Returns:
+        ChurnPredictor compartilhado (recarregado quando os artefatos mudam)
+    """
+    def load() -> ChurnPredictor:
+        predictor = ChurnPredictor(model_path=model_path, feature_store_path=feature_store_path)
+        predictor.load_model()
+        return predictor
+
+    paths = [
+        Path(model_path),
+        PreprocessingBundle.path_for_model(model_path),
+        ModelArtifact.path_for_model(model_path) / 'metadata.json',
+    ]
+    if feature_store_path:
+        paths.append(Path(feature_store_path) / 'metadata.json')
+
+    return _cache.get(f"churn:{model_path}", load, paths)
+
+
+def get_sales_predictor(data_path: str = DEFAULT_DATA_PATH, backend: str = "interactions") -> SalesPredictor:
+    """
+    SalesPredictor com o histórico já carregado
+
+    Args:
+        data_path: Diretório com os arquivos CSV
+        backend: Backend do histórico (ver SalesPredictor.load_historical_data)
+
+    Returns:
+        SalesPredictor compartilhado (recarregado quando os CSVs mudam)
+    """
+    def load() -> SalesPredictor:
+        predictor = SalesPredictor()
+        predictor.load_historical_data(data_path=data_path, backend=backend)
+        return predictor
+
+    return _cache.get(f"sales:{data_path}:{backend}", load, _data_sources(data_path))
+
+
+def get_recommender(data_path: str = DEFAULT_DATA_PATH, backend: str = "interactions") -> ProductRecommender:
+    """
+    ProductRecommender com o histórico já carregado
+
+    Args:
+        data_path: Diretório com os arquivos CSV
+        backend: Backend do histórico (ver ProductRecommender.load_historical_data)
+
+    Returns:
+        ProductRecommender compartilhado (recarregado quando os CSVs mudam)
+    """
+    def load() -> ProductRecommender:
+        recommender = ProductRecommender()
+        recommender.load_historical_data(data_path=data_path, backend=backend)
+        return recommender
+
+    return _cache.get(f"recommender:{data_path}:{backend}", load, _data_sources(data_path))
+
+
+def get_store(data_path: str = DEFAULT_DATA_PATH) -> SQLiteStore:
+    """
+    Banco SQLite (clientes, produtos e compras indexados) já construído
+
+    A instância é compartilhada entre threads; cada thread consulta o banco
+    pela sua própria conexão (ver SQLiteStore).
+
+    Args:
+        data_path: Diretório com os arquivos CSV
+
+    Returns:
+        SQLiteStore compartilhado (reaberto quando os CSVs mudam)
+    """
+    def load() -> SQLiteStore:
+        return DataLoader(data_dir=data_path, use_cache=True).get_store()
+
+    return _cache.get(f"store:{data_path}", load, _data_sources(data_path))
+
+
+def warmup(model_path: str = DEFAULT_MODEL_PATH, data_path: str = DEFAULT_DATA_PATH) -> Dict[str, str]:
+    """
+    Carrega antecipadamente os preditores (ex.: na inicialização do dashboard)
+
+    Falhas (ex.: modelo ainda não treinado) são registradas e não interrompem
+    o carregamento dos demais.
+
+    Args:
+        model_path: Caminho do modelo de churn
+        data_path: Diretório com os arquivos CSV
+
+    Returns:
+        Dicionário {preditor: 'ok' ou mensagem de erro}
+    """
+    status = {}
+    for name, load in [
+        ('churn', lambda: get_churn_predictor(model_path)),
+        ('sales', lambda: get_sales_predictor(data_path)),
+        ('recommender', lambda: get_recommender(data_path)),
+        ('store', lambda: get_store(data_path)),
+    ]:
+        try:
+            load()
+            status[name] = 'ok'
+        except Exception as e:
+            logger.warning(f"Aquecimento de '{name}' falhou: {e}")
+            status[name] = str(e)
+
+    return status
@@ -0,0 +1,333 @@
+"""
+Módulo de inferência compilada para ensembles de árvores
+"""
+import numpy as np
+import pandas as pd
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Linhas avaliadas por bloco (limita a matriz intermediária linhas × árvores)
+DEFAULT_BLOCK_SIZE = 2048
+
+# Arrays por nó e por árvore (salvos em .npy pelo artefato do modelo)
+ENGINE_ARRAYS = ('feature', 'threshold', 'children', 'missing_left', 'values', 'roots')
+
+# Acima deste tamanho de lote o predict_proba do sklearn (Cython) é mais rápido
+SMALL_BATCH_ROWS = 512
+
+
+def _float32_thresholds(threshold: np.ndarray) -> np.ndarray:
+    """
+    Limiares em float32 que preservam as decisões do sklearn
+
+    O sklearn compara x (convertido para float32) com o limiar em float64.
+    Arredondar o limiar para o maior float32 <= limiar mantém exatamente
+    x <= limiar para qualquer x float32.
+    """
+    rounded = threshold.astype(np.float32)
+    above = rounded.astype(np.float64) > threshold
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def _sigmoid(raw: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-raw))
+
+
+class CompiledTreeEnsemble:
+    """
+    Ensemble de árvores achatado em arrays NumPy contíguos
+
+    Os nós de todas as árvores ficam em arrays únicos (feature, limiar em
+    float32, filhos intercalados children[2 * nó + vai_para_direita] e valor
+    da folha). Folhas apontam para
+    si mesmas, então a avaliação de um lote percorre todas as árvores ao
+    mesmo tempo, um nível por iteração, com uma única operação vetorizada
+    por nível. As probabilidades são as mesmas de predict_proba do modelo
+    de origem (DecisionTree, RandomForest, ExtraTrees ou GradientBoosting).
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children: np.ndarray,
+                 missing_left: np.ndarray, values: np.ndarray, roots: np.ndarray, max_depth: int,
+                 classes: np.ndarray, kind: str, tree_class: Optional[np.ndarray] = None,
+                 init_raw: Optional[np.ndarray] = None, learning_rate: float = 1.0, loss: str = 'log_loss',
+                 feature_names: Optional[List[str]] = None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.missing_left = missing_left
+        self.values = values
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.kind = kind
+        self.tree_class = tree_class
+        self.init_raw = init_raw
+        self.learning_rate = learning_rate
+        self.loss = loss
+        self.feature_names_in_ = feature_names
+
+        if tree_class is not None:
+            self._tree_onehot = np.zeros((len(roots), int(tree_class.max()) + 1))
+            self._tree_onehot[np.arange(len(roots)), tree_class] = 1.0
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @staticmethod
+    def _flatten(trees: List[Any], classifier: bool) -> Dict[str, Any]:
+        """Concatena os nós das árvores com índices globais"""
+        parts = {name: [] for name in ('feature', 'threshold', 'children', 'missing_left', 'values')}
+        roots = []
+        offset = 0
+        max_depth = 0
+
+        for tree in trees:
+            tree_ = tree.tree_
+            n_nodes = tree_.node_count
+            nodes = np.arange(n_nodes)
+            leaf = tree_.children_left < 0
+
+            left = np.where(leaf, nodes, tree_.children_left)
+            right = np.where(leaf, nodes, tree_.children_right)
+
+            if getattr(tree_, 'missing_go_to_left', None) is not None:
+                missing_left = np.asarray(tree_.missing_go_to_left, dtype=bool)
+            else:
+                missing_left = np.zeros(n_nodes, dtype=bool)
+
+            if classifier:
+                # Mesma normalização de DecisionTreeClassifier.predict_proba
+                value = tree_.value[:, 0, :].astype(np.float64)
+                total = value.sum(axis=1, keepdims=True)
+                value = np.divide(value, total, out=np.zeros_like(value), where=total > 0)
+            else:
+                value = tree_.value[:, 0, :1].astype(np.float64)
+
+            parts['feature'].append(np.where(leaf, 0, tree_.feature))
+            parts['threshold'].append(np.where(leaf, np.inf, tree_.threshold))
+            parts['children'].append(np.column_stack([left, right]).ravel() + offset)
+            parts['missing_left'].append(missing_left)
+            parts['values'].append(value)
+
+            roots.append(offset)
+            offset += n_nodes
+            max_depth = max(max_depth, tree_.max_depth)
+
+        return {
+            'feature': np.concatenate(parts['feature']).astype(np.int32),
+            'threshold': _float32_thresholds(np.concatenate(parts['threshold'])),
+            'children': np.concatenate(parts['children']).astype(np.int32),
+            'missing_left': np.concatenate(parts['missing_left']),
+            'values': np.ascontiguousarray(np.concatenate(parts['values'])),
+            'roots': np.asarray(roots, dtype=np.int32),
+            'max_depth': max_depth,
+        }
+
+    @classmethod
+    def from_model(cls, model: Any) -> 'CompiledTreeEnsemble':
+        """
+        Converte um classificador de árvores ajustado
+
+        Args:
+            model: DecisionTreeClassifier, RandomForestClassifier,
+                ExtraTreesClassifier ou GradientBoostingClassifier
+
+        Returns:
+            CompiledTreeEnsemble equivalente
+
+        Raises:
+            ValueError: Se o modelo não for um ensemble de árvores suportado
+        """
+        from sklearn.dummy import DummyClassifier
+        from sklearn.ensemble import ExtraTreesClassifier, GradientBoostingClassifier, RandomForestClassifier
+        from sklearn.tree import DecisionTreeClassifier
+
+        feature_names = getattr(model, 'feature_names_in_', None)
+        feature_names = list(feature_names) if feature_names is not None else None
+
+        if isinstance(model, (DecisionTreeClassifier, RandomForestClassifier, ExtraTreesClassifier)):
+            trees = [model] if isinstance(model, DecisionTreeClassifier) else list(model.estimators_)
+            if getattr(model, 'n_outputs_', 1) != 1:
+                raise ValueError("Modelos com múltiplas saídas não são suportados")
+
+            arrays = cls._flatten(trees, classifier=True)
+            return cls(classes=np.asarray(model.classes_), kind='mean', feature_names=feature_names, **arrays)
+
+        if isinstance(model, GradientBoostingClassifier):
+            if not (model.init_ == 'zero' or isinstance(model.init_, DummyClassifier)):
+                raise ValueError("GradientBoosting com estimador inicial próprio não é suportado")
+
+            n_classes = model.estimators_.shape[1]
+            trees = list(model.estimators_.ravel())
+            arrays = cls._flatten(trees, classifier=False)
+            tree_class = np.tile(np.arange(n_classes, dtype=np.int32), model.estimators_.shape[0])
+
+            engine = cls(
+                classes=np.asarray(model.classes_), kind='gradient_boosting', tree_class=tree_class,
+                init_raw=np.zeros(n_classes), learning_rate=float(model.learning_rate),
+                loss=model.loss, feature_names=feature_names, **arrays
+            )
+
+            # Predição inicial constante: decision_function menos a soma das árvores
+            origin = np.zeros((1, model.n_features_in_))
+            reference = pd.DataFrame(origin, columns=feature_names) if feature_names is not None else origin
+            decision = np.asarray(model.decision_function(reference), dtype=np.float64).reshape(1, -1)
+            engine.init_raw = (decision - engine.raw_predict(origin))[0]
+
+            return engine
+
+        raise ValueError(f"Modelo não suportado pelo motor compilado: {type(model).__name__}")
+
+    def to_state(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """
+        Arrays numéricos e parâmetros (serializáveis em JSON) do ensemble
+
+        Returns:
+            Tupla (arrays, parâmetros) aceita por from_state
+        """
+        arrays = {name: getattr(self, name) for name in ENGINE_ARRAYS}
+        if self.tree_class is not None:
+            arrays['tree_class'] = self.tree_class
+            arrays['init_raw'] = self.init_raw
+
+        params = {
+            'max_depth': self.max_depth,
+            'classes': self.classes_.tolist(),
+            'kind': self.kind,
+            'learning_rate': self.learning_rate,
+            'loss': self.loss,
+            'feature_names': self.feature_names_in_,
+        }
+        return arrays, params
+
+    @classmethod
+    def from_state(cls, arrays: Dict[str, np.ndarray], params: Dict[str, Any]) -> 'CompiledTreeEnsemble':
+        """
+        Recria o ensemble a partir de to_state (os arrays podem ser memory-maps)
+
+        Args:
+            arrays: Arrays numéricos
+            params: Parâmetros
+
+        Returns:
+            CompiledTreeEnsemble
+        """
+        return cls(
+            **{name: arrays[name] for name in ENGINE_ARRAYS},
+            max_depth=params['max_depth'], classes=np.asarray(params['classes']), kind=params['kind'],
+            tree_class=arrays.get('tree_class'), init_raw=arrays.get('init_raw'),
+            learning_rate=params['learning_rate'], loss=params['loss'], feature_names=params['feature_names'],
+        )
+
+    def _as_float32(self, X: Any) -> np.ndarray:
+        """Converte a entrada para float32 na ordem de colunas do modelo"""
+        if isinstance(X, pd.DataFrame):
+            if self.feature_names_in_ is None or list(X.columns) == self.feature_names_in_:
+                values = X.to_numpy(dtype=np.float32)
+            else:
+                faltando = [col for col in self.feature_names_in_ if col not in X.columns]
+                if faltando:
+                    raise ValueError(f"Colunas ausentes para o modelo: {faltando}")
+                values = np.column_stack([X[col].to_numpy(dtype=np.float32) for col in self.feature_names_in_])
+        else:
+            values = np.asarray(X, dtype=np.float32)
+
+        if values.ndim == 1:
+            values = values.reshape(1, -1)
+        return np.ascontiguousarray(values)
+
+    def apply(self, X: Any) -> np.ndarray:
+        """
+        Folha alcançada em cada árvore
+
+        Args:
+            X: Amostras (n_amostras × n_features)
+
+        Returns:
+            Array (n_amostras × n_árvores) com o índice global da folha
+        """
+        values = self._as_float32(X)
+        n_samples, n_features = values.shape
+        flat = values.ravel()
+        row_offset = (np.arange(n_samples, dtype=np.intp) * n_features)[:, None]
+        nodes = np.repeat(self.roots[None, :], n_samples, axis=0)
+        check_missing = self.missing_left.any() and np.isnan(flat).any()
+
+        for _ in range(self.max_depth):
+            x = flat[row_offset + self.feature[nodes]]
+            go_right = ~(x <= self.threshold[nodes])
+            if check_missing:
+                go_right &= ~(np.isnan(x) & self.missing_left[nodes])
+            nodes = self.children[2 * nodes + go_right]
+
+        return nodes
+
+    def raw_predict(self, X: Any) -> np.ndarray:
+        """Soma ponderada das folhas (sem a predição inicial) por classe"""
+        return self.learning_rate * (self.values[self.apply(X), 0] @ self._tree_onehot)
+
+    def _predict_proba_block(self, X: np.ndarray) -> np.ndarray:
+        if self.kind == 'mean':
+            return self.values[self.apply(X)].sum(axis=1) / self.n_trees
+
+        raw = self.init_raw + self.raw_predict(X)
+        if raw.shape[1] == 1:
+            scale = 2.0 if self.loss == 'exponential' else 1.0
+            positive = _sigmoid(scale * raw[:, 0])
+            return np.column_stack([1.0 - positive, positive])
+
+        raw = raw - raw.max(axis=1, keepdims=True)
+        exp = np.exp(raw)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict_proba(self, X: Any, block_size: int = DEFAULT_BLOCK_SIZE) -> np.ndarray:
+        """
+        Probabilidades por classe (mesmas de predict_proba do modelo de origem)
+
+        Args:
+            X: Amostras (DataFrame com as colunas do modelo ou array)
+            block_size: Linhas avaliadas por vez
+
+        Returns:
+            Array (n_amostras × n_classes)
+        """
+        values = self._as_float32(X)
+        if len(values) <= block_size:
+            return self._predict_proba_block(values)
+
+        result = np.empty((len(values), len(self.classes_)))
+        for start in range(0, len(values), block_size):
+            result[start:start + block_size] = self._predict_proba_block(values[start:start + block_size])
+        return result
+
+    def predict(self, X: Any, block_size: int = DEFAULT_BLOCK_SIZE) -> np.ndarray:
+        """Classe mais provável de cada amostra"""
+        return self.classes_[np.argmax(self.predict_proba(X, block_size), axis=1)]
+
+
+def compile_model(model: Any) -> Optional[CompiledTreeEnsemble]:
+    """
+    Compila o modelo se for um ensemble de árvores suportado
+
+    Args:
+        model: Classificador ajustado
+
+    Returns:
+        CompiledTreeEnsemble ou None (modelo segue no caminho do sklearn)
+    """
+    try:
+        engine = CompiledTreeEnsemble.from_model(model)
+    except ValueError as e:
+        logger.info(f"Motor compilado não usado: {e}")
+        return None
+
+    logger.info(f"Modelo compilado: {engine.n_trees} árvores, {engine.n_nodes} nós, profundidade {engine.max_depth}")
+    return engine
@@ -16,12 +16,25 @@ class Config:
     PLOTS_DIR: str = "output/plots"
     REPORTS_DIR: str = "output/reports"
     LOGS_DIR: str = "logs"
+    FEATURE_STORE_DIR: str = "output/feature_store"
 
     # Arquivos de dados
     CLIENTES_FILE: str = "Cliente.csv"
     PRODUTOS_FILE: str = "produtos.csv"
     COMPRAS_FILE: str = "Compras.csv"
 
+    # Cache colunar (Parquet) dos dados carregados (invalidado quando os CSVs mudam)
+    USE_DATA_CACHE: bool = False
+
+    # Tipos compactos (categóricos, inteiros reduzidos, float32, booleanos)
+    COMPACT_DTYPES: bool = False
+
+    # Ingestão incremental de Compras.csv (apenas linhas novas desde a última carga)
+    INCREMENTAL_INGESTION: bool = False
+
+    # Tamanho dos blocos na leitura em streaming de Compras.csv
+    COMPRAS_CHUNK_SIZE: int = 100_000
+
     # Parâmetros de ML
     TEST_SIZE: float = 0.2
     RANDOM_STATE: int = 42
@@ -31,6 +44,14 @@ class Config:
     INCLUDE_TEMPORAL_FEATURES: bool = True
     INCLUDE_AGGREGATED_FEATURES: bool = True
     INCLUDE_INTERACTION_FEATURES: bool = True
+    # Gasto/compras/ticket do cliente nos últimos 30/90/180/365 dias de cada compra
+    INCLUDE_WINDOW_FEATURES: bool = False
+    # Adiciona as features ao mesmo DataFrame, sem copiar a entrada a cada etapa
+    COPY_FREE_FEATURES: bool = False
+    # Processos do feature engineering (1 = serial, -1 = todos os núcleos)
+    FEATURE_N_JOBS: int = 1
+    # Modelo salvo cujas colunas limitam as features calculadas ("" = todas)
+    PRUNE_FEATURES_MODEL: str = ""
 
     # Normalização
     SCALER_METHOD: str = "standard"  # 'standard' ou 'minmax'